@@ -0,0 +1,139 @@
+"""Feed parsing benchmark: the streaming parse_feed versus feedparser
+
+Parses Google News search payloads both ways, as fetch_feed uses them (the
+first FEED_MAX_ENTRIES items), and reports time per feed, peak memory and
+whether both parsers extracted the same entries. Without arguments it uses
+synthetic payloads in Google News' RSS layout; pass recorded payloads to
+measure real ones, and --record to save live feeds for later runs.
+
+    python benchmarks/bench_feeds.py
+    python benchmarks/bench_feeds.py --record payloads/      # needs network access
+    python benchmarks/bench_feeds.py payloads/*.xml
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import urllib.parse
+import urllib.request
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import analyst
+
+QUERIES = ["stock market today", "S&P 500 nasdaq", "federal reserve interest rates", "NVIDIA Corporation stock news"]
+PUBLISHERS = [('Reuters', 'https://www.reuters.com'), ('CNBC', 'https://www.cnbc.com'),
+              ('Bloomberg', 'https://www.bloomberg.com'), ('Yahoo Finance', 'https://finance.yahoo.com')]
+
+
+def google_news_payload(query, items=100):
+    """A search feed shaped like Google News RSS, including its HTML-in-description summaries"""
+    now = datetime(2026, 10, 17, 16, 0, tzinfo=timezone.utc)
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+             '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>',
+             '<generator>NFE/5.0</generator>',
+             f'<title>"{escape(query)}" - Google News</title>',
+             f'<link>https://news.google.com/search?q={urllib.parse.quote_plus(query)}&amp;hl=en-US&amp;gl=US&amp;ceid=US:en</link>',
+             '<language>en-US</language><webMaster>news-webmaster@google.com</webMaster>',
+             '<copyright>2026 Google Inc.</copyright>',
+             f'<lastBuildDate>{format_datetime(now)}</lastBuildDate>',
+             '<description>Google News</description>']
+    for i in range(items):
+        publisher, site = PUBLISHERS[i % len(PUBLISHERS)]
+        article_id = f"CBMi{i:04d}{abs(hash(query)) % 10 ** 8}AU_yqLP{'x' * 120}"
+        link = f"https://news.google.com/rss/articles/{article_id}?oc=5"
+        title = escape(f"{query.title()} update {i}: shares move as investors weigh earnings & rates - {publisher}")
+        description = escape(f'<a href="{link}" target="_blank">{title}</a>&nbsp;&nbsp;<font color="#6f6f6f">{publisher}</font>')
+        parts.append(f'<item><title>{title}</title><link>{link}</link>'
+                     f'<guid isPermaLink="false">{article_id}</guid>'
+                     f'<pubDate>{format_datetime(now - timedelta(minutes=17 * i))}</pubDate>'
+                     f'<description>{description}</description>'
+                     f'<source url="{site}">{publisher}</source></item>')
+    parts.append('</channel></rss>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def record_payloads(directory):
+    """Save live Google News search feeds for QUERIES into directory"""
+    os.makedirs(directory, exist_ok=True)
+    for query in QUERIES:
+        url = f"https://news.google.com/rss/search?q={urllib.parse.quote_plus(query)}&hl=en-US&gl=US&ceid=US:en"
+        request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0 (compatible; FinancialAnalyst/0.1)'})
+        with urllib.request.urlopen(request, timeout=analyst.FEED_TIMEOUT) as response:
+            path = os.path.join(directory, f"{urllib.parse.quote_plus(query)}.xml")
+            with open(path, 'wb') as f:
+                f.write(response.read())
+        print(f"saved {path}")
+
+
+def with_feedparser(payload, limit):
+    return [analyst._feed_entry(entry) for entry in analyst.feedparser.parse(payload).entries[:limit or None]]
+
+
+def with_parse_feed(payload, limit):
+    chunks = (payload[i:i + analyst.FEED_CHUNK_BYTES] for i in range(0, len(payload), analyst.FEED_CHUNK_BYTES))
+    return analyst.parse_feed(chunks, limit)
+
+
+def measure(parse, payload, limit, rounds):
+    """Mean milliseconds per parse, and peak traced memory of one parse"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        parse(payload, limit)
+    elapsed = (time.perf_counter() - started) * 1000 / rounds
+    tracemalloc.start()
+    entries = parse(payload, limit)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return entries, elapsed, peak
+
+
+def comparable(entries):
+    """Entries as the news fetchers see them: stripped fields and HTML-free summaries"""
+    return [(e['title'].strip(), e['link'].strip(), e['source'].strip(), e['published'],
+             analyst._clean_summary(e['summary'], e['title'])) for e in entries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_feed against feedparser")
+    parser.add_argument('payloads', nargs='*', help="recorded feed files (default: synthetic Google News feeds)")
+    parser.add_argument('--limit', type=int, default=analyst.FEED_MAX_ENTRIES, help="entries kept per feed, 0 for all")
+    parser.add_argument('--rounds', type=int, default=50, help="parses per measurement")
+    parser.add_argument('--record', metavar='DIR', help="download live Google News feeds into DIR and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_payloads(args.record)
+        return
+
+    if args.payloads:
+        payloads = []
+        for path in args.payloads:
+            with open(path, 'rb') as f:
+                payloads.append((os.path.basename(path), f.read()))
+    else:
+        payloads = [(query, google_news_payload(query)) for query in QUERIES]
+
+    # Warm both parsers so import time is not measured
+    with_feedparser(payloads[0][1], 1)
+    with_parse_feed(payloads[0][1], 1)
+
+    print(f"{'payload':<32} {'size':>8} {'feedparser':>11} {'parse_feed':>11} {'speedup':>8} "
+          f"{'fp peak':>9} {'pf peak':>9}  same")
+    print('-' * 100)
+    all_same = True
+    for name, payload in payloads:
+        expected, fp_ms, fp_peak = measure(with_feedparser, payload, args.limit, args.rounds)
+        entries, pf_ms, pf_peak = measure(with_parse_feed, payload, args.limit, args.rounds)
+        same = comparable(expected) == comparable(entries)
+        all_same = all_same and same
+        print(f"{name[:32]:<32} {len(payload) / 1024:>6.0f}KB {fp_ms:>9.2f}ms {pf_ms:>9.2f}ms {fp_ms / pf_ms:>7.1f}x "
+              f"{fp_peak / 1024:>7.0f}KB {pf_peak / 1024:>7.0f}KB  {same}")
+    sys.exit(0 if all_same else 1)
+
+
+if __name__ == '__main__':
+    main()
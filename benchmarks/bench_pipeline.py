@@ -0,0 +1,396 @@
+"""Offline benchmark for the analysis pipeline
+
+Runs collect_market_data, analyze_with_groq, generate_terminal_output and
+generate_html_file against local stand-ins for every outside service:
+
+- Yahoo Finance: a synthetic yfinance replacement with deterministic OHLCV, info and news
+- Google News: a local RSS server with ETag support
+- Groq: a local OpenAI-compatible chat-completions endpoint (GROQ_BASE_URL)
+
+Each portfolio size runs in its own process with a fresh cache database, once
+cold and once warm, so results are comparable between commits on a machine
+with no network access.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 5,50 --llm-latency 1.5 --json baseline.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+import http.server
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from urllib.parse import unquote_plus, urlparse
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+STAGES = ['collect', 'analyze', 'terminal', 'html']
+
+HEADLINES = [
+    "{name} shares rise after earnings beat estimates",
+    "{name} falls as analysts cut price target",
+    "{name} announces new partnership to expand cloud business",
+    "{name} faces probe over accounting practices",
+    "{name} holds annual shareholder meeting",
+    "Why {name} stock is on the move today",
+]
+SECTORS = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical', 'Industrials']
+
+
+# ---------------------------------------------------------------------------
+# Local HTTP stand-ins (run in the parent process)
+
+def headline(name, seed, i):
+    """Synthetic headline; stories about different symbols share their wording, as real feeds do"""
+    return HEADLINES[(seed + i) % len(HEADLINES)].format(name=name)
+
+
+def _rss_feed(query, items=20):
+    """Synthetic Google News search feed for a query"""
+    published = format_datetime(datetime.now(timezone.utc) - timedelta(hours=2), usegmt=True)
+    entries = []
+    for i in range(items):
+        title = headline(query.split(' stock')[0], zlib.crc32(query.encode()), i)
+        entries.append(
+            f"<item><title>{title} - Reuters</title><link>https://example.com/{i}/{zlib.crc32(query.encode())}</link>"
+            f"<pubDate>{published}</pubDate>"
+            f"<description>&lt;a href=\"https://example.com\"&gt;{title}&lt;/a&gt;&amp;nbsp;&lt;font&gt;Reuters&lt;/font&gt;</description>"
+            f"<source url=\"https://www.reuters.com\">Reuters</source></item>"
+        )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f'<title>"{query}" - Google News</title>{"".join(entries)}</channel></rss>').encode()
+
+
+def _fake_analysis(prompt):
+    """Schema-valid analysis for whichever tickers the prompt mentions"""
+    tickers = []
+    for header in ('PORTFOLIO (', 'STOCK SIGNALS ('):
+        if header in prompt:
+            block = prompt.split(header, 1)[1].split('\n\n', 1)[0].split('\n')[1:]
+            tickers += [line.split('|', 1)[0] for line in block if '|' in line]
+    analysis = {}
+    if 'PORTFOLIO (' in prompt:
+        analysis['stock_analysis'] = [
+            {'ticker': t, 'sentiment': 'Neutral', 'key_news': 'Synthetic headline',
+             'analysis': 'Synthetic analysis for benchmarking.'}
+            for t in tickers
+        ]
+    if '"market_overview"' in prompt:
+        analysis.update({
+            'market_overview': 'Synthetic market overview.',
+            'news_highlights': ['Synthetic highlight 1', 'Synthetic highlight 2', 'Synthetic highlight 3'],
+            'portfolio_health': {'summary': 'Synthetic portfolio health.', 'alerts': []},
+            'recommendations': [
+                {'ticker': t, 'action': 'Hold', 'current_price': 100.0, 'target_price': 105.0,
+                 'rationale': 'Synthetic rationale.', 'risk_level': 'Medium', 'timeframe': '1-3 months',
+                 'news_catalyst': 'Synthetic catalyst'}
+                for t in tickers[:3]
+            ],
+            'action_items': ['Synthetic action item'],
+        })
+    return json.dumps(analysis)
+
+
+def _make_handler(args, counters):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *_):
+            pass
+
+        def _send(self, status, body=b'', content_type='application/json', headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # A hedged news fetch that lost the race closed its connection
+
+        def do_GET(self):
+            counters['rss'] += 1
+            time.sleep(args.rss_latency)
+            match = re.search(r'[?&]q=([^&]*)', self.path)
+            query = unquote_plus(match.group(1)) if match else 'markets'
+            etag = f'"{zlib.crc32(query.encode())}"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304)
+                return
+            self._send(200, _rss_feed(query), 'application/rss+xml', {'ETag': etag})
+
+        def do_POST(self):
+            counters['llm'] += 1
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            prompt = request['messages'][-1]['content']
+            text = _fake_analysis(prompt)
+            usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(text) // 4,
+                     'total_tokens': (len(prompt) + len(text)) // 4}
+            time.sleep(args.llm_latency)
+
+            if not request.get('stream'):
+                if args.llm_tps:
+                    time.sleep(usage['completion_tokens'] / args.llm_tps)
+                self._send(200, json.dumps({
+                    'id': 'bench', 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': request['model'], 'usage': usage,
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': text}}],
+                }).encode())
+                return
+
+            # Server-sent events, 16 characters (about 4 tokens) per chunk
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+            for i, piece in enumerate(pieces):
+                if args.llm_tps:
+                    time.sleep(4 / args.llm_tps)
+                chunk = {'id': 'bench', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': request['model'],
+                         'choices': [{'index': 0, 'delta': {'content': piece},
+                                      'finish_reason': 'stop' if i == len(pieces) - 1 else None}]}
+                if i == len(pieces) - 1:
+                    chunk['x_groq'] = {'id': 'bench', 'usage': usage}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    return Handler
+
+
+def start_servers(args):
+    """Start the RSS and chat-completions stand-ins; returns (base_url, counters)"""
+    counters = {'rss': 0, 'llm': 0}
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(args, counters))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", counters
+
+
+# ---------------------------------------------------------------------------
+# Synthetic yfinance (used in the worker process)
+
+class SyntheticTicker:
+    def __init__(self, market, symbol):
+        self.market = market
+        self.symbol = symbol
+        self.seed = zlib.crc32(symbol.encode())
+
+    @property
+    def info(self):
+        time.sleep(self.market.latency)
+        return {
+            'longName': f"{self.symbol} Holdings Inc",
+            'sector': SECTORS[self.seed % len(SECTORS)],
+            'industry': 'Synthetic',
+            'marketCap': 1_000_000_000 + self.seed % 10**12,
+            'trailingPE': 5 + self.seed % 40 + 0.37,
+        }
+
+    @property
+    def news(self):
+        time.sleep(self.market.latency)
+        if self.seed % 3 == 0:
+            # Leave a third of the symbols to the Google News fallback
+            return []
+        now = time.time()
+        return [{
+            'title': headline(self.symbol, self.seed, i),
+            'publisher': 'Yahoo Finance',
+            'link': f"https://finance.example.com/{self.symbol}/{i}",
+            'providerPublishTime': int(now - 3600 * (i + 1)),
+            'summary': f"Synthetic article {i} about {self.symbol}.",
+        } for i in range(3)]
+
+    def history(self, period=None, start=None, **_):
+        time.sleep(self.market.latency)
+        return self.market.frame(self.symbol, period, start)
+
+
+class SyntheticMarket:
+    """Drop-in for the parts of yfinance the analyst uses"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def Ticker(self, symbol):
+        return SyntheticTicker(self, symbol)
+
+    def frame(self, symbol, period=None, start=None):
+        import numpy as np
+        import pandas as pd
+        end = pd.Timestamp.today().normalize()
+        if start is not None:
+            index = pd.bdate_range(start=pd.Timestamp(start), end=end)
+        else:
+            days = {'5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 252, '2y': 504}.get(period or '5d', 252)
+            index = pd.bdate_range(end=end, periods=days)
+        # Seed from the symbol and dates so incremental fetches agree with the backfill
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        walk = rng.standard_normal(600).cumsum()
+        offsets = (index - pd.Timestamp('2020-01-01')).days % 600
+        close = 100 + walk[offsets]
+        return pd.DataFrame({
+            'Open': close * 0.995, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+            'Volume': rng.integers(100_000, 10_000_000, len(index)),
+        }, index=index)
+
+    def download(self, symbols, period=None, start=None, group_by='ticker', **_):
+        import pandas as pd
+        if isinstance(symbols, str):
+            symbols = symbols.split()
+        # yf.download fetches each symbol's chart separately (threads=False: one after another)
+        time.sleep(self.latency * len(symbols))
+        return pd.concat({symbol: self.frame(symbol, period, start) for symbol in symbols}, axis=1)
+
+
+def run_worker(size, args):
+    """Benchmark one portfolio size in this process and print the result as JSON"""
+    sys.path.insert(0, SRC_DIR)
+    import analyst
+
+    analyst.yf = SyntheticMarket(args.yahoo_latency)
+    analyst.PORTFOLIO = [f"S{i:05d}" for i in range(size)]
+    os.chdir(os.environ['BENCH_WORKDIR'])
+
+    runs = {}
+    for label in ('cold', 'warm'):
+        metrics = analyst.reset_metrics()
+        timings = {}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            market_data = analyst.collect_market_data()
+            timings['collect'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            analysis = analyst.analyze_with_groq(market_data)
+            timings['analyze'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            analyst.generate_terminal_output(market_data, analysis)
+            timings['terminal'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            analyst.generate_html_file(market_data, analysis)
+            timings['html'] = time.perf_counter() - started
+
+        summary = metrics.summary()
+        runs[label] = {
+            'seconds': {stage: round(value, 4) for stage, value in timings.items()},
+            'total': round(sum(timings.values()), 4),
+            'symbols': len(market_data['portfolio']),
+            'analysis_source': analysis.get('analysis_source', 'llm'),
+            'requests': {host: entry['requests'] for host, entry in summary['hosts'].items()},
+            'request_latency': {host: round(entry['seconds'] / entry['requests'], 4)
+                                for host, entry in summary['hosts'].items() if entry['requests']},
+            'llm': summary['llm'],
+        }
+    print(json.dumps({'size': size, 'runs': runs}))
+
+
+# ---------------------------------------------------------------------------
+# Driver
+
+def run_size(size, args, base_url):
+    """Run one size in a fresh process with its own cache database"""
+    with tempfile.TemporaryDirectory(prefix='analyst-bench-') as workdir:
+        env = dict(os.environ,
+                   BENCH_WORKDIR=workdir,
+                   CACHE_DB=os.path.join(workdir, 'cache.db'),
+                   GOOGLE_NEWS_URL=base_url,
+                   GROQ_BASE_URL=base_url,
+                   GROQ_API_KEY='bench',
+                   # The stand-ins never throttle; keep the rate limiter out of the timings
+                   HOST_RATES=','.join(f'{host}=1000' for host in
+                                       ('finance.yahoo.com', 'api.groq.com', urlparse(base_url).netloc)),
+                   METRICS_DIR='',
+                   PROFILE='',
+                   SKIP_LLM='',
+                   LLM_REPLAY='',
+                   STREAM_OUTPUT='')
+        command = [sys.executable, os.path.abspath(__file__), '--worker', str(size),
+                   '--yahoo-latency', str(args.yahoo_latency)]
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Benchmark for {size} symbols failed:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _delta(value, baseline):
+    if not baseline:
+        return ''
+    return f" ({(value - baseline) / baseline * 100:+.0f}%)"
+
+
+def print_report(results, baseline=None):
+    baseline = {(r['size'], label): run for r in (baseline or []) for label, run in r['runs'].items()}
+    header = f"{'size':>6} {'run':<5} " + ' '.join(f"{stage:>10}" for stage in STAGES) + \
+             f" {'total':>10} {'sym/s':>9} {'requests':>9} {'llm':>4}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        for label, run in result['runs'].items():
+            before = baseline.get((result['size'], label))
+            stages = ' '.join(f"{run['seconds'][stage]:>9.3f}s" for stage in STAGES)
+            throughput = run['symbols'] / run['total'] if run['total'] else 0
+            print(f"{result['size']:>6} {label:<5} {stages} {run['total']:>9.3f}s {throughput:>9.1f} "
+                  f"{sum(run['requests'].values()):>9} {run['llm']['calls'] - run['llm']['cached']:>4}"
+                  f"{_delta(run['total'], before['total'] if before else None)}")
+    print()
+    print("Mean request latency by host (cold runs):")
+    for result in results:
+        latency = ', '.join(f"{host} {seconds * 1000:.0f}ms"
+                            for host, seconds in result['runs']['cold']['request_latency'].items())
+        print(f"  {result['size']:>6}: {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the analysis pipeline")
+    parser.add_argument('--sizes', default='5,50,500,5000', help="comma-separated portfolio sizes")
+    parser.add_argument('--yahoo-latency', type=float, default=0.02, help="seconds per Yahoo call")
+    parser.add_argument('--rss-latency', type=float, default=0.03, help="seconds per RSS request")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="seconds before the first LLM token")
+    parser.add_argument('--llm-tps', type=float, default=0, help="LLM output tokens per second, 0 for instant")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="compare against results written earlier with --json")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args)
+        return
+
+    base_url, counters = start_servers(args)
+    results = []
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        print(f"Benchmarking {size} symbols...", file=sys.stderr)
+        results.append(run_size(size, args, base_url))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_report(results, baseline)
+    print(f"\nServed {counters['rss']} RSS and {counters['llm']} chat-completion requests")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'args': vars(args),
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Market data model benchmark: nested dicts versus the columnar MarketSnapshot
+
+Builds synthetic collected market data for each size and compares the memory
+held by the nested dicts with the packed snapshot, then the cost of reading a
+saved run back: json.load of the dicts versus mapping the binary snapshot.
+The mapped snapshot's view is checked to compare equal to the original dicts.
+
+    python benchmarks/bench_snapshot.py
+    python benchmarks/bench_snapshot.py --sizes 1000,10000 --news 8
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import analyst
+
+PUBLISHERS = ['Reuters', 'Yahoo Finance', 'Bloomberg', 'CNBC', 'MarketWatch', "Barron's"]
+SECTORS = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical', 'Industrials']
+VERBS = ['rises', 'falls', 'climbs', 'slides', 'rallies', 'plunges']
+
+
+def synthetic_market_data(size, news_per_stock, seed=7):
+    """Market data in the shape collect_market_data assembles, with sentiment and indicators"""
+    rng = random.Random(seed)
+
+    def article(symbol, i):
+        return {
+            'title': f"{symbol} {rng.choice(VERBS)} after {rng.choice(['earnings', 'guidance', 'deal', 'upgrade'])} {i}",
+            'publisher': rng.choice(PUBLISHERS),
+            'link': f"https://news.example.com/{symbol}/{i}",
+            'published': f"2026-10-{rng.randint(10, 17)} 09:30",
+            'summary': f"{symbol} coverage: {' '.join(rng.choice(VERBS) for _ in range(12))}",
+        }
+
+    data = {
+        'timestamp': '2026-10-18 06:30:00',
+        'market_indices': {name: {'price': round(rng.uniform(1000, 20000), 2), 'change_percent': round(rng.gauss(0, 1), 2)}
+                           for name in analyst.MARKET_INDICES.values()},
+        'portfolio': {},
+        'market_news': [article('MARKET', i) for i in range(10)],
+    }
+    for n in range(size):
+        symbol = f"SYM{n:05d}"
+        news = [article(symbol, i) for i in range(news_per_stock)]
+        data['portfolio'][symbol] = {
+            'name': f"{symbol} Holdings", 'price': round(rng.uniform(5, 900), 2),
+            'change_percent': round(rng.gauss(0, 2), 2), 'volume': rng.randint(10_000, 50_000_000),
+            'market_cap': rng.randint(10 ** 8, 10 ** 12), 'pe_ratio': round(rng.uniform(5, 80), 2),
+            'sector': rng.choice(SECTORS), 'industry': rng.choice(SECTORS) + ' Services',
+            'news': news, 'news_count': len(news),
+            'indicators': {key: round(rng.gauss(0, 10), 2) for key in ('return_5d', 'return_1m', 'volatility', 'rsi_14')},
+        }
+    analyst.score_news_sentiment(data)
+    return data
+
+
+def traced(build):
+    """Run build() and return its result with the bytes it still holds afterwards"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run_size(size, news_per_stock, workdir):
+    data, dict_bytes = traced(lambda: synthetic_market_data(size, news_per_stock))
+    snapshot, pack_ms = timed(lambda: analyst.MarketSnapshot.from_market_data(data))
+    # Measured on its own, after the dicts it was packed from are gone
+    snapshot_bytes = traced(lambda: analyst.MarketSnapshot.from_market_data(synthetic_market_data(size, news_per_stock)))[1]
+
+    json_path = os.path.join(workdir, f'{size}.json')
+    bin_path = os.path.join(workdir, f'{size}.bin')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    snapshot.save(bin_path)
+
+    def load_json():
+        with open(json_path, encoding='utf-8') as f:
+            return json.load(f)
+    _, json_ms = timed(load_json)
+    view, map_ms = timed(lambda: analyst.MarketSnapshot.load(bin_path).view())
+
+    return {
+        'size': size, 'articles': size * news_per_stock + len(data['market_news']),
+        'dict_mb': dict_bytes / 1e6, 'snapshot_mb': snapshot_bytes / 1e6, 'pack_ms': pack_ms,
+        'json_mb': os.path.getsize(json_path) / 1e6, 'bin_mb': os.path.getsize(bin_path) / 1e6,
+        'json_load_ms': json_ms, 'map_ms': map_ms, 'same': view == data,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar market data snapshot")
+    parser.add_argument('--sizes', default='1000,10000', help="comma-separated portfolio sizes")
+    parser.add_argument('--news', type=int, default=3, help="articles per stock")
+    args = parser.parse_args()
+
+    # Import the lazily loaded data stack before anything is traced
+    synthetic_market_data(1, 1)
+    with tempfile.TemporaryDirectory(prefix='analyst-snapshot-') as workdir:
+        results = [run_size(int(size), args.news, workdir) for size in args.sizes.split(',') if size.strip()]
+
+    print(f"{'size':>6} {'articles':>9} {'dicts':>9} {'snapshot':>9} {'pack':>8} "
+          f"{'json file':>10} {'bin file':>9} {'json.load':>10} {'mmap':>8}  same data")
+    print('-' * 100)
+    for r in results:
+        print(f"{r['size']:>6} {r['articles']:>9} {r['dict_mb']:>7.1f}MB {r['snapshot_mb']:>7.1f}MB {r['pack_ms']:>6.0f}ms "
+              f"{r['json_mb']:>8.1f}MB {r['bin_mb']:>7.1f}MB {r['json_load_ms']:>8.1f}ms {r['map_ms']:>6.1f}ms  {r['same']}")
+    sys.exit(0 if all(r['same'] for r in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Startup benchmark: import cost of src/analyst.py and the lightweight commands
+
+Importing the module must stay under IMPORT_BUDGET_MS and must not load the data
+stack (pandas, numpy, yfinance, groq, httpx, feedparser). Exits with status 1
+when either check fails, so it can gate a change.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --budget-ms 80
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+IMPORT_BUDGET_MS = 100
+HEAVY_MODULES = ['pandas', 'numpy', 'yfinance', 'groq', 'httpx', 'feedparser']
+
+IMPORT_PROBE = f"""
+import sys, time, json
+sys.path.insert(0, {SRC_DIR!r})
+started = time.perf_counter()
+import analyst
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{'ms': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(env):
+    """Import time in a fresh interpreter, in milliseconds, and any heavy modules it pulled in"""
+    result = subprocess.run([sys.executable, '-c', IMPORT_PROBE], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing analyst failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_command(args, env):
+    """Wall time of a CLI command including interpreter startup, in milliseconds"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(SRC_DIR, 'analyst.py'), *args], env=env,
+                   capture_output=True, text=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark for src/analyst.py")
+    parser.add_argument('--runs', type=int, default=10, help="fresh interpreters per measurement")
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS, help="import time budget")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='analyst-startup-') as workdir:
+        # No API key and empty caches: importing must not need either
+        env = {key: value for key, value in os.environ.items() if key != 'GROQ_API_KEY'}
+        env.update(CACHE_DB=os.path.join(workdir, 'cache.db'), METRICS_DIR=os.path.join(workdir, 'metrics'),
+                   SNAPSHOT_FILE=os.path.join(workdir, 'last_run.json'))
+
+        imports = [measure_import(env) for _ in range(args.runs)]
+        timings = sorted(run['ms'] for run in imports)
+        loaded = sorted({name for run in imports for name in run['loaded']})
+        status = sorted(measure_command(['status'], env) for _ in range(args.runs))
+        baseline = sorted(measure_command(['--help'], env) for _ in range(args.runs))
+
+    median = timings[len(timings) // 2]
+    print(f"import analyst:   best {timings[0]:.1f}ms  median {median:.1f}ms  (budget {args.budget_ms:.0f}ms)")
+    print(f"analyst status:   best {status[0]:.1f}ms  median {status[len(status) // 2]:.1f}ms  (with interpreter startup)")
+    print(f"analyst --help:   best {baseline[0]:.1f}ms  median {baseline[len(baseline) // 2]:.1f}ms  (with interpreter startup)")
+    print(f"data stack loaded on import: {', '.join(loaded) or 'none'}")
+
+    failed = False
+    if median > args.budget_ms:
+        print(f"FAIL: median import time {median:.1f}ms exceeds the {args.budget_ms:.0f}ms budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: importing analyst loaded {', '.join(loaded)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
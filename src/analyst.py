@@ -1,187 +1,2009 @@
 import os
-import yfinance as yf
-from groq import Groq
-#import schedule
+import re
+import sys
+import gzip
+import math
+import mmap
+import random
+import hashlib
+import importlib
+import zlib
+import sqlite3
+import atexit
+import threading
+from array import array
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 import time
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 import json
-import requests
-import feedparser
+import html
+from string import Template
+import argparse
 import urllib.parse
 
+class _LazyModule:
+    """Stand-in for a heavy module that is only imported on first attribute access
+    
+    On first use the real module replaces the stand-in in this module's globals,
+    so later lookups cost nothing extra.
+    """
+    
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+    
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self._name)
+        if globals().get(self._alias) is self:
+            globals()[self._alias] = module
+        return getattr(module, attribute)
+
+# The data stack is loaded on demand so renderers, helpers and the status CLI start fast
+yf = _LazyModule('yfinance', 'yf')
+np = _LazyModule('numpy', 'np')
+pd = _LazyModule('pandas', 'pd')
+groq = _LazyModule('groq', 'groq')
+schedule = _LazyModule('schedule', 'schedule')
+httpx = _LazyModule('httpx', 'httpx')
+feedparser = _LazyModule('feedparser', 'feedparser')
+ElementTree = _LazyModule('xml.etree.ElementTree', 'ElementTree')
+asyncio = _LazyModule('asyncio', 'asyncio')
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
 PORTFOLIO = ['AAPL', 'MSFT', 'GOOGL', 'NVDA', 'TSLA']  # Edit your stocks here
+PORTFOLIOS_FILE = os.getenv('PORTFOLIOS_FILE', '')  # JSON file of named portfolios; replaces PORTFOLIO when set
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 
-# Initialize Groq client
-client = Groq(api_key=GROQ_API_KEY)
+# Market indices shown in the overview
+MARKET_INDICES = {
+    '^GSPC': 'S&P 500',
+    '^IXIC': 'NASDAQ',
+    '^VIX': 'VIX'
+}
+
+# Collection concurrency
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', '8'))  # Symbols collected in parallel
+YAHOO_HOST = 'finance.yahoo.com'
+GOOGLE_NEWS_URL = os.getenv('GOOGLE_NEWS_URL', 'https://news.google.com').rstrip('/')  # Point at a local server for offline runs
+GOOGLE_NEWS_HOST = urllib.parse.urlparse(GOOGLE_NEWS_URL).netloc
+GROQ_HOST = 'api.groq.com'
+DEFAULT_HOST_LIMIT = 4
+
+def _parse_int_mapping(spec):
+    """Parse a 'key=int,key=int' string into a dict"""
+    mapping = {}
+    for part in spec.split(','):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            mapping[key.strip()] = max(1, int(value))
+    return mapping
+
+# Max simultaneous requests per host, e.g. HOST_LIMITS="finance.yahoo.com=6,news.google.com=4"
+HOST_LIMITS = _parse_int_mapping(os.getenv('HOST_LIMITS', f'{YAHOO_HOST}=6,{GOOGLE_NEWS_HOST}=4'))
+PRICE_BATCH_SIZE = int(os.getenv('PRICE_BATCH_SIZE', '200'))  # Max symbols per yf.download call; smaller so MAX_WORKERS calls run at once
+
+# Outbound rate limiting and retries
+# Starting requests per second per host; each host's rate adapts between RATE_FLOOR and RATE_CEILING x this
+HOST_RATES = _parse_int_mapping(os.getenv('HOST_RATES', f'{YAHOO_HOST}=20,{GOOGLE_NEWS_HOST}=10,{GROQ_HOST}=2'))
+DEFAULT_HOST_RATE = 10
+RATE_FLOOR = 0.2  # Requests per second a throttled host can be slowed to
+RATE_CEILING = 4  # Multiple of the starting rate a healthy host can speed up to
+RATE_STEP = 0.1  # Requests per second added after each success
+RATE_BURST = 2  # Requests an idle host may send back to back before pacing starts
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '4'))  # Tries per request, including the first
+RETRY_BASE_DELAY = 0.5  # Seconds; backoff doubles per attempt with full jitter
+RETRY_MAX_DELAY = 30
+RETRY_BUDGET = 10  # Retry tokens per host; each success refunds RETRY_REFUND
+RETRY_REFUND = 0.1
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', '5'))  # Consecutive failures that open a host's circuit
+BREAKER_COOLDOWN = int(os.getenv('BREAKER_COOLDOWN', '30'))  # Seconds before a trial request is let through
+
+# On-disk caches
+CACHE_DB = os.getenv('CACHE_DB', 'analyst_cache.db')
+PRICE_HISTORY_PERIOD = os.getenv('PRICE_HISTORY_PERIOD', '1y')  # Backfill for symbols not in the store yet
+PRICE_REFRESH_SECONDS = int(os.getenv('PRICE_REFRESH_SECONDS', '300'))  # Stored bars younger than this are not refetched
+PRICE_ADJUST_TOLERANCE = 0.0005  # Relative move in a settled adjusted close that means a split or dividend rebased the series
+
+# Technical indicators
+INDICATOR_BARS = 252  # Daily bars per symbol loaded into the indicator panel
+BENCHMARK_SYMBOL = '^GSPC'  # Relative strength is measured against this index
+RETURN_HORIZONS = {'return_5d': 5, 'return_1m': 21, 'return_3m': 63, 'return_6m': 126}  # Name -> bars
+VOLATILITY_BARS = 21
+RSI_BARS = 14
+CORRELATION_BARS = 63
+
+FEED_FRESH_SECONDS = int(os.getenv('FEED_FRESH_SECONDS', '300'))  # Cached RSS feeds younger than this skip the network
+FEED_TIMEOUT = 15
+FEED_MAX_ENTRIES = int(os.getenv('FEED_MAX_ENTRIES', '10'))  # Items parsed and cached per feed; the fetchers use at most 4
+FEED_CHUNK_BYTES = 16 * 1024  # Feed bodies are read and parsed in chunks of this size
+FEED_DRAIN_BYTES = 256 * 1024  # Unread feed bytes worth draining to keep the connection; larger remainders are dropped
+
+# Hedged per-stock news: a stock's best source starts first and the others join it if it is slow or comes up short
+NEWS_SOURCES = ('ticker', 'info', 'rss')  # ticker.news, info['news'], Google News search; the order before any stats exist
+NEWS_HEDGE_DELAY = float(os.getenv('NEWS_HEDGE_DELAY', '1.0'))  # Seconds before the fallback sources start alongside the first
+NEWS_DEADLINE = float(os.getenv('NEWS_DEADLINE', '8'))  # Seconds a stock's news may take; the fullest result so far is used
+NEWS_CONCURRENCY = int(os.getenv('NEWS_CONCURRENCY', '16'))  # Stocks whose news is fetched at once
+NEWS_SOURCE_DECAY = 0.2  # Weight of the latest fetch in each source's hit rate and latency
 
-def fetch_news_for_stock(symbol, company_name, max_articles=3):  # Reduced from 10 to 3
-    """Fetch recent news articles for a specific stock"""
-    print(f"  📰 Fetching news for {symbol}...")
+# LLM analysis
+LLM_MODEL = 'llama-3.3-70b-versatile'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '3600'))  # Seconds a cached response is reused, 0 disables
+LLM_REPLAY = os.getenv('LLM_REPLAY', '').lower() in ('1', 'true', 'yes')  # Serve only from the response cache
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))  # Approximate prompt size limit
+PROMPT_SUMMARY_CHARS = 160  # Summaries are truncated to this length in the prompt
+SHARD_SIZE = int(os.getenv('SHARD_SIZE', '20'))  # Larger portfolios are analyzed in shards of this many stocks
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', '4'))  # Shard requests run in parallel
+SKIP_LLM = os.getenv('SKIP_LLM', '').lower() in ('1', 'true', 'yes')  # Use only the local sentiment analysis
+SENTIMENT_MIN_SIGNAL = float(os.getenv('SENTIMENT_MIN_SIGNAL', '0.1'))  # Weaker articles are left out of the prompt
+DELTA_ANALYSIS = os.getenv('DELTA_ANALYSIS', 'true').lower() in ('1', 'true', 'yes')  # Reuse analyses of unchanged symbols
+PRICE_BUCKET_PCT = float(os.getenv('PRICE_BUCKET_PCT', '0.5'))  # Daily-change moves within a bucket count as unchanged
+DELTA_MAX_AGE_HOURS = int(os.getenv('DELTA_MAX_AGE_HOURS', '24'))  # Reused analyses are recomputed after this long
+STREAM_OUTPUT = os.getenv('STREAM_OUTPUT', '').lower() in ('1', 'true', 'yes')  # Render analysis sections as they stream in
+
+# News deduplication
+NEWS_SIMILARITY = float(os.getenv('NEWS_SIMILARITY', '0.7'))  # Title shingle overlap treated as the same story
+NEWS_SEEN_POLICY = os.getenv('NEWS_SEEN_POLICY', 'flag')  # flag|drop|off for articles reported in earlier runs
+NEWS_SEEN_DAYS = int(os.getenv('NEWS_SEEN_DAYS', '14'))  # How long reported articles are remembered
+
+# HTML report
+HTML_PAGE_SIZE = int(os.getenv('HTML_PAGE_SIZE', '100'))  # Longer lists are split into collapsible pages
+HTML_WRITE_BUFFER = 64 * 1024  # Bytes buffered between writes to the report file
+
+# Last-run snapshot, re-rendered by the render command without loading the data stack
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'last_run.json')
+
+# Run archive: one append-only gzip JSONL segment per day, indexed by date and ticker
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')  # Empty disables archiving
+
+# Run metrics
+METRICS_DIR = os.getenv('METRICS_DIR', 'metrics')  # Per-run JSON and Prometheus summaries, empty disables
+PROFILE = os.getenv('PROFILE', '').lower() in ('1', 'true', 'yes')  # Print the slowest stages and symbols after each run
+
+# Daemon schedule (--daemon)
+SCHEDULE_TIMES = [t.strip() for t in os.getenv('SCHEDULE_TIMES', '06:30').split(',') if t.strip()]  # Daily run times, local clock
+SCHEDULE_DAYS = os.getenv('SCHEDULE_DAYS', 'daily')  # daily, weekdays, or names like "mon,wed,fri"
+INTRADAY_MINUTES = int(os.getenv('INTRADAY_MINUTES', '0'))  # Extra runs this often while the market is open, 0 disables
+MARKET_TIMEZONE = 'America/New_York'
+MARKET_OPEN = '09:30'
+MARKET_CLOSE = '16:00'
+
+# How long each ticker.info field stays valid in the fundamentals cache, in hours
+FUNDAMENTAL_TTL_HOURS = _parse_int_mapping(os.getenv(
+    'FUNDAMENTAL_TTL_HOURS', 'longName=168,sector=168,industry=168,marketCap=4,trailingPE=4'
+))
+
+# Groq client, created on first use by _groq_client()
+client = None
+_client_lock = threading.Lock()
+
+def _groq_client():
+    """Return the shared Groq client, creating it on first use"""
+    global client
+    with _client_lock:
+        if client is None:
+            # Retries are handled by _outbound's per-host policy
+            client = groq.Groq(api_key=GROQ_API_KEY, max_retries=0)
+    return client
+
+class RunMetrics:
+    """Wall times, request counts and LLM usage collected during one analysis run"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}    # stage -> {'calls', 'seconds', 'max'}
+        self.symbols = {}   # symbol -> {stage: seconds}
+        self.hosts = {}     # host -> {'requests', 'errors', 'throttled', 'retries', 'seconds', 'max', 'wait'}
+        self.llm = {'calls': 0, 'cached': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'seconds': 0.0}
+    
+    def add_stage(self, stage, seconds, symbol=None):
+        with self.lock:
+            entry = self.stages.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'max': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            if symbol:
+                per_symbol = self.symbols.setdefault(symbol, {})
+                per_symbol[stage] = per_symbol.get(stage, 0.0) + seconds
+    
+    def _host(self, host):
+        return self.hosts.setdefault(host, {'requests': 0, 'errors': 0, 'throttled': 0, 'retries': 0,
+                                            'seconds': 0.0, 'max': 0.0, 'wait': 0.0})
+    
+    def add_request(self, host, seconds, wait, ok=True, throttled=False):
+        with self.lock:
+            entry = self._host(host)
+            entry['requests'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['throttled'] += 1 if throttled else 0
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['wait'] += wait
     
-    news_items = []
+    def add_retry(self, host, delay):
+        with self.lock:
+            entry = self._host(host)
+            entry['retries'] += 1
+            entry['wait'] += delay
     
+    def add_llm(self, seconds, usage=None, cached=False):
+        with self.lock:
+            self.llm['calls'] += 1
+            self.llm['cached'] += 1 if cached else 0
+            self.llm['seconds'] += seconds
+            if usage is not None:
+                self.llm['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+                self.llm['completion_tokens'] += getattr(usage, 'completion_tokens', 0) or 0
+    
+    def summary(self):
+        """Plain-dict view of the run, suitable for JSON"""
+        with self.lock:
+            return {
+                'started': datetime.fromtimestamp(self.started).strftime('%Y-%m-%d %H:%M:%S'),
+                'duration_seconds': round(time.time() - self.started, 3),
+                'stages': {name: {k: round(v, 4) for k, v in entry.items()} for name, entry in self.stages.items()},
+                # A symbol's total is its top-level stages (fundamentals, news); dotted
+                # stages such as news.rss break those down and are not added again
+                'symbols': {
+                    symbol: {'total': round(sum(v for k, v in stages.items() if '.' not in k), 4),
+                             **{k: round(v, 4) for k, v in stages.items()}}
+                    for symbol, stages in self.symbols.items()
+                },
+                'hosts': {host: {k: round(v, 4) for k, v in entry.items()} for host, entry in self.hosts.items()},
+                'llm': {k: round(v, 4) for k, v in self.llm.items()},
+            }
+    
+    def prometheus(self):
+        """Prometheus text exposition of the run summary"""
+        summary = self.summary()
+        lines = []
+        
+        def metric(name, help_text, kind, samples):
+            lines.append(f"# HELP analyst_{name} {help_text}")
+            lines.append(f"# TYPE analyst_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"analyst_{name}{{{label_text}}} {value}" if label_text else f"analyst_{name} {value}")
+        
+        metric('run_duration_seconds', 'Wall time of the last analysis run', 'gauge',
+               [({}, summary['duration_seconds'])])
+        metric('run_timestamp_seconds', 'Start time of the last analysis run', 'gauge',
+               [({}, round(self.started, 3))])
+        stages = summary['stages'].items()
+        metric('stage_seconds', 'Total wall time per pipeline stage', 'gauge',
+               [({'stage': name}, entry['seconds']) for name, entry in stages])
+        metric('stage_calls', 'Times each pipeline stage ran', 'gauge',
+               [({'stage': name}, entry['calls']) for name, entry in stages])
+        metric('symbol_seconds', 'Wall time spent collecting each symbol', 'gauge',
+               [({'symbol': symbol}, entry['total']) for symbol, entry in summary['symbols'].items()])
+        hosts = summary['hosts'].items()
+        metric('http_requests', 'Outbound requests per host', 'gauge',
+               [({'host': host}, entry['requests']) for host, entry in hosts])
+        metric('http_errors', 'Failed outbound requests per host', 'gauge',
+               [({'host': host}, entry['errors']) for host, entry in hosts])
+        metric('http_throttled', 'Outbound requests rejected with 429 or 503 per host', 'gauge',
+               [({'host': host}, entry['throttled']) for host, entry in hosts])
+        metric('http_retries', 'Outbound requests retried after a throttled or transient failure', 'gauge',
+               [({'host': host}, entry['retries']) for host, entry in hosts])
+        metric('http_request_seconds', 'Total outbound request time per host', 'gauge',
+               [({'host': host}, entry['seconds']) for host, entry in hosts])
+        metric('http_request_max_seconds', 'Slowest outbound request per host', 'gauge',
+               [({'host': host}, entry['max']) for host, entry in hosts])
+        metric('http_wait_seconds', 'Time spent waiting for a rate limit token, slot or retry', 'gauge',
+               [({'host': host}, entry['wait']) for host, entry in hosts])
+        for key, help_text in (('calls', 'LLM completions requested'),
+                               ('cached', 'LLM completions served from the cache'),
+                               ('prompt_tokens', 'LLM prompt tokens'),
+                               ('completion_tokens', 'LLM completion tokens'),
+                               ('seconds', 'Wall time spent in LLM completions')):
+            metric(f'llm_{key}', help_text, 'gauge', [({}, summary['llm'][key])])
+        return '\n'.join(lines) + '\n'
+
+_metrics = RunMetrics()
+
+def reset_metrics():
+    """Start collecting metrics for a new run"""
+    global _metrics
+    _metrics = RunMetrics()
+    return _metrics
+
+@contextmanager
+def timed(stage, symbol=None):
+    """Record the wall time of the enclosed block as a pipeline stage"""
+    started = time.perf_counter()
     try:
-        ticker = yf.Ticker(symbol)
+        yield
+    finally:
+        _metrics.add_stage(stage, time.perf_counter() - started, symbol)
+
+def _timed_call(stage, fn, *args, **kwargs):
+    """Call fn inside a timed stage, for work submitted to an executor"""
+    with timed(stage):
+        return fn(*args, **kwargs)
+
+def write_metrics(metrics=None, directory=None):
+    """Write the run summary as run_<timestamp>.json and analyst.prom; returns the JSON path"""
+    metrics = metrics or _metrics
+    directory = METRICS_DIR if directory is None else directory
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    
+    stamp = datetime.fromtimestamp(metrics.started).strftime('%Y%m%d_%H%M%S')
+    json_path = os.path.join(directory, f"run_{stamp}.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics.summary(), f, indent=2)
+    
+    # Replace the Prometheus file atomically so a textfile collector never reads half of it
+    prom_path = os.path.join(directory, 'analyst.prom')
+    with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(metrics.prometheus())
+    os.replace(prom_path + '.tmp', prom_path)
+    return json_path
+
+def format_profile(metrics=None, top=8):
+    """Text report of the slowest stages, symbols and hosts of a run"""
+    summary = (metrics or _metrics).summary()
+    lines = [f"⏱️  Run profile ({summary['duration_seconds']:.2f}s total)", "  Slowest stages:"]
+    stages = sorted(summary['stages'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+    for name, entry in stages[:top]:
+        lines.append(f"    {name:<22} {entry['seconds']:>8.3f}s  {entry['calls']:>5} calls  max {entry['max']:.3f}s")
+    
+    symbols = sorted(summary['symbols'].items(), key=lambda item: item[1]['total'], reverse=True)
+    if symbols:
+        lines.append("  Slowest symbols:")
+        for symbol, entry in symbols[:top]:
+            detail = ', '.join(f"{k} {v:.3f}s" for k, v in entry.items() if k != 'total')
+            lines.append(f"    {symbol:<10} {entry['total']:>8.3f}s  ({detail})")
+    
+    if summary['hosts']:
+        lines.append("  Requests by host:")
+        for host, entry in sorted(summary['hosts'].items(), key=lambda item: item[1]['seconds'], reverse=True):
+            average = entry['seconds'] / entry['requests'] if entry['requests'] else 0
+            lines.append(f"    {host:<22} {entry['requests']:>5} req  {entry['errors']} err  {entry['throttled']} throttled  "
+                         f"{entry['retries']} retries  avg {average:.3f}s  max {entry['max']:.3f}s  waited {entry['wait']:.3f}s")
+    
+    llm = summary['llm']
+    if llm['calls']:
+        lines.append(f"  LLM: {llm['calls']} calls ({llm['cached']} cached), {llm['prompt_tokens']} prompt + "
+                     f"{llm['completion_tokens']} completion tokens, {llm['seconds']:.2f}s")
+    return '\n'.join(lines)
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+class HostLimiter:
+    """Adaptive token bucket, retry budget and circuit breaker for one outbound host
+    
+    The request rate grows by RATE_STEP per success and halves on a
+    throttled (429/503) response, staying between RATE_FLOOR and
+    RATE_CEILING times the configured rate. Retries spend tokens from a budget
+    that successes slowly refill, so a failing host cannot multiply its own load.
+    After BREAKER_THRESHOLD consecutive transient failures (5xx, connection
+    errors) the circuit opens and calls fail
+    fast for BREAKER_COOLDOWN seconds, then a single trial call decides whether
+    it closes again.
+    """
+    
+    def __init__(self, host):
+        self.host = host
+        self.lock = threading.Lock()
+        self.base_rate = HOST_RATES.get(host, DEFAULT_HOST_RATE)
+        self.rate = float(self.base_rate)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased = 0.0
+        self.retry_tokens = float(RETRY_BUDGET)
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_until = 0.0
+        self.trial_owner = None
+    
+    def reserve(self, owner=None):
+        """Take a request token and return how many seconds to wait before sending
+        
+        Raises CircuitOpenError while the circuit is open. Returning the delay rather
+        than sleeping lets threads and asyncio tasks share the same limiter. When
+        this call becomes the half-open trial, owner is remembered for release_trial.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.state == 'half-open':
+                raise CircuitOpenError(f"{self.host} is failing; waiting on a trial request")
+            if self.state == 'open':
+                if now < self.opened_until:
+                    raise CircuitOpenError(f"{self.host} is failing; skipping requests for {self.opened_until - now:.1f}s")
+                self.state = 'half-open'  # This caller is the trial
+                self.trial_owner = owner
+            
+            self.tokens = min(RATE_BURST, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+    
+    def release_trial(self, owner):
+        """Give up owner's half-open trial without an outcome, e.g. when its request was cancelled
         
-        # Method 1: Try to get news from the ticker's news property
+        The circuit goes back to open with its cooldown already over, so the next
+        caller becomes the trial instead of every caller failing on a trial that
+        never reports back.
+        """
+        with self.lock:
+            if self.state == 'half-open' and self.trial_owner is owner:
+                self.state = 'open'
+                self.opened_until = time.monotonic()
+                self.trial_owner = None
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = 'closed'
+            self.retry_tokens = min(RETRY_BUDGET, self.retry_tokens + RETRY_REFUND)
+            # A fixed step per success compounds to about RATE_STEP x 100% growth per second
+            self.rate = min(self.base_rate * RATE_CEILING, self.rate + RATE_STEP)
+    
+    def record_failure(self, kind, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            if kind == 'throttle':
+                # The host is up but busy: slow down rather than count towards the breaker.
+                # Throttles within a second of the last cut come from requests already
+                # in flight and only halve the rate once.
+                if now - self.decreased >= 1:
+                    self.rate = max(RATE_FLOOR, self.rate / 2)
+                    self.tokens = min(self.tokens, 0.0)
+                    self.decreased = now
+                self.paused_until = max(self.paused_until, now + (retry_after or 1 / self.rate))
+            else:
+                self.failures += 1
+            if self.state == 'half-open' or self.failures >= BREAKER_THRESHOLD:
+                if self.state != 'open':
+                    print(f"  🔌 Circuit open for {self.host} after {self.failures} failures; pausing {BREAKER_COOLDOWN}s")
+                self.state = 'open'
+                self.opened_until = now + BREAKER_COOLDOWN
+    
+    def retry_delay(self, attempt, retry_after=None):
+        """Backoff before retry number attempt+1, or None when out of attempts, budget or circuit"""
+        with self.lock:
+            if attempt + 1 >= RETRY_ATTEMPTS or self.retry_tokens < 1 or self.state == 'open':
+                return None
+            self.retry_tokens -= 1
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+def _failure_kind(error=None, result=None):
+    """Classify an outbound call: 'throttle' (429/503), 'transient' (5xx, connection), or None
+    
+    Works on httpx responses, Groq API errors and yfinance exceptions without
+    importing any of them.
+    """
+    response = getattr(error, 'response', None) if error is not None else result
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status in (429, 503):
+        return 'throttle'
+    if isinstance(status, int) and status >= 500:
+        return 'transient'
+    if error is not None:
+        name, text = type(error).__name__, str(error)
+        if 'RateLimit' in name or 'Too Many Requests' in text or ' 429' in text:
+            return 'throttle'
+        if isinstance(error, (ConnectionError, TimeoutError)) or name.endswith('Timeout') or name in (
+                'ConnectionError', 'ConnectError', 'ReadError', 'RemoteProtocolError', 'APIConnectionError', 'APITimeoutError'):
+            return 'transient'
+    return None
+
+def _retry_after(error=None, result=None):
+    """Seconds from a Retry-After header, if the response carried one"""
+    response = getattr(error, 'response', None) if error is not None else result
+    value = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    try:
+        return min(float(value), RETRY_MAX_DELAY) if value else None
+    except (TypeError, ValueError):
+        return None
+
+_host_semaphores = {}
+_host_limiters = {}
+_host_semaphores_lock = threading.Lock()
+
+def _host_limiter(host):
+    """Return the shared HostLimiter for a host"""
+    with _host_semaphores_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = _host_limiters[host] = HostLimiter(host)
+        return limiter
+
+def _settle_attempt(host, limiter, attempt, error, result):
+    """Feed one attempt's outcome to the host limiter; return the backoff before a retry, or None"""
+    kind = _failure_kind(error, result)
+    if kind is None:
+        limiter.record_success()
+        return None
+    retry_after = _retry_after(error, result)
+    limiter.record_failure(kind, retry_after)
+    backoff = limiter.retry_delay(attempt, retry_after)
+    if backoff is not None:
+        _metrics.add_retry(host, backoff)
+    return backoff
+
+def _record_attempt(host, queued, started, error, result):
+    kind = _failure_kind(error, result)
+    _metrics.add_request(host, time.perf_counter() - started, started - queued,
+                         ok=error is None and kind is None, throttled=kind == 'throttle')
+
+def _outbound(host, fn, *args, **kwargs):
+    """Run a blocking network call under the host's rate limit, concurrency limit and retry policy
+    
+    Throttled (429/503) and transient (5xx, connection) failures are retried with
+    jittered exponential backoff while the host's retry budget allows; other
+    errors propagate immediately. A response object with a failing status is
+    returned as-is once retries run out, so callers keep their own status checks.
+    Each attempt's latency, wait and outcome are recorded per host in the run metrics.
+    """
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+            _host_semaphores[host] = semaphore
+    limiter = _host_limiter(host)
+    owner = object()
+    
+    attempt = 0
+    try:
+        while True:
+            queued = time.perf_counter()
+            delay = limiter.reserve(owner)
+            if delay > 0:
+                time.sleep(delay)
+            with semaphore:
+                started = time.perf_counter()
+                error, result = None, None
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                _record_attempt(host, queued, started, error, result)
+            
+            backoff = _settle_attempt(host, limiter, attempt, error, result)
+            if backoff is None:
+                break
+            time.sleep(backoff)
+            attempt += 1
+    except BaseException:
+        # Interrupted before reporting back (e.g. KeyboardInterrupt): a pending trial must not block the host
+        limiter.release_trial(owner)
+        raise
+    
+    if error is not None:
+        raise error
+    return result
+
+async def _outbound_async(host, semaphores, fn, *args, **kwargs):
+    """Await a network coroutine under the same per-host rate limit and retry policy as _outbound
+    
+    semaphores maps hosts to asyncio semaphores owned by the running event loop.
+    A throttled streamed response is closed before it is retried. Cancelling the
+    call releases its half-open circuit trial, if it held one.
+    """
+    semaphore = semaphores.get(host)
+    if semaphore is None:
+        semaphore = semaphores[host] = asyncio.Semaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+    limiter = _host_limiter(host)
+    owner = object()
+    
+    attempt = 0
+    try:
+        while True:
+            queued = time.perf_counter()
+            delay = limiter.reserve(owner)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                started = time.perf_counter()
+                error, result = None, None
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                _record_attempt(host, queued, started, error, result)
+            
+            backoff = _settle_attempt(host, limiter, attempt, error, result)
+            if backoff is None:
+                break
+            if result is not None:
+                await result.aclose()
+            await asyncio.sleep(backoff)
+            attempt += 1
+    except BaseException:
+        # A hedged fetch cancels the losing sources; if one of them was the
+        # half-open trial, the circuit must not wait on it forever
+        limiter.release_trial(owner)
+        raise
+    
+    if error is not None:
+        raise error
+    return result
+
+_db_conn = None
+_db_lock = threading.RLock()
+
+def _db():
+    """Return the shared SQLite connection backing the on-disk caches"""
+    global _db_conn
+    with _db_lock:
+        if _db_conn is None:
+            _db_conn = sqlite3.connect(CACHE_DB, check_same_thread=False)
+            _db_conn.execute('PRAGMA journal_mode=WAL')
+            new_latest_bars = not _db_conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'latest_bars'").fetchone()
+            _db_conn.executescript("""
+                CREATE TABLE IF NOT EXISTS price_bars (
+                    symbol TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, date)
+                );
+                CREATE TABLE IF NOT EXISTS price_sync (
+                    symbol TEXT PRIMARY KEY, last_date TEXT, synced_at REAL, period TEXT
+                );
+                CREATE TABLE IF NOT EXISTS latest_bars (
+                    symbol TEXT PRIMARY KEY, date TEXT, close REAL, volume REAL, prev_date TEXT, prev_close REAL
+                );
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    symbol TEXT, field TEXT, value TEXT, fetched_at REAL,
+                    PRIMARY KEY (symbol, field)
+                );
+                CREATE TABLE IF NOT EXISTS feeds (
+                    url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, entries TEXT, fetched_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS seen_news (
+                    key TEXT PRIMARY KEY, title TEXT, first_seen REAL
+                );
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY, response TEXT, created_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS symbol_state (
+                    symbol TEXT PRIMARY KEY, fingerprint TEXT, news_ids TEXT, analysis TEXT, updated_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS market_state (
+                    fingerprint TEXT PRIMARY KEY, analysis TEXT, updated_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS news_sources (
+                    symbol TEXT, source TEXT, hit_rate REAL, latency REAL, samples INTEGER, updated_at REAL,
+                    PRIMARY KEY (symbol, source)
+                );
+            """)
+            # Stores created before backfill periods were tracked
+            if 'period' not in {row[1] for row in _db_conn.execute('PRAGMA table_info(price_sync)')}:
+                _db_conn.execute('ALTER TABLE price_sync ADD COLUMN period TEXT')
+            # Stores created before the latest bars were kept separately
+            if new_latest_bars:
+                with _db_conn:
+                    _refresh_latest_bars(_db_conn, [row[0] for row in _db_conn.execute('SELECT symbol FROM price_sync')])
+        return _db_conn
+
+FEED_USER_AGENT = 'Mozilla/5.0 (compatible; FinancialAnalyst/0.1)'
+_feed_ssl_context = None
+
+def _feed_ssl():
+    """SSL context for the ingestion clients, built once so later runs start their client cheaply"""
+    global _feed_ssl_context
+    if _feed_ssl_context is None:
+        _feed_ssl_context = httpx.create_ssl_context()
+    return _feed_ssl_context
+
+def _feed_entry(entry):
+    """Reduce a parsed feed entry to the fields the news fetchers use"""
+    return {
+        'title': entry.get('title', ''),
+        'link': entry.get('link', ''),
+        'source': entry.get('source', {}).get('title', 'Google News'),
+        'published': entry.get('published', 'Recent'),
+        'summary': entry.get('summary', '')
+    }
+
+# Feed element -> _feed_entry key; the first of several candidates wins
+_FEED_FIELDS = {'title': 'title', 'pubDate': 'published', 'published': 'published', 'updated': 'published',
+                'description': 'summary', 'summary': 'summary', 'content': 'summary'}
+
+class FeedParser:
+    """Incremental RSS 2.0 / Atom parser that keeps only the fields _feed_entry uses
+    
+    Bytes are fed as they arrive; each item is cleared once read, and feed()
+    returns True as soon as max_entries entries are complete, so the caller can
+    stop reading. Raises ElementTree.ParseError on malformed XML.
+    """
+    
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self.entries = []
+        self._parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        self._entry = None
+        self._depth = 0
+        self._entry_depth = 0
+    
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                self._depth += 1
+                if self._entry is None and element.tag.rpartition('}')[2] in ('item', 'entry'):
+                    self._entry, self._entry_depth = {}, self._depth
+                continue
+            
+            self._depth -= 1
+            entry = self._entry
+            if entry is None:
+                continue
+            tag = element.tag.rpartition('}')[2]
+            if self._depth == self._entry_depth - 1:
+                self.entries.append(_feed_entry(entry))
+                self._entry = None
+                element.clear()
+                if self.max_entries and len(self.entries) >= self.max_entries:
+                    return True
+            elif self._depth == self._entry_depth:
+                # Only the item's own children; Atom <source> has a nested <title>
+                if tag == 'link':
+                    entry.setdefault('link', element.get('href') or (element.text or '').strip())
+                elif tag == 'source':
+                    entry['source'] = {'title': element.findtext('{*}title') or element.text or ''}
+                elif tag in _FEED_FIELDS:
+                    entry.setdefault(_FEED_FIELDS[tag], ''.join(element.itertext()))
+        return False
+    
+    def close(self):
+        self._parser.close()
+        return self.entries
+
+def parse_feed(chunks, max_entries=None):
+    """Parse entries from an iterable of byte chunks, reading no further than max_entries"""
+    parser = FeedParser(max_entries)
+    for chunk in chunks:
+        if parser.feed(chunk):
+            return parser.entries
+    return parser.close()
+
+async def _read_feed(response):
+    """Parse a streamed feed response, then leave its connection ready for reuse
+    
+    What is left after FEED_MAX_ENTRIES is drained unparsed when it is small, so the
+    connection goes back to the pool, and abandoned otherwise. Malformed feeds fall
+    back to feedparser, which tolerates broken XML.
+    """
+    parser = FeedParser(FEED_MAX_ENTRIES)
+    body = []
+    chunks = response.aiter_bytes(FEED_CHUNK_BYTES)
+    try:
         try:
-            news = ticker.news
-            if news:
-                for item in news[:max_articles]:
-                    try:
-                        title = item.get('title', '').strip()
-                        if not title:
-                            continue
-                            
-                        published_date = datetime.fromtimestamp(
-                            item.get('providerPublishTime', time.time())
-                        ).strftime('%Y-%m-%d %H:%M')
-                        
-                        news_item = {
-                            'title': title,
-                            'publisher': item.get('publisher', 'Yahoo Finance').strip(),
-                            'link': item.get('link', '').strip() or item.get('url', '').strip(),
-                            'published': published_date,
-                            'summary': (item.get('summary') or item.get('description') or 'No summary available')[:300].strip()
-                        }
-                        
-                        news_items.append(news_item)
-                        print(f"    ✓ [{published_date}] {news_item['title'][:60]}... ({news_item['publisher']})")
-                        
-                    except Exception as e:
-                        print(f"    ⚠️  Error processing article: {e}")
-        except Exception as e:
-            print(f"    ⚠️  Error fetching news (method 1) for {symbol}: {e}")
+            async for chunk in chunks:
+                body.append(chunk)
+                if parser.feed(chunk):
+                    return parser.entries
+            return parser.close()
+        except ElementTree.ParseError:
+            body.extend([chunk async for chunk in chunks])
+            return [_feed_entry(entry) for entry in feedparser.parse(b''.join(body)).entries[:FEED_MAX_ENTRIES]]
+    finally:
+        drained = 0
+        async for chunk in chunks:
+            drained += len(chunk)
+            if drained > FEED_DRAIN_BYTES:
+                break
+        await response.aclose()
+
+def _cached_feed(url):
+    """Return the feeds cache row for url: (etag, last_modified, entries JSON, fetched_at), or None"""
+    with _db_lock:
+        return _db().execute(
+            'SELECT etag, last_modified, entries, fetched_at FROM feeds WHERE url = ?', (url,)).fetchone()
+
+def _store_feed(url, etag, last_modified, entries, fetched_at):
+    with _db_lock:
+        conn = _db()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?)',
+                         (url, etag, last_modified, json.dumps(entries), fetched_at))
+
+async def fetch_feed(client, url, semaphores):
+    """Fetch an RSS feed through the shared cache, using conditional GETs to skip unchanged feeds
+    
+    client is the ingestion run's httpx.AsyncClient and semaphores its per-host
+    limits (see _outbound_async).
+    """
+    cached = _cached_feed(url)
+    now = time.time()
+    if cached and now - cached[3] < FEED_FRESH_SECONDS:
+        return json.loads(cached[2])
+    
+    headers = {}
+    if cached and cached[0]:
+        headers['If-None-Match'] = cached[0]
+    if cached and cached[1]:
+        headers['If-Modified-Since'] = cached[1]
+    
+    try:
+        request = client.build_request('GET', url, headers=headers)
+        response = await _outbound_async(urllib.parse.urlparse(url).netloc, semaphores, client.send, request, stream=True)
+        if response.status_code == 304 and cached:
+            await response.aclose()
+            entries = json.loads(cached[2])
+            etag, last_modified = cached[0], cached[1]
+        else:
+            if not response.is_success:
+                await response.aclose()
+            response.raise_for_status()
+            entries = await _read_feed(response)
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+    except Exception as e:
+        if not cached:
+            raise
+        print(f"    ⚠️  Using stale feed for {url}: {e}")
+        return json.loads(cached[2])
+    
+    _store_feed(url, etag, last_modified, entries, now)
+    return entries
+
+# MinHash/LSH parameters for near-duplicate titles: 20 bands of 3 rows
+_MINHASH_BANDS = 20
+_MINHASH_ROWS = 3
+_MINHASH_PRIME = (1 << 31) - 1
+_minhash_rng = random.Random(1337)
+_MINHASH_A = [_minhash_rng.randrange(1, _MINHASH_PRIME) for _ in range(_MINHASH_BANDS * _MINHASH_ROWS)]
+_MINHASH_B = [_minhash_rng.randrange(0, _MINHASH_PRIME) for _ in range(_MINHASH_BANDS * _MINHASH_ROWS)]
+_minhash_arrays = None
+
+def _normalize_title(title):
+    """Lowercase a headline and strip punctuation and the trailing ' - Publisher' suffix"""
+    title = re.sub(r'\s+-\s+[^-]+$', '', title.lower())
+    return ' '.join(re.findall(r'[a-z0-9]+', title))
+
+def _title_key(normalized):
+    """Stable ID of a normalized title, shared by the dedup index and the symbol state"""
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+# Function words a rewrite adds or drops ("holds rates" -> "holds interest rates and")
+_TITLE_STOPWORDS = frozenset('a an and the of to in on for as at by with from is are its'.split())
+
+def _title_shingles(normalized):
+    """Word unigram and bigram shingles of a normalized title, ignoring function words"""
+    words = [word for word in normalized.split() if word not in _TITLE_STOPWORDS] or normalized.split() or ['']
+    return set(words) | {f'{a} {b}' for a, b in zip(words, words[1:])}
+
+def _minhash_bands(shingles):
+    """MinHash signature of a shingle set, split into LSH band keys"""
+    global _minhash_arrays
+    if _minhash_arrays is None:
+        _minhash_arrays = (np.array(_MINHASH_A, dtype=np.uint64)[:, None], np.array(_MINHASH_B, dtype=np.uint64)[:, None])
+    a, b = _minhash_arrays
+    hashes = np.array([zlib.crc32(shingle.encode()) for shingle in shingles], dtype=np.uint64)
+    signature = ((a * hashes[None, :] + b) % _MINHASH_PRIME).min(axis=1)
+    rows = signature.reshape(_MINHASH_BANDS, _MINHASH_ROWS)
+    return [(band, row.tobytes()) for band, row in enumerate(rows)]
+
+class NewsDeduper:
+    """Drops exact and near-duplicate articles across every feed collected in a run
+    
+    Exact repeats are caught run-wide by a hash set of normalized titles,
+    syndicated copies with reworded titles by MinHash/LSH over title shingles.
+    Near duplicates only count within one symbol's news or against market news,
+    so "Apple shares rise after earnings" does not hide the same headline about
+    Microsoft. Articles reported in earlier runs are flagged or dropped
+    according to NEWS_SEEN_POLICY.
+    """
+    
+    def __init__(self):
+        self._keys = set()
+        self._kept = []
+        self._shingle_sets = []
+        self._scopes = []
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def add(self, news_item, symbol=None):
+        """Register an article from symbol's news (None for market news), returning False if it should be skipped"""
+        normalized = _normalize_title(news_item['title'])
+        key = _title_key(normalized)
+        shingles = _title_shingles(normalized)
+        bands = _minhash_bands(shingles)
         
-        # Method 2: Try to get news from the ticker's info
-        if not news_items:
-            try:
-                info = ticker.info
-                if 'news' in info:
-                    for item in info['news'][:max_articles]:
-                        try:
-                            title = item.get('title', '').strip()
-                            if not title:
-                                continue
-                                
-                            published_date = datetime.fromtimestamp(
-                                item.get('providerPublishTime', time.time())
-                            ).strftime('%Y-%m-%d %H:%M')
-                            
-                            news_item = {
-                                'title': title,
-                                'publisher': item.get('publisher', 'Yahoo Finance').strip(),
-                                'link': item.get('link', '').strip() or item.get('url', '').strip(),
-                                'published': published_date,
-                                'summary': (item.get('summary') or item.get('description') or 'No summary available')[:300].strip()
-                            }
-                            
-                            news_items.append(news_item)
-                            print(f"    ✓ [{published_date}] {news_item['title'][:60]}... ({news_item['publisher']})")
-                            
-                        except Exception as e:
-                            print(f"    ⚠️  Error processing article (method 2): {e}")
-            except Exception as e:
-                print(f"    ⚠️  Error fetching news (method 2) for {symbol}: {e}")
+        with self._lock:
+            if key in self._keys:
+                return False
+            
+            # Only titles sharing at least two LSH bands are compared exactly
+            collisions = Counter()
+            for band in bands:
+                collisions.update(self._buckets.get(band, ()))
+            for index, count in collisions.items():
+                if count < 2:
+                    continue
+                if symbol is not None and self._scopes[index] not in (symbol, None):
+                    continue
+                other = self._shingle_sets[index]
+                if len(shingles & other) / len(shingles | other) >= NEWS_SIMILARITY:
+                    return False
+            
+            seen_before = NEWS_SEEN_POLICY != 'off' and self._seen_before(key)
+            if seen_before and NEWS_SEEN_POLICY == 'drop':
+                return False
+            
+            self._keys.add(key)
+            self._kept.append((key, news_item['title']))
+            self._shingle_sets.append(shingles)
+            self._scopes.append(symbol)
+            for band in bands:
+                self._buckets.setdefault(band, []).append(len(self._shingle_sets) - 1)
+        
+        if seen_before:
+            news_item['seen_before'] = True
+        return True
+    
+    def _seen_before(self, key):
+        with _db_lock:
+            return _db().execute('SELECT 1 FROM seen_news WHERE key = ?', (key,)).fetchone() is not None
+    
+    def remember(self):
+        """Record this run's articles in the persistent seen store and expire old entries"""
+        now = time.time()
+        with self._lock:
+            rows = [(key, title, now) for key, title in self._kept]
+        with _db_lock:
+            conn = _db()
+            with conn:
+                conn.executemany('INSERT OR IGNORE INTO seen_news VALUES (?, ?, ?)', rows)
+                conn.execute('DELETE FROM seen_news WHERE first_seen < ?', (now - NEWS_SEEN_DAYS * 86400,))
+
+# General market news comes from these Google News searches, up to 4 articles each
+MARKET_NEWS_QUERIES = ["stock market today", "S&P 500 nasdaq", "federal reserve interest rates"]
+MARKET_NEWS_PER_QUERY = 4
+
+def _google_news_url(query):
+    return f"{GOOGLE_NEWS_URL}/rss/search?q={urllib.parse.quote_plus(query)}&hl=en-US&gl=US&ceid=US:en"
+
+def _yahoo_news_item(item):
+    """News item from a Yahoo Finance article dict, or None if it has no title"""
+    title = item.get('title', '').strip()
+    if not title:
+        return None
+    return {
+        'title': title,
+        'publisher': item.get('publisher', 'Yahoo Finance').strip(),
+        'link': item.get('link', '').strip() or item.get('url', '').strip(),
+        'published': datetime.fromtimestamp(item.get('providerPublishTime', time.time())).strftime('%Y-%m-%d %H:%M'),
+        'summary': (item.get('summary') or item.get('description') or 'No summary available')[:300].strip()
+    }
+
+def _feed_news_item(entry):
+    """News item from a parsed feed entry, or None if it has no title"""
+    title = entry['title'].strip()
+    if not title:
+        return None
+    return {
+        'title': title,
+        'publisher': entry['source'].strip(),
+        'link': entry['link'].strip(),
+        'published': entry['published'],
+        'summary': (entry['summary'] or 'No summary available')[:300].strip()
+    }
+
+def _news_items(raw, build, limit, label):
+    """Build news items from the first limit raw articles, skipping malformed ones"""
+    items = []
+    for entry in raw[:limit]:
+        try:
+            item = build(entry)
+            if item:
+                items.append(item)
+        except Exception as e:
+            print(f"    ⚠️  Error processing {label} article: {e}")
+    return items
+
+class NewsSourceStats:
+    """Hit rate and latency of each news source per symbol, which order the hedged fetch
+    
+    A hit is a source delivering the full max_articles items. Both figures are
+    exponentially weighted, so the order follows sources that improve or degrade.
+    """
+    
+    def __init__(self, symbols=()):
+        self._stats = {}
+        self._changed = set()
+        self._loaded = set()
+        self.load(symbols)
+    
+    def load(self, symbols):
+        """Read the stored stats of symbols not loaded yet"""
+        symbols = [symbol for symbol in symbols if symbol not in self._loaded]
+        self._loaded.update(symbols)
+        with _db_lock:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for symbol, source, hit_rate, latency, samples in _db().execute(
+                        f'SELECT symbol, source, hit_rate, latency, samples FROM news_sources WHERE symbol IN ({placeholders})', chunk):
+                    self._stats[symbol, source] = [hit_rate, latency, samples]
+    
+    def order(self, symbol):
+        """Sources by expected time to a full result, counting each expected miss as a hedge delay
         
-        # Method 3: Fallback to company name search if no news found
-        if not news_items:
+        Sources never measured for the symbol follow the measured ones in
+        NEWS_SOURCES order; they are measured whenever the fetch hedges.
+        """
+        def cost(source):
+            stats = self._stats.get((symbol, source))
+            if stats is None:
+                return math.inf
+            hit_rate, latency, _ = stats
+            return (latency + NEWS_HEDGE_DELAY) / max(hit_rate, 0.05)
+        return sorted(NEWS_SOURCES, key=cost)
+    
+    def record(self, symbol, source, seconds, hit):
+        stats = self._stats.setdefault((symbol, source), [0.5, seconds, 0])
+        stats[0] += NEWS_SOURCE_DECAY * (float(hit) - stats[0])
+        stats[1] += NEWS_SOURCE_DECAY * (seconds - stats[1])
+        stats[2] += 1
+        self._changed.add((symbol, source))
+    
+    def save(self):
+        now = time.time()
+        rows = [(symbol, source, *self._stats[symbol, source], now) for symbol, source in self._changed]
+        with _db_lock:
+            conn = _db()
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO news_sources VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._changed.clear()
+
+async def _ticker_news(client, semaphores, symbol, info, max_articles):
+    # yfinance is synchronous, so its call runs on the loop's thread pool
+    ticker = yf.Ticker(symbol)
+    news = await asyncio.to_thread(_outbound, YAHOO_HOST, lambda: ticker.news)
+    return _news_items(news or [], _yahoo_news_item, max_articles, 'Yahoo Finance')
+
+async def _info_news(client, semaphores, symbol, info, max_articles):
+    return _news_items(info.get('news') or [], _yahoo_news_item, max_articles, 'Yahoo Finance')
+
+async def _rss_news(client, semaphores, symbol, info, max_articles):
+    entries = await fetch_feed(client, _google_news_url(f"{info.get('longName', symbol)} stock news"), semaphores)
+    return _news_items(entries, _feed_news_item, max_articles, 'Google News')
+
+_NEWS_FETCHERS = {'ticker': _ticker_news, 'info': _info_news, 'rss': _rss_news}
+
+async def _stock_news(client, semaphores, symbol, info, stats, max_articles=3):
+    """News for one stock, hedged across its sources
+    
+    The source with the best record for the symbol starts first. The others
+    start alongside it once it comes back short or NEWS_HEDGE_DELAY passes. The
+    first source to deliver max_articles items wins and the rest are cancelled;
+    at NEWS_DEADLINE the fullest result so far is used. The info source is
+    skipped when the fundamentals came from the cache, which keeps no news,
+    so its absence is not recorded as a miss.
+    """
+    order = [source for source in stats.order(symbol) if source != 'info' or 'news' in info]
+    if not order:
+        return []
+    began = time.perf_counter()
+    tasks, started, results = {}, {}, {}
+    
+    async def fetch(source):
+        try:
+            return await _NEWS_FETCHERS[source](client, semaphores, symbol, info, max_articles)
+        except Exception as e:
+            print(f"    ⚠️  Error fetching news ({source}) for {symbol}: {e}")
+            return []
+    
+    def start(source):
+        started[source] = time.perf_counter()
+        tasks[asyncio.ensure_future(fetch(source))] = source
+    
+    start(order[0])
+    pending, hedged, winner = set(tasks), False, None
+    while pending and winner is None:
+        wake = began + NEWS_DEADLINE if hedged else began + min(NEWS_HEDGE_DELAY, NEWS_DEADLINE)
+        done, pending = await asyncio.wait(pending, timeout=max(wake - time.perf_counter(), 0),
+                                           return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            source = tasks[task]
+            results[source] = task.result()
+            elapsed = time.perf_counter() - started[source]
+            stats.record(symbol, source, elapsed, len(results[source]) >= max_articles)
+            _metrics.add_stage(f'news.{source}', elapsed, symbol)
+            if winner is None and len(results[source]) >= max_articles:
+                winner = source
+        if winner is None and not hedged and (not pending or time.perf_counter() >= wake):
+            hedged = True
+            for source in order[1:]:
+                start(source)
+            pending = {task for task, source in tasks.items() if source not in results}
+        elif winner is None and hedged and time.perf_counter() >= wake:
+            break
+    
+    for task in pending:
+        task.cancel()
+        source = tasks[task]
+        # Only a source that outlasted the hedge delay is known to be slow
+        if time.perf_counter() - started[source] >= NEWS_HEDGE_DELAY:
+            stats.record(symbol, source, time.perf_counter() - started[source], False)
+    if pending:
+        # Lets cancelled feeds release their connections; a cancelled yfinance call finishes on its thread
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    if winner is None and results:
+        winner = max(results, key=lambda source: (len(results[source]), -order.index(source)))
+    return results.get(winner, [])
+
+async def stream_news(client, semaphores, stocks, stats, max_articles=3, market=True):
+    """Yield (position, symbol, news_items) for each news source as it completes
+    
+    The market queries come first (symbol None), then one source per stock.
+    stocks maps each symbol to its fundamentals, or to a concurrent Future that
+    resolves to them, so a stock's news is fetched as soon as its fundamentals
+    arrive. position is the source's place in that order. At most
+    NEWS_CONCURRENCY stocks are fetched at once, so a stock's NEWS_DEADLINE is
+    not spent queueing behind the others.
+    """
+    slots = asyncio.Semaphore(NEWS_CONCURRENCY)
+    
+    async def market_source(position, query):
+        started = time.perf_counter()
+        try:
+            entries = await fetch_feed(client, _google_news_url(query), semaphores)
+            items = _news_items(entries, _feed_news_item, MARKET_NEWS_PER_QUERY, 'market news')
+        except Exception as e:
+            print(f"    ⚠️  Error fetching news for query '{query}': {e}")
+            items = []
+        _metrics.add_stage('news.market', time.perf_counter() - started)
+        return position, None, items
+    
+    async def stock_source(position, symbol, info):
+        if isinstance(info, Future):
             try:
-                search_query = f"{company_name} stock news"
-                encoded_query = urllib.parse.quote_plus(search_query)
-                rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
-                feed = feedparser.parse(rss_url)
-                
-                for entry in feed.entries[:max_articles]:
-                    try:
-                        title = entry.title.strip()
-                        if not title or any(n['title'] == title for n in news_items):
-                            continue
-                            
-                        news_item = {
-                            'title': title,
-                            'publisher': getattr(entry, 'source', {}).get('title', 'Google News').strip(),
-                            'link': entry.link.strip(),
-                            'published': entry.get('published', 'Recent'),
-                            'summary': (getattr(entry, 'summary', '') or 'No summary available')[:300].strip()
-                        }
-                        
-                        news_items.append(news_item)
-                        print(f"    ✓ [{news_item['published']}] {news_item['title'][:60]}... ({news_item['publisher']})")
-                        
-                        if len(news_items) >= max_articles:
-                            break
-                            
-                    except Exception as e:
-                        print(f"    ⚠️  Error processing Google News article: {e}")
-                        
-            except Exception as e:
-                print(f"    ⚠️  Error fetching Google News for {symbol}: {e}")
+                info = await asyncio.wrap_future(info)
+            except Exception:
+                # collect_market_data reports the failed fundamentals fetch
+                return position, symbol, []
+        async with slots:
+            with timed('news', symbol):
+                items = await _stock_news(client, semaphores, symbol, info, stats, max_articles)
+        return position, symbol, items
+    
+    sources = [market_source(position, query) for position, query in enumerate(MARKET_NEWS_QUERIES)] if market else []
+    sources += [stock_source(position, symbol, info) for position, (symbol, info) in enumerate(stocks.items(), len(sources))]
+    for source in asyncio.as_completed(sources):
+        yield await source
+
+class IngestionLoop:
+    """Event loop thread that owns the news ingestion's HTTP client between runs
+    
+    Started on first use and kept for the life of the process, so in daemon mode
+    feed connections, host semaphores, the yfinance thread pool and news source
+    stats carry over from one run to the next. run() may be called from any
+    other thread, including one that is running its own event loop.
+    """
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        # Bounds the threads running yfinance calls, like the collection executor
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=MAX_WORKERS))
+        self.thread = threading.Thread(target=self.loop.run_forever, name='news-ingestion', daemon=True)
+        self.thread.start()
+        self.client = None
+        self.semaphores = {}
+        self.stats = NewsSourceStats()
+    
+    def run(self, coroutine_fn, *args):
+        """Run coroutine_fn(self, *args) on the loop and wait for its result"""
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("IngestionLoop.run() called from the ingestion loop itself")
+        return asyncio.run_coroutine_threadsafe(coroutine_fn(self, *args), self.loop).result()
+    
+    async def open_client(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=FEED_TIMEOUT, headers={'User-Agent': FEED_USER_AGENT},
+                                            follow_redirects=True, verify=_feed_ssl())
+        return self.client
+    
+    def close(self):
+        """Close the HTTP client and stop the loop; later calls do nothing"""
+        if self.loop.is_closed() or not self.thread.is_alive():
+            return
+        try:
+            if self.client is not None:
+                asyncio.run_coroutine_threadsafe(self.client.aclose(), self.loop).result(timeout=5)
+        except Exception as e:
+            print(f"  ⚠️  Error closing news connections: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        if not self.thread.is_alive():
+            self.loop.close()
+
+_ingestion_loop = None
+_ingestion_loop_lock = threading.Lock()
+
+def ingestion_loop():
+    """Return the process-wide IngestionLoop, starting it on first use"""
+    global _ingestion_loop
+    with _ingestion_loop_lock:
+        if _ingestion_loop is None:
+            _ingestion_loop = IngestionLoop()
+            atexit.register(_ingestion_loop.close)
+        return _ingestion_loop
+
+async def _ingest_news(ingestion, stocks, max_articles, market_articles, dedup):
+    client = await ingestion.open_client()
+    stats = ingestion.stats
+    stats.load(stocks)
+    market_news, stock_news = [], {symbol: [] for symbol in stocks}
+    arrived, next_position = {}, 0
+    
+    async for position, symbol, items in stream_news(client, ingestion.semaphores, stocks, stats, max_articles,
+                                                     market_articles > 0):
+        arrived[position] = (symbol, items)
+        # Sources are deduplicated in source order, not arrival order, so the same
+        # copy of a syndicated story is kept whichever feed answers first
+        while next_position in arrived:
+            symbol, items = arrived.pop(next_position)
+            next_position += 1
+            kept = market_news if symbol is None else stock_news[symbol]
+            for item in items:
+                if dedup.add(item, symbol):
+                    kept.append(item)
+                    print(f"    ✓ [{symbol or 'market'}] [{item['published']}] {item['title'][:60]}... ({item['publisher']})")
+    
+    try:
+        stats.save()
+    except Exception as e:
+        print(f"  ⚠️  Error updating news source stats: {e}")
+    return market_news[:market_articles], {symbol: items[:max_articles] for symbol, items in stock_news.items()}
+
+def ingest_news(stocks, max_articles=3, market_articles=10, dedup=None):  # Reduced from 10 to 3 per stock
+    """Fetch market news and every stock's news concurrently on the shared ingestion loop
+    
+    stocks maps symbols to fundamentals or to Futures of them (see stream_news).
+    Pass a shared NewsDeduper to drop stories already collected from other feeds.
+    Returns (market_news, {symbol: news}). Blocks the calling thread until the
+    news is in; async callers should run it through asyncio.to_thread.
+    """
+    print(f"  📰 Fetching market news and news for {len(stocks)} stocks...")
+    market_news, stock_news = ingestion_loop().run(_ingest_news, stocks, max_articles, market_articles,
+                                                   dedup or NewsDeduper())
+    print(f"    📊 Total: {len(market_news)} market articles, "
+          f"{sum(len(items) for items in stock_news.values())} stock articles collected")
+    return market_news, stock_news
+
+def fetch_news_for_stock(symbol, company_name, max_articles=3, info=None, dedup=None):
+    """Fetch recent news articles for a single stock (see ingest_news for whole portfolios)"""
+    return ingest_news({symbol: {**(info or {}), 'longName': company_name}}, max_articles=max_articles,
+                       market_articles=0, dedup=dedup)[1][symbol]
+
+def fetch_market_news(max_articles=3, dedup=None):
+    """Fetch general market news (see ingest_news)"""
+    return ingest_news({}, market_articles=max_articles, dedup=dedup)[0]
+
+def _fetch_history(symbol, **range_kwargs):
+    """Fetch OHLCV history for a single symbol"""
+    try:
+        ticker = yf.Ticker(symbol)
+        return _outbound(YAHOO_HOST, ticker.history, **range_kwargs)
+    except Exception as e:
+        print(f"  ⚠️  Error fetching price history for {symbol}: {e}")
+        return None
+
+def _download_batch(symbols, **range_kwargs):
+    """Download OHLCV for a batch of symbols with one yf.download call
+    
+    yfinance has no multi-symbol chart endpoint: the call fetches each symbol's
+    history in turn, so a batch holds one host slot for len(symbols) requests.
+    Symbols yfinance fails on (including throttled ones) are left out of the result.
+    """
+    histories = {}
+    try:
+        frame = _outbound(YAHOO_HOST, yf.download, symbols, group_by='ticker',
+                          auto_adjust=True, threads=False, progress=False, **range_kwargs)
+        if frame is None or frame.empty:
+            return histories
         
+        batch_symbols = set(frame.columns.get_level_values(0)) if frame.columns.nlevels > 1 else set()
+        for symbol in symbols:
+            if symbol in batch_symbols:
+                hist = frame[symbol].dropna(subset=['Close'])
+            elif frame.columns.nlevels == 1 and len(symbols) == 1:
+                hist = frame.dropna(subset=['Close'])
+            else:
+                continue
+            if not hist.empty:
+                histories[symbol] = hist
     except Exception as e:
-        print(f"    ⚠️  Error in fetch_news_for_stock for {symbol}: {e}")
+        print(f"  ⚠️  Batched price download failed for {len(symbols)} symbols: {e}")
+    return histories
+
+def fetch_price_history(symbols, **range_kwargs):
+    """Fetch OHLCV for all symbols in batched requests, falling back per symbol for gaps
     
-    print(f"    📊 Total: {len(news_items)} articles collected for {symbol}")
-    return news_items[:max_articles]
+    range_kwargs are passed through to yfinance, e.g. period='5d' or start='2024-01-02'.
+    Batches are sized so at least MAX_WORKERS of them run in parallel. Symbols
+    missing from a batch are refetched one by one through _outbound, where
+    throttled and transient failures are retried under the host's limiter.
+    """
+    size = max(1, min(PRICE_BATCH_SIZE, math.ceil(len(symbols) / MAX_WORKERS)))
+    batches = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+    histories = {}
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for result in executor.map(lambda batch: _download_batch(batch, **range_kwargs), batches):
+            histories.update(result)
+        
+        # Only symbols the batch result is missing get their own round trip
+        missing = [symbol for symbol in symbols if symbol not in histories]
+        if missing:
+            print(f"  ↩️  {len(missing)} symbols missing from batch download, fetching individually")
+            for symbol, hist in zip(missing, executor.map(lambda symbol: _fetch_history(symbol, **range_kwargs), missing)):
+                if hist is not None and not hist.empty:
+                    histories[symbol] = hist
+    
+    return histories
 
-def fetch_market_news(max_articles=3):  # Reduced from 10 to 3
-    """Fetch general market news"""
-    print("  📰 Fetching general market news...")
+def store_price_history(histories, period=None, replace=False):
+    """Upsert downloaded OHLCV bars into the local price store
     
-    market_news = []
+    Pass the period of a backfill so the store knows how much history each symbol has.
+    With replace, the symbols' previously stored bars are dropped first.
+    """
+    now = time.time()
+    rows = []
+    sync_rows = []
+    for symbol, hist in histories.items():
+        dates = [ts.strftime('%Y-%m-%d') for ts in hist.index]
+        for date, bar in zip(dates, hist[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False)):
+            rows.append((symbol, date, *(None if pd.isna(value) else float(value) for value in bar)))
+        sync_rows.append((symbol, max(dates), now, period))
     
-    try:
-        search_queries = [
-            "stock market today",
-            "S&P 500 nasdaq",
-            "federal reserve interest rates"
-        ]
+    with _db_lock:
+        conn = _db()
+        with conn:
+            if replace:
+                conn.executemany('DELETE FROM price_bars WHERE symbol = ?', [(symbol,) for symbol in histories])
+            conn.executemany('INSERT OR REPLACE INTO price_bars VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.executemany("""
+                INSERT INTO price_sync VALUES (?, ?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    last_date = excluded.last_date, synced_at = excluded.synced_at,
+                    period = COALESCE(excluded.period, period)
+            """, sync_rows)
+            _refresh_latest_bars(conn, list(histories))
+
+def _refresh_latest_bars(conn, symbols):
+    """Copy each symbol's last two stored bars into latest_bars, one index lookup per symbol"""
+    conn.executemany("""
+        INSERT OR REPLACE INTO latest_bars
+        SELECT last.symbol, last.date, last.close, last.volume, prev.date, prev.close
+        FROM (SELECT * FROM price_bars WHERE symbol = ?1 ORDER BY date DESC LIMIT 1) AS last
+        LEFT JOIN (SELECT date, close FROM price_bars WHERE symbol = ?1 ORDER BY date DESC LIMIT 1 OFFSET 1) AS prev
+    """, [(symbol,) for symbol in symbols])
+
+def sync_price_store(symbols):
+    """Bring the local price store up to date, fetching only bars newer than those stored
+    
+    Prices are split- and dividend-adjusted, so a corporate action rebases every
+    stored bar. Each refetch therefore overlaps the last settled bar; a symbol
+    whose settled close moved is backfilled again from scratch.
+    """
+    with _db_lock:
+        conn = _db()
+        synced = {}
+        for i in range(0, len(symbols), 500):
+            chunk = symbols[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for symbol, last_date, synced_at, period, prev_date, prev_close in conn.execute(f"""
+                    SELECT symbol, last_date, synced_at, period, prev_date, prev_close
+                    FROM price_sync LEFT JOIN latest_bars USING (symbol) WHERE symbol IN ({placeholders})
+            """, chunk):
+                if period == PRICE_HISTORY_PERIOD:
+                    synced[symbol] = (last_date, synced_at, prev_date, prev_close)
+    
+    # Symbols backfilled with a different PRICE_HISTORY_PERIOD are backfilled again
+    now = time.time()
+    backfill = [symbol for symbol in symbols if symbol not in synced]
+    
+    # Refetch from the bar before the last: the last may be a partial intraday bar
+    # to replace, the one before is settled and shows whether the series was rebased
+    incremental = {}
+    for symbol, (last_date, synced_at, prev_date, _) in synced.items():
+        if now - synced_at >= PRICE_REFRESH_SECONDS:
+            incremental.setdefault(prev_date or last_date, []).append(symbol)
+    
+    fresh = len(symbols) - len(backfill) - sum(len(group) for group in incremental.values())
+    print(f"  💾 Price store: {fresh} fresh, {sum(len(group) for group in incremental.values())} incremental, {len(backfill)} backfill")
+    
+    if backfill:
+        store_price_history(fetch_price_history(backfill, period=PRICE_HISTORY_PERIOD), period=PRICE_HISTORY_PERIOD)
+    rebased = []
+    for start, group in incremental.items():
+        histories = fetch_price_history(group, start=start)
+        for symbol in group:
+            _, _, prev_date, prev_close = synced[symbol]
+            if symbol in histories and _rebased(histories[symbol], prev_date, prev_close):
+                rebased.append(symbol)
+                del histories[symbol]
+        store_price_history(histories)
+    if rebased:
+        print(f"  🔁 {len(rebased)} symbols adjusted for a split or dividend, backfilling again: {', '.join(rebased[:10])}")
+        store_price_history(fetch_price_history(rebased, period=PRICE_HISTORY_PERIOD), period=PRICE_HISTORY_PERIOD,
+                            replace=True)
+
+def _rebased(hist, date, close):
+    """Whether a refetched frame's close on a settled date differs from the stored close"""
+    if date is None or not close:
+        return False
+    dates = [ts.strftime('%Y-%m-%d') for ts in hist.index]
+    if date not in dates:
+        return False
+    return abs(float(hist['Close'].iloc[dates.index(date)]) / close - 1) > PRICE_ADJUST_TOLERANCE
+
+def load_latest_bars(symbols):
+    """Read each symbol's last two closes and last volume from the price store
+    
+    Returns {symbol: {'date', 'close', 'volume', 'prev_date', 'prev_close'}}, the
+    fields _price_fields and _stock_entry use, without touching price_bars.
+    """
+    columns = ('date', 'close', 'volume', 'prev_date', 'prev_close')
+    latest = {}
+    with _db_lock:
+        conn = _db()
+        for i in range(0, len(symbols), 500):
+            chunk = symbols[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for symbol, *values in conn.execute(
+                    f'SELECT symbol, {", ".join(columns)} FROM latest_bars WHERE symbol IN ({placeholders})', chunk):
+                latest[symbol] = dict(zip(columns, values))
+    return latest
+
+def _latest_bar(hist):
+    """The load_latest_bars fields of a downloaded OHLCV frame"""
+    dates = [ts.strftime('%Y-%m-%d') for ts in hist.index[-2:]]
+    return {
+        'date': dates[-1],
+        'close': float(hist['Close'].iloc[-1]),
+        'volume': float(hist['Volume'].iloc[-1]),
+        'prev_date': dates[0] if len(dates) > 1 else None,
+        'prev_close': float(hist['Close'].iloc[-2]) if len(hist) > 1 else None
+    }
+
+def load_close_panel(symbols, bars=INDICATOR_BARS):
+    """Load closing prices from the price store as one date-aligned panel, one column per symbol
+    
+    The panel covers the last bars trading dates. Each symbol's bars come from a
+    date-bounded range scan of the (symbol, date) key as one row of comma-joined
+    dates and closes, which are parsed straight into a NumPy array.
+    """
+    chunks = [symbols[i:i + 500] for i in range(0, len(symbols), 500)]
+    rows = []
+    with _db_lock:
+        conn = _db()
+        last = max((conn.execute(f'SELECT MAX(date) FROM latest_bars WHERE symbol IN ({",".join("?" * len(chunk))})',
+                                 chunk).fetchone()[0] or '' for chunk in chunks), default='')
+        if not last:
+            return pd.DataFrame()
+        # Enough calendar days to hold bars trading days, weekends and holidays included
+        since = (datetime.strptime(last, '%Y-%m-%d') - timedelta(days=bars * 7 // 5 + 14)).strftime('%Y-%m-%d')
+        for chunk in chunks:
+            # Both aggregates see the rows in the same order, so dates and closes stay paired;
+            # a missing close is written as nan rather than skipped
+            rows += conn.execute(f"""
+                SELECT symbol, group_concat(date), group_concat(IFNULL(close, 'nan')) FROM price_bars
+                WHERE symbol IN ({",".join("?" * len(chunk))}) AND date >= ? GROUP BY symbol
+            """, (*chunk, since)).fetchall()
+    
+    # Symbols that traded on the same days share one date layout, parsed once
+    layouts = {joined: joined.split(',') for joined in {row[1] for row in rows}}
+    dates = sorted(set().union(*layouts.values()))[-bars:]
+    date_index = {date: i for i, date in enumerate(dates)}
+    positions = {joined: np.array([date_index.get(date, -1) for date in layout]) for joined, layout in layouts.items()}
+    
+    order = {symbol: position for position, symbol in enumerate(dict.fromkeys(symbols))}
+    rows.sort(key=lambda row: order[row[0]])
+    values = np.full((len(dates), len(rows)), np.nan)
+    for j, (_, joined, closes) in enumerate(rows):
+        i = positions[joined]
+        kept = i >= 0
+        values[i[kept], j] = np.array(closes.split(','), dtype=float)[kept]
+    return pd.DataFrame(values, index=pd.to_datetime(dates), columns=[row[0] for row in rows])
+
+def compute_indicators(panel, portfolio=None, benchmark=BENCHMARK_SYMBOL):
+    """Compute technical indicators for every column of a close-price panel in one vectorized pass
+    
+    Returns a DataFrame indexed by symbol. Returns, volatility, drawdowns and relative
+    strength are in percent; indicators without enough history are NaN. Correlation is
+    against the equal-weighted daily returns of the portfolio symbols.
+    """
+    closes = panel.sort_index().ffill(limit=5)
+    last = closes.iloc[-1]
+    indicators = pd.DataFrame(index=closes.columns)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, bars in RETURN_HORIZONS.items():
+            base = closes.iloc[-1 - bars] if len(closes) > bars else np.nan
+            indicators[name] = (last / base - 1) * 100
         
-        for query in search_queries:
-            # URL encode the query
-            encoded_query = urllib.parse.quote_plus(query)
-            rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
-            
-            try:
-                feed = feedparser.parse(rss_url)
-                
-                for entry in feed.entries[:4]:  # Take more from each query
-                    if not any(n['title'] == entry.title for n in market_news):
-                        published_date = entry.get('published', 'Recent')
-                        news_item = {
-                            'title': entry.title.strip(),
-                            'publisher': getattr(entry, 'source', {}).get('title', 'Google News').strip(),
-                            'link': entry.link.strip(),
-                            'published': published_date,
-                            'summary': (getattr(entry, 'summary', '') or 'No summary available')[:300].strip()
-                        }
-                        market_news.append(news_item)
-                        print(f"    ✓ [{published_date}] {news_item['title'][:60]}... ({news_item['publisher']})")
-                        
-                    if len(market_news) >= max_articles:
-                        break
-                
-                if len(market_news) >= max_articles:
-                    break
-                    
-            except Exception as e:
-                print(f"    ⚠️  Error fetching news for query '{query}': {e}")
-                
+        returns = np.log(closes / closes.shift(1))
+        recent = returns.iloc[-VOLATILITY_BARS:]
+        indicators['volatility_1m'] = (recent.std() * np.sqrt(252) * 100).where(recent.count() >= VOLATILITY_BARS // 2)
+        
+        for bars in (20, 50, 200):
+            window = closes.iloc[-bars:]
+            indicators[f'sma_{bars}'] = window.mean().where(window.count() == bars)
+        indicators['price_vs_sma50'] = (last / indicators['sma_50'] - 1) * 100
+        indicators['price_vs_sma200'] = (last / indicators['sma_200'] - 1) * 100
+        
+        # Wilder's RSI: exponential smoothing of gains and losses with alpha 1/N
+        change = closes.diff()
+        gains = change.clip(lower=0).ewm(alpha=1 / RSI_BARS, adjust=False, min_periods=RSI_BARS).mean().iloc[-1]
+        losses = (-change.clip(upper=0)).ewm(alpha=1 / RSI_BARS, adjust=False, min_periods=RSI_BARS).mean().iloc[-1]
+        indicators['rsi_14'] = 100 - 100 / (1 + gains / losses)
+        
+        indicators['drawdown'] = (last / closes.max() - 1) * 100
+        indicators['max_drawdown'] = (closes / closes.cummax() - 1).min() * 100
+        
+        if benchmark in indicators.index:
+            indicators['rel_strength_3m'] = indicators['return_3m'] - indicators.at[benchmark, 'return_3m']
+        
+    if portfolio:
+        indicators['corr_portfolio'] = portfolio_correlation(closes, portfolio)
+    
+    return indicators.replace([np.inf, -np.inf], np.nan)
+
+def portfolio_correlation(panel, portfolio):
+    """Correlation of each panel column's daily returns with the equal-weighted portfolio"""
+    closes = panel.sort_index().ffill(limit=5)
+    members = [symbol for symbol in portfolio if symbol in closes.columns]
+    if not members:
+        return pd.Series(np.nan, index=closes.columns)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        window = np.log(closes / closes.shift(1)).iloc[-CORRELATION_BARS:].to_numpy()
+        member_returns = window[:, closes.columns.get_indexer(members)]
+        basket = (np.nansum(member_returns, axis=1) / (~np.isnan(member_returns)).sum(axis=1))[:, None]
+        valid = ~np.isnan(window) & ~np.isnan(basket)
+        count = valid.sum(axis=0)
+        x = np.where(valid, window, 0.0)
+        y = np.where(valid, basket, 0.0)
+        x = np.where(valid, x - x.sum(axis=0) / count, 0.0)
+        y = np.where(valid, y - y.sum(axis=0) / count, 0.0)
+        correlation = (x * y).sum(axis=0) / np.sqrt((x * x).sum(axis=0) * (y * y).sum(axis=0))
+    return pd.Series(np.where(count >= CORRELATION_BARS // 3, correlation, np.nan), index=closes.columns)
+
+def attach_indicators(market_data, indicators):
+    """Store each portfolio symbol's indicators as a plain dict under 'indicators'"""
+    portfolio = market_data['portfolio']
+    table = indicators.reindex(list(portfolio)).round(2)
+    # to_json turns NaN into null, so missing values become None
+    records = json.loads(table.to_json(orient='index'))
+    for symbol, entry in portfolio.items():
+        entry['indicators'] = records.get(symbol, {})
+
+def _price_fields(latest):
+    """Compute the latest price and daily change from a symbol's latest bars"""
+    current = latest['close']
+    previous = latest['prev_close']
+    if previous is None:
+        raise ValueError(f"only one price bar ({latest['date']})")
+    change = ((current - previous) / previous) * 100
+    
+    return {
+        'price': round(current, 2),
+        'change_percent': round(change, 2)
+    }
+
+def get_fundamentals(symbol):
+    """Return ticker.info fundamentals, refetching only when a cached field has expired
+    
+    Returns the full info dict when it was fetched, otherwise the cached fields.
+    """
+    now = time.time()
+    with _db_lock:
+        cached = {
+            field: (json.loads(value), fetched_at)
+            for field, value, fetched_at in _db().execute(
+                'SELECT field, value, fetched_at FROM fundamentals WHERE symbol = ?', (symbol,))
+        }
+    
+    expired = [
+        field for field, ttl_hours in FUNDAMENTAL_TTL_HOURS.items()
+        if field not in cached or now - cached[field][1] >= ttl_hours * 3600
+    ]
+    cached_fields = {field: value for field, (value, _) in cached.items() if value is not None}
+    if not expired:
+        return cached_fields
+    
+    try:
+        ticker = yf.Ticker(symbol)
+        info = _outbound(YAHOO_HOST, lambda: ticker.info)
     except Exception as e:
-        print(f"    ⚠️  Market news error: {e}")
+        if not cached_fields:
+            raise
+        print(f"  ⚠️  Using stale fundamentals for {symbol}: {e}")
+        return cached_fields
+    
+    # Missing fields are cached as null so they are not refetched on every run
+    rows = [(symbol, field, json.dumps(info.get(field)), now) for field in FUNDAMENTAL_TTL_HOURS]
+    with _db_lock:
+        conn = _db()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?)', rows)
+    return info
+
+def _fetch_fundamentals(symbol):
+    with timed('fundamentals', symbol):
+        return get_fundamentals(symbol)
+
+def _stock_entry(symbol, latest, info, news):
+    """Portfolio entry for a stock from its latest bars, fundamentals and news"""
+    prices = _price_fields(latest)
+    return {
+        'name': info.get('longName', symbol),
+        'price': prices['price'],
+        'change_percent': prices['change_percent'],
+        'volume': int(latest['volume']),
+        'market_cap': info.get('marketCap', 'N/A'),
+        'pe_ratio': round(info.get('trailingPE', 0), 2) if info.get('trailingPE') else 'N/A',
+        'sector': info.get('sector', 'N/A'),
+        'industry': info.get('industry', 'N/A'),
+        'news': news,
+        'news_count': len(news)
+    }
+
+# Compact market data model
+# collect_market_data builds plain dicts while fetching, then packs them into a
+# MarketSnapshot: typed array columns per table, with every string interned once.
+# Consumers read it through MarketDataView, which behaves like the original dicts.
+SNAPSHOT_MAGIC = b'ANSNAP01'
+STOCK_COLUMNS = {'symbol': 'i', 'name': 'i', 'price': 'd', 'change_percent': 'd', 'volume': 'q',
+                 'market_cap': 'd', 'pe_ratio': 'd', 'sector': 'i', 'industry': 'i',
+                 'news_start': 'i', 'news_count': 'i', 'news_sentiment': 'd', 'has_indicators': 'b'}
+NEWS_COLUMNS = {'title': 'i', 'publisher': 'i', 'link': 'i', 'published': 'i', 'summary': 'i',
+                'seen_before': 'b', 'sentiment': 'd'}
+INDEX_COLUMNS = {'name': 'i', 'price': 'd', 'change_percent': 'd'}
+_MISSING = float('nan')
+
+class StringTable:
+    """Interned strings addressed by integer id, stored as one UTF-8 blob plus offsets"""
+    __slots__ = ('strings', 'index', 'blob', 'offsets')
+    
+    def __init__(self, blob=None, offsets=None):
+        self.blob = blob
+        self.offsets = offsets
+        self.strings = [None] * (len(offsets) - 1) if offsets is not None else []
+        self.index = {}
+    
+    def intern(self, value):
+        value = str(value)
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+    
+    def __getitem__(self, position):
+        value = self.strings[position]
+        if value is None:
+            # Decoded from the mapped blob on first use
+            value = self.strings[position] = str(self.blob[self.offsets[position]:self.offsets[position + 1]], 'utf-8')
+        return value
+    
+    def encode(self):
+        """Return (blob, offsets) columns for writing"""
+        encoded = [value.encode('utf-8') for value in self.strings]
+        offsets = array('q', [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        return array('B', b''.join(encoded)), offsets
+
+class MarketSnapshot:
+    """Column-oriented market data: stocks, news and indices as typed arrays
+    
+    Numbers live in array('d'/'q') columns (NaN marks a missing value) and text
+    columns hold StringTable ids, so repeated publishers, sectors and dates are
+    stored once. Indicators are one float column per indicator name. News rows
+    for market news come first; each stock points at its slice with news_start
+    and news_count. Columns are arrays after from_market_data and read-only
+    memoryviews over the file after load, so a snapshot is used the same way
+    either way.
+    """
+    __slots__ = ('timestamp', 'market_news_count', 'strings', 'stocks', 'news', 'indices', 'indicators', 'rows', '_buffer')
+    
+    def __init__(self):
+        self.timestamp = ''
+        self.market_news_count = 0
+        self.strings = StringTable()
+        self.stocks = {name: array(code) for name, code in STOCK_COLUMNS.items()}
+        self.news = {name: array(code) for name, code in NEWS_COLUMNS.items()}
+        self.indices = {name: array(code) for name, code in INDEX_COLUMNS.items()}
+        self.indicators = {}
+        self.rows = {}
+        self._buffer = None
+    
+    @classmethod
+    def from_market_data(cls, market_data):
+        """Pack the dict (or view) returned by collect_market_data"""
+        snapshot = cls()
+        intern = snapshot.strings.intern
+        snapshot.timestamp = market_data.get('timestamp', '')
+        
+        for name, data in market_data.get('market_indices', {}).items():
+            snapshot._append(snapshot.indices, {'name': intern(name), 'price': data['price'],
+                                                'change_percent': data['change_percent']})
+        
+        market_news = market_data.get('market_news', [])
+        snapshot.market_news_count = len(market_news)
+        for item in market_news:
+            snapshot._append_news(item)
+        
+        portfolio = market_data.get('portfolio', {})
+        indicator_names = list(dict.fromkeys(key for data in portfolio.values() for key in (data.get('indicators') or {})))
+        snapshot.indicators = {key: array('d') for key in indicator_names}
+        for symbol, data in portfolio.items():
+            news = data.get('news', [])
+            snapshot.rows[symbol] = len(snapshot.rows)
+            snapshot._append(snapshot.stocks, {
+                'symbol': intern(symbol), 'name': intern(data['name']),
+                'price': data['price'], 'change_percent': data['change_percent'],
+                'volume': int(data.get('volume') or 0),
+                'market_cap': _snapshot_number(data.get('market_cap')),
+                'pe_ratio': _snapshot_number(data.get('pe_ratio')),
+                'sector': intern(data.get('sector', 'N/A')), 'industry': intern(data.get('industry', 'N/A')),
+                'news_start': len(snapshot.news['title']), 'news_count': len(news),
+                'news_sentiment': data.get('news_sentiment', _MISSING),
+                'has_indicators': 'indicators' in data,
+            })
+            for item in news:
+                snapshot._append_news(item)
+            indicators = data.get('indicators') or {}
+            for key, column in snapshot.indicators.items():
+                column.append(_snapshot_number(indicators.get(key)))
+        # The lookup index is only needed while packing
+        snapshot.strings.index = {}
+        return snapshot
     
-    print(f"    📊 Total: {len(market_news)} market news articles collected")
-    return market_news[:max_articles]
+    def _append(self, table, values):
+        for name, value in values.items():
+            table[name].append(value)
+    
+    def _append_news(self, item):
+        intern = self.strings.intern
+        self._append(self.news, {
+            'title': intern(item['title']), 'publisher': intern(item.get('publisher', '')),
+            'link': intern(item.get('link', '')), 'published': intern(item.get('published', '')),
+            'summary': intern(item.get('summary', '')), 'seen_before': bool(item.get('seen_before')),
+            'sentiment': item.get('sentiment', _MISSING),
+        })
+    
+    def view(self):
+        """Read-only dict-like view in the shape collect_market_data has always returned"""
+        return MarketDataView(self)
+    
+    def _columns(self):
+        blob, offsets = self.strings.encode()
+        yield 'strings', 'blob', blob
+        yield 'strings', 'offsets', offsets
+        for table in ('stocks', 'news', 'indices', 'indicators'):
+            for name, column in getattr(self, table).items():
+                yield table, name, column
+    
+    def save(self, path):
+        """Write the snapshot as a binary file that load() maps without parsing
+        
+        Layout: magic, header length, a JSON header listing each column's table,
+        name, type code, offset and length, then the raw column bytes, 8-byte aligned.
+        """
+        columns = list(self._columns())
+        layout = []
+        offset = 0
+        for table, name, column in columns:
+            layout.append([table, name, column.typecode, offset, len(column)])
+            offset += -(-len(column) * column.itemsize // 8) * 8
+        header = json.dumps({'byteorder': sys.byteorder, 'timestamp': self.timestamp,
+                             'market_news': self.market_news_count, 'columns': layout}).encode()
+        header += b' ' * (-len(header) % 8)
+        
+        with open(path + '.tmp', 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + len(header).to_bytes(8, 'little') + header)
+            for _, _, column in columns:
+                data = column.tobytes()
+                f.write(data + b'\0' * (-len(data) % 8))
+        os.replace(path + '.tmp', path)
+    
+    @classmethod
+    def load(cls, path):
+        """Map a saved snapshot; columns are zero-copy views of the file"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        memory = memoryview(buffer)
+        if bytes(memory[:8]) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a market snapshot")
+        size = int.from_bytes(memory[8:16], 'little')
+        header = json.loads(bytes(memory[16:16 + size]))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+        
+        snapshot = cls()
+        snapshot.timestamp = header['timestamp']
+        snapshot.market_news_count = header['market_news']
+        snapshot._buffer = buffer
+        start = 16 + size
+        columns = {}
+        for table, name, typecode, offset, length in header['columns']:
+            itemsize = array(typecode).itemsize
+            columns[table, name] = memory[start + offset:start + offset + length * itemsize].cast(typecode)
+        
+        snapshot.strings = StringTable(columns.pop(('strings', 'blob')), columns.pop(('strings', 'offsets')))
+        snapshot.indicators = {}
+        for (table, name), column in columns.items():
+            getattr(snapshot, table)[name] = column
+        snapshot.rows = {snapshot.strings[position]: row for row, position in enumerate(snapshot.stocks['symbol'])}
+        return snapshot
+
+def _snapshot_number(value):
+    """Numbers are stored as floats, with NaN for 'N/A' and None"""
+    return float(value) if isinstance(value, (int, float)) else _MISSING
+
+def _view_number(value, integer=False):
+    if math.isnan(value):
+        return 'N/A'
+    return int(value) if integer else value
+
+class MarketDataView(Mapping):
+    """The market data dict shape over a MarketSnapshot: timestamp, market_indices, portfolio, market_news"""
+    __slots__ = ('snapshot',)
+    _KEYS = ('timestamp', 'market_indices', 'portfolio', 'market_news')
+    
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+    
+    def __getitem__(self, key):
+        snapshot = self.snapshot
+        if key == 'timestamp':
+            return snapshot.timestamp
+        if key == 'market_indices':
+            indices = snapshot.indices
+            return {snapshot.strings[indices['name'][row]]: {'price': indices['price'][row],
+                                                              'change_percent': indices['change_percent'][row]}
+                    for row in range(len(indices['name']))}
+        if key == 'portfolio':
+            return PortfolioView(snapshot)
+        if key == 'market_news':
+            return NewsList(snapshot, 0, snapshot.market_news_count)
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return iter(self._KEYS)
+    
+    def __len__(self):
+        return len(self._KEYS)
+
+class PortfolioView(Mapping):
+    """Symbol -> StockView, in collection order"""
+    __slots__ = ('snapshot',)
+    
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+    
+    def __getitem__(self, symbol):
+        return StockView(self.snapshot, self.snapshot.rows[symbol])
+    
+    def __iter__(self):
+        return iter(self.snapshot.rows)
+    
+    def __len__(self):
+        return len(self.snapshot.rows)
+
+class StockView(Mapping):
+    """One portfolio stock's fields, read from the snapshot columns on access"""
+    __slots__ = ('snapshot', 'row')
+    
+    def __init__(self, snapshot, row):
+        self.snapshot = snapshot
+        self.row = row
+    
+    def __getitem__(self, key):
+        snapshot, row = self.snapshot, self.row
+        stocks = snapshot.stocks
+        if key in ('name', 'sector', 'industry'):
+            return snapshot.strings[stocks[key][row]]
+        if key in ('price', 'change_percent', 'volume', 'news_count'):
+            return stocks[key][row]
+        if key == 'market_cap':
+            return _view_number(stocks[key][row], integer=True)
+        if key == 'pe_ratio':
+            return _view_number(stocks[key][row])
+        if key == 'news':
+            return NewsList(snapshot, stocks['news_start'][row], stocks['news_count'][row])
+        if key == 'indicators' and stocks['has_indicators'][row]:
+            return {name: None if math.isnan(column[row]) else column[row]
+                    for name, column in snapshot.indicators.items()}
+        if key == 'news_sentiment' and not math.isnan(stocks[key][row]):
+            return stocks[key][row]
+        raise KeyError(key)
+    
+    def __iter__(self):
+        yield from ('name', 'price', 'change_percent', 'volume', 'market_cap', 'pe_ratio',
+                    'sector', 'industry', 'news', 'news_count')
+        stocks = self.snapshot.stocks
+        if stocks['has_indicators'][self.row]:
+            yield 'indicators'
+        if not math.isnan(stocks['news_sentiment'][self.row]):
+            yield 'news_sentiment'
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class NewsList(Sequence):
+    """A slice of the news table; indexing yields NewsView items and slicing returns a list"""
+    __slots__ = ('snapshot', 'start', 'count')
+    
+    def __init__(self, snapshot, start, count):
+        self.snapshot = snapshot
+        self.start = start
+        self.count = count
+    
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [NewsView(self.snapshot, self.start + i) for i in range(self.count)[position]]
+        return NewsView(self.snapshot, self.start + range(self.count)[position])
+    
+    def __len__(self):
+        return self.count
+    
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+class NewsView(Mapping):
+    """One article's fields from the news table"""
+    __slots__ = ('snapshot', 'row')
+    _TEXT = ('title', 'publisher', 'link', 'published', 'summary')
+    
+    def __init__(self, snapshot, row):
+        self.snapshot = snapshot
+        self.row = row
+    
+    def __getitem__(self, key):
+        news = self.snapshot.news
+        if key in self._TEXT:
+            return self.snapshot.strings[news[key][self.row]]
+        if key == 'seen_before' and news[key][self.row]:
+            return True
+        if key == 'sentiment' and not math.isnan(news[key][self.row]):
+            return news[key][self.row]
+        raise KeyError(key)
+    
+    def __iter__(self):
+        yield from self._TEXT
+        news = self.snapshot.news
+        if news['seen_before'][self.row]:
+            yield 'seen_before'
+        if not math.isnan(news['sentiment'][self.row]):
+            yield 'sentiment'
+    
+    def __len__(self):
+        return sum(1 for _ in self)
 
-def collect_market_data():
-    """Collect market data, portfolio data, and news"""
-    print("📊 Collecting market data and news...")
+def collect_market_data(symbols=None, with_panel=False):
+    """Collect market data, portfolio data, and news
+    
+    symbols defaults to PORTFOLIO. Every symbol is fetched once, however many
+    portfolios hold it (see run_portfolio_analyses). Returns a read-only
+    MarketDataView over a compact MarketSnapshot. With with_panel, returns
+    (market_data, panel), where panel is the close-price panel the indicators
+    were computed from, or None if it could not be loaded.
+    """
+    portfolio_symbols = PORTFOLIO if symbols is None else list(dict.fromkeys(symbols))
+    print(f"📊 Collecting market data and news ({MAX_WORKERS} workers)...")
     
     data = {
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -190,92 +2012,213 @@ def collect_market_data():
         'market_news': []
     }
     
-    # Market indices
-    indices = {
-        '^GSPC': 'S&P 500',
-        '^IXIC': 'NASDAQ',
-        '^VIX': 'VIX'
-    }
+    # Prices for every index and portfolio stock are read from the local price store,
+    # which only downloads bars newer than what it already holds
+    # One dedup index spans the market feed and every per-stock feed
+    dedup = NewsDeduper()
     
-    for symbol, name in indices.items():
+    # News is ingested on its own event loop thread, so it neither waits for nor
+    # occupies a worker; each stock's news starts as soon as its fundamentals arrive
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, ThreadPoolExecutor(max_workers=1) as news_thread:
+        fundamentals = {symbol: executor.submit(_fetch_fundamentals, symbol) for symbol in portfolio_symbols}
+        news_future = news_thread.submit(_timed_call, 'collect.news', ingest_news, fundamentals,
+                                         max_articles=3, market_articles=10, dedup=dedup)
+        
+        symbols = list(MARKET_INDICES) + [symbol for symbol in portfolio_symbols if symbol not in MARKET_INDICES]
+        with timed('collect.prices'):
+            try:
+                sync_price_store(symbols)
+                latest = load_latest_bars(symbols)
+                price_store_ok = True
+            except Exception as e:
+                print(f"  ⚠️  Price store unavailable, downloading directly: {e}")
+                histories = fetch_price_history(symbols, period='5d')
+                latest = {symbol: _latest_bar(hist) for symbol, hist in histories.items()}
+                price_store_ok = False
+        
+        for symbol, name in MARKET_INDICES.items():
+            try:
+                if symbol in latest:
+                    data['market_indices'][name] = _price_fields(latest[symbol])
+            except Exception as e:
+                print(f"  ⚠️  Error fetching {name}: {e}")
+        
+        # Indicators are computed while fundamentals and news are in flight
+        indicators = panel = None
+        with timed('indicators'):
+            try:
+                if price_store_ok:
+                    panel = load_close_panel(symbols)
+                else:
+                    panel = pd.DataFrame({symbol: hist['Close'] for symbol, hist in histories.items()})
+                indicators = compute_indicators(panel, portfolio_symbols)
+            except Exception as e:
+                print(f"  ⚠️  Error computing indicators: {e}")
+        
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period='5d')
-            if not hist.empty:
-                current = hist['Close'].iloc[-1]
-                previous = hist['Close'].iloc[-2]
-                change = ((current - previous) / previous) * 100
-                
-                data['market_indices'][name] = {
-                    'price': round(current, 2),
-                    'change_percent': round(change, 2)
-                }
+            data['market_news'], stock_news = news_future.result()
         except Exception as e:
-            print(f"  ⚠️  Error fetching {name}: {e}")
+            print(f"  ⚠️  Error fetching news: {e}")
+            stock_news = {}
+        
+        # Assembled in portfolio order so the output matches a serial run
+        for symbol in portfolio_symbols:
+            if symbol not in latest:
+                continue
+            try:
+                data['portfolio'][symbol] = _stock_entry(symbol, latest[symbol], fundamentals[symbol].result(),
+                                                         stock_news.get(symbol, []))
+            except Exception as e:
+                print(f"  ⚠️  Error fetching {symbol}: {e}")
     
-    # Fetch general market news
-    data['market_news'] = fetch_market_news(max_articles=10)
+    if indicators is not None:
+        attach_indicators(data, indicators)
     
-    # Portfolio stocks with news
-    for symbol in PORTFOLIO:
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            hist = ticker.history(period='5d')
-            
-            if not hist.empty:
-                current = hist['Close'].iloc[-1]
-                previous = hist['Close'].iloc[-2]
-                change = ((current - previous) / previous) * 100
-                
-                company_name = info.get('longName', symbol)
-                
-                # Fetch news for this specific stock - reduced to 3 articles
-                news = fetch_news_for_stock(symbol, company_name, max_articles=3)
-                
-                data['portfolio'][symbol] = {
-                    'name': company_name,
-                    'price': round(current, 2),
-                    'change_percent': round(change, 2),
-                    'volume': int(hist['Volume'].iloc[-1]),
-                    'market_cap': info.get('marketCap', 'N/A'),
-                    'pe_ratio': round(info.get('trailingPE', 0), 2) if info.get('trailingPE') else 'N/A',
-                    'sector': info.get('sector', 'N/A'),
-                    'industry': info.get('industry', 'N/A'),
-                    'news': news,
-                    'news_count': len(news)
-                }
-        except Exception as e:
-            print(f"  ⚠️  Error fetching {symbol}: {e}")
+    try:
+        dedup.remember()
+    except Exception as e:
+        print(f"  ⚠️  Error updating seen-news store: {e}")
     
+    with timed('sentiment'):
+        score_news_sentiment(data)
+    
+    missing = [symbol for symbol in portfolio_symbols if symbol not in data['portfolio']]
+    if missing:
+        print(f"  ⚠️  No data for {len(missing)} of {len(portfolio_symbols)} stocks: {', '.join(missing[:20])}"
+              f"{' ...' if len(missing) > 20 else ''}")
+
     print(f"✅ Collected data for {len(data['portfolio'])} stocks with news analysis")
-    return data
+    # Pack into columns; the nested dicts are released when this returns
+    market_data = MarketSnapshot.from_market_data(data).view()
+    return (market_data, panel) if with_panel else market_data
 
-def analyze_with_groq(market_data):
-    """Send data to Groq for comprehensive analysis including news"""
-    print("🤖 Analyzing market data and news with Groq AI...")
+# Finance headline lexicon: word -> polarity weight
+SENTIMENT_LEXICON = {
+    **{word: 1.0 for word in """
+        gain gains gained rise rises rising rose climb climbs climbed rally rallies rallied jump jumps jumped
+        up higher high record strong stronger strength growth grow grows growing beat beats outperform
+        outperforms upgrade upgraded upgrades buy bullish profit profits profitable positive optimism
+        optimistic boost boosts boosted recover recovery rebound rebounds surge surges surged soar soars
+        soared expand expands expansion win wins approval approved launch launches partnership deal
+        exceed exceeds exceeded raise raises raised dividend buyback innovation demand momentum
+    """.split()},
+    **{word: -1.0 for word in """
+        fall falls fell drop drops dropped decline declines declined slide slides slid slump slumps
+        down lower low weak weaker weakness loss losses lose loses losing miss misses missed
+        downgrade downgraded downgrades sell bearish negative pessimism concern concerns fear fears
+        risk risks risky warn warns warning cut cuts cutting layoffs lawsuit probe investigation
+        recall recalls fine fined delay delays delayed volatility uncertainty headwinds pressure
+        tariff tariffs inflation recession default debt shortfall underperform slowdown
+    """.split()},
+    **{word: 2.0 for word in "skyrocket skyrockets soaring blowout breakthrough".split()},
+    **{word: -2.0 for word in "plunge plunges plunged crash crashes crashed tumble tumbles tumbled bankruptcy fraud".split()},
+}
+_NEGATIONS = {'not', 'no', 'never', 'without', 'fails', 'failed'}
+_LEXICON_INDEX = {word: column for column, word in enumerate(SENTIMENT_LEXICON)}
+_LEXICON_WEIGHTS = list(SENTIMENT_LEXICON.values())
+
+def score_sentiment(texts):
+    """Score texts in [-1, 1] against the finance lexicon in one vectorized pass
     
-    # Create a focused summary of news for the LLM
-    news_summary = "## Market News:\n"
-    for news_item in market_data.get('market_news', [])[:5]:
-        news_summary += f"- {news_item['title']} ({news_item['publisher']})\n"
+    Texts are tokenized into a sparse document-term matrix (COO arrays of row,
+    column and sign, with negated terms flipped) which is weighted and summed
+    per document with NumPy.
+    """
+    rows, columns, signs = [], [], []
+    for row, text in enumerate(texts):
+        previous = ''
+        for token in re.findall(r"[a-z]+", text.lower()):
+            column = _LEXICON_INDEX.get(token)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                signs.append(-1.0 if previous in _NEGATIONS else 1.0)
+            previous = token
     
-    news_summary += "\n## Company-Specific News:\n"
-    for symbol, stock_data in market_data.get('portfolio', {}).items():
-        news_summary += f"\n### {symbol} ({stock_data['name']}):\n"
-        for news_item in stock_data.get('news', [])[:3]:
-            news_summary += f"- {news_item['title']}\n"
-            if news_item.get('summary'):
-                news_summary += f"  Summary: {news_item['summary']}\n"
+    if not rows:
+        return np.zeros(len(texts))
     
-    prompt = f"""You are an expert financial analyst with deep knowledge of market trends and news analysis. Analyze the following market data and recent news to provide a comprehensive daily brief.
+    rows = np.array(rows)
+    contributions = np.array(signs) * np.array(_LEXICON_WEIGHTS)[np.array(columns)]
+    raw = np.bincount(rows, weights=contributions, minlength=len(texts))
+    hits = np.bincount(rows, minlength=len(texts))
+    return np.tanh(raw / np.sqrt(hits + 1))
 
-Market Data:
-{json.dumps({k: v for k, v in market_data.items() if k != 'market_news'}, indent=2)}
+def score_news_sentiment(market_data):
+    """Attach a lexicon sentiment score to every news item and a per-symbol aggregate"""
+    items = list(market_data.get('market_news', []))
+    for data in market_data.get('portfolio', {}).values():
+        items.extend(data.get('news', []))
+    
+    texts = [f"{item['title']} {_clean_summary(item.get('summary'), item['title'])}" for item in items]
+    for item, score in zip(items, score_sentiment(texts)):
+        item['sentiment'] = round(float(score), 3)
+    
+    for data in market_data.get('portfolio', {}).values():
+        scores = [item['sentiment'] for item in data.get('news', [])]
+        data['news_sentiment'] = round(sum(scores) / len(scores), 3) if scores else 0.0
 
-{news_summary}
+def _sentiment_label(score):
+    if score >= 0.15:
+        return 'Bullish'
+    if score <= -0.15:
+        return 'Bearish'
+    return 'Neutral'
+
+def local_analysis(market_data):
+    """Build a brief from local lexicon sentiment and price action, without an LLM
+    
+    Produces the same schema as analyze_with_groq, minus price-target recommendations.
+    """
+    portfolio = market_data.get('portfolio', {})
+    indices = market_data.get('market_indices', {})
+    market_news = market_data.get('market_news', [])
+    
+    market_scores = [item.get('sentiment', 0.0) for item in market_news]
+    market_sentiment = sum(market_scores) / len(market_scores) if market_scores else 0.0
+    index_summary = ', '.join(f"{name} {data['change_percent']:+.2f}%" for name, data in indices.items())
+    market_overview = (f"{index_summary or 'Index data unavailable'}. Headline sentiment across "
+                       f"{len(market_news)} market articles is {_sentiment_label(market_sentiment).lower()} "
+                       f"({market_sentiment:+.2f}). Generated from local sentiment scoring without AI analysis.")
+    
+    news_highlights = [
+        item['title'] for item in sorted(market_news, key=lambda item: -abs(item.get('sentiment', 0.0)))[:3]
+    ]
+    
+    stock_analysis = []
+    alerts = []
+    for symbol, data in portfolio.items():
+        news = data.get('news', [])
+        # Price action tilts the news score: a 5% move counts like one strongly worded headline
+        score = data.get('news_sentiment', 0.0) + max(-0.5, min(0.5, data['change_percent'] / 10))
+        key_item = max(news, key=lambda item: abs(item.get('sentiment', 0.0)), default=None)
+        stock_analysis.append({
+            'ticker': symbol,
+            'sentiment': _sentiment_label(score),
+            'key_news': key_item['title'] if key_item else 'No major news',
+            'analysis': (f"{'Up' if data['change_percent'] >= 0 else 'Down'} {abs(data['change_percent']):.2f}% on the day; "
+                         f"headline sentiment {data.get('news_sentiment', 0.0):+.2f} across {len(news)} articles.")
+        })
+        if data['change_percent'] <= -3 or data.get('news_sentiment', 0.0) <= -0.3:
+            alerts.append(f"{symbol}: {data['change_percent']:+.2f}% with news sentiment {data.get('news_sentiment', 0.0):+.2f}")
+    
+    positive = sum(1 for data in portfolio.values() if data.get('news_sentiment', 0.0) > 0)
+    avg_change = sum(data['change_percent'] for data in portfolio.values()) / len(portfolio) if portfolio else 0
+    
+    return {
+        'market_overview': market_overview,
+        'news_highlights': news_highlights,
+        'portfolio_health': {
+            'summary': f"Average move {avg_change:+.2f}%; {positive} of {len(portfolio)} holdings have positive news sentiment.",
+            'alerts': alerts[:5]
+        },
+        'stock_analysis': stock_analysis,
+        'recommendations': [],
+        'action_items': [f"Review {alert}" for alert in alerts[:5]] or ["No holdings flagged by local sentiment scoring"],
+        'analysis_source': 'local'
+    }
 
-CRITICAL INSTRUCTIONS:
+ANALYSIS_INSTRUCTIONS = """CRITICAL INSTRUCTIONS:
 1. **Base your analysis heavily on the recent news** - this is the most important data
 2. Consider how news sentiment affects each stock
 3. Identify catalysts (positive or negative) from the news
@@ -283,27 +2226,83 @@ CRITICAL INSTRUCTIONS:
 5. Consider both fundamental data AND news sentiment
 
 Please provide your analysis in the following JSON format (respond ONLY with valid JSON, no markdown):
-{{
+{
   "market_overview": "3-4 sentence summary of overall market conditions, sentiment, and key news driving the market today",
   "news_highlights": [
     "Key market-moving news item 1",
     "Key market-moving news item 2",
     "Key market-moving news item 3"
   ],
-  "portfolio_health": {{
+  "portfolio_health": {
     "summary": "Overall assessment of the portfolio based on recent news and price action",
     "alerts": ["Any concerning signals or risks from news or data - list 2-3 items or empty array if none"]
-  }},
+  },
+  "stock_analysis": [
+    {
+      "ticker": "SYMBOL",
+      "sentiment": "Bullish|Neutral|Bearish",
+      "key_news": "Most important news affecting this stock",
+      "analysis": "2-3 sentence analysis based on news and data"
+    }
+  ],
+  "recommendations": [
+    {
+      "ticker": "STOCK_SYMBOL",
+      "action": "Strong Buy|Moderate Buy|Hold|Sell",
+      "current_price": 123.45,
+      "target_price": 135.00,
+      "rationale": "3-4 sentence explanation based heavily on recent news, catalysts, and data. Reference specific news items.",
+      "risk_level": "Low|Medium|High",
+      "timeframe": "1-3 months|3-6 months|6-12 months",
+      "news_catalyst": "The specific news or event driving this recommendation"
+    }
+  ],
+  "action_items": [
+    "Specific actionable advice based on news - list 3-5 items"
+  ]
+}
+
+Provide exactly 3 stock recommendations. Focus on stocks where recent news provides clear catalysts or signals. Be specific and reference actual news events."""
+
+# Per-shard requests only produce stock_analysis entries
+SHARD_INSTRUCTIONS = """CRITICAL INSTRUCTIONS:
+1. **Base your analysis heavily on the recent news** - this is the most important data
+2. Consider how news sentiment affects each stock
+3. Identify catalysts (positive or negative) from the news
+4. Consider both fundamental data AND news sentiment
+
+Analyze EVERY stock in the portfolio table. Respond ONLY with valid JSON in the following format, no markdown:
+{
   "stock_analysis": [
-    {{
+    {
       "ticker": "SYMBOL",
       "sentiment": "Bullish|Neutral|Bearish",
       "key_news": "Most important news affecting this stock",
       "analysis": "2-3 sentence analysis based on news and data"
-    }}
+    }
+  ]
+}"""
+
+# The reduce request produces everything except stock_analysis
+REDUCE_INSTRUCTIONS = """CRITICAL INSTRUCTIONS:
+1. **Base your analysis heavily on the recent news and the per-stock signals** - this is the most important data
+2. Look for sector trends and correlations across the portfolio
+3. Identify catalysts (positive or negative) from the news
+
+Please provide your analysis in the following JSON format (respond ONLY with valid JSON, no markdown):
+{
+  "market_overview": "3-4 sentence summary of overall market conditions, sentiment, and key news driving the market today",
+  "news_highlights": [
+    "Key market-moving news item 1",
+    "Key market-moving news item 2",
+    "Key market-moving news item 3"
   ],
+  "portfolio_health": {
+    "summary": "Overall assessment of the portfolio based on recent news and price action",
+    "alerts": ["Any concerning signals or risks from news or data - list 2-3 items or empty array if none"]
+  },
   "recommendations": [
-    {{
+    {
       "ticker": "STOCK_SYMBOL",
       "action": "Strong Buy|Moderate Buy|Hold|Sell",
       "current_price": 123.45,
@@ -312,93 +2311,620 @@ Please provide your analysis in the following JSON format (respond ONLY with val
       "risk_level": "Low|Medium|High",
       "timeframe": "1-3 months|3-6 months|6-12 months",
       "news_catalyst": "The specific news or event driving this recommendation"
-    }}
+    }
   ],
   "action_items": [
     "Specific actionable advice based on news - list 3-5 items"
   ]
-}}
+}
 
 Provide exactly 3 stock recommendations. Focus on stocks where recent news provides clear catalysts or signals. Be specific and reference actual news events."""
 
+# Indicators sent in the portfolio table: (key, column label, format)
+PROMPT_INDICATORS = [
+    ('return_1m', '1m%', '{:+.1f}'),
+    ('return_3m', '3m%', '{:+.1f}'),
+    ('volatility_1m', 'vol%', '{:.0f}'),
+    ('rsi_14', 'rsi', '{:.0f}'),
+    ('price_vs_sma200', 'vs200d%', '{:+.1f}'),
+    ('drawdown', 'dd%', '{:.1f}'),
+    ('rel_strength_3m', 'rs3m%', '{:+.1f}'),
+    ('corr_portfolio', 'corr', '{:.2f}'),
+]
+
+def _estimate_tokens(text):
+    """Approximate token count (Llama-family tokenizers average about 4 characters per token)"""
+    return (len(text) + 3) // 4
+
+def _compact_number(value):
+    """Format large numbers as 1.2K, 3.4M, 5.6B or 7.8T"""
+    if not isinstance(value, (int, float)):
+        return 'N/A'
+    for threshold, suffix in ((1e12, 'T'), (1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if abs(value) >= threshold:
+            return f"{value / threshold:.1f}{suffix}"
+    return f"{value:g}"
+
+def _clean_summary(summary, title):
+    """Strip HTML from a summary and drop it when it only repeats the title"""
+    text = ' '.join(html.unescape(re.sub(r'<[^>]+>', ' ', summary or '')).split())
+    normalized_title = _normalize_title(title)
+    if not text or text == 'No summary available':
+        return ''
+    if normalized_title and _normalize_title(text).startswith(normalized_title):
+        return ''
+    return text
+
+def _news_informativeness(news_item, position):
+    """Heuristic value of an article in the prompt; the lowest scores are trimmed first"""
+    score = (0.5 + abs(news_item.get('sentiment', 0.0))) / (1 + position)
+    if news_item.get('seen_before'):
+        score *= 0.5
+    return score
+
+def build_analysis_prompt(market_data, token_budget=None, instructions=ANALYSIS_INSTRUCTIONS):
+    """Build a compact analysis prompt that fits a token budget
+    
+    Prices are sent as pipe-delimited tables and news as deduplicated, truncated
+    lines. While over budget, article summaries and then whole articles are
+    dropped, least informative first. Returns the prompt and per-section token usage.
+    """
+    token_budget = token_budget or PROMPT_TOKEN_BUDGET
+    portfolio = market_data.get('portfolio', {})
+    
+    header = ("You are an expert financial analyst with deep knowledge of market trends and news analysis. "
+              "Analyze the following market data and recent news to provide a comprehensive daily brief.\n\n"
+              f"Data as of {market_data.get('timestamp', '')[:10]}.")
+    
+    indices = ['INDICES (name|price|chg%)']
+    for name, data in market_data.get('market_indices', {}).items():
+        indices.append(f"{name}|{data['price']}|{data['change_percent']:+.2f}")
+    
+    # Indicator columns are only sent when the indicator engine produced them
+    with_indicators = any(data.get('indicators') for data in portfolio.values())
+    prices = ['PORTFOLIO (ticker|name|price|chg%|volume|mcap|pe|sector|industry|news sentiment'
+              + ('|' + '|'.join(label for _, label, _ in PROMPT_INDICATORS) if with_indicators else '') + ')']
+    for symbol, data in portfolio.items():
+        cells = [
+            symbol, data['name'], f"{data['price']}", f"{data['change_percent']:+.2f}",
+            _compact_number(data.get('volume')), _compact_number(data.get('market_cap')),
+            f"{data.get('pe_ratio', 'N/A')}", f"{data.get('sector', 'N/A')}", f"{data.get('industry', 'N/A')}",
+            f"{data['news_sentiment']:+.2f}" if 'news_sentiment' in data else 'N/A'
+        ]
+        if with_indicators:
+            indicators = data.get('indicators') or {}
+            cells += [fmt.format(indicators[key]) if indicators.get(key) is not None else 'N/A'
+                      for key, _, fmt in PROMPT_INDICATORS]
+        prices.append('|'.join(cells))
+    
+    def sentiment_tag(item):
+        return f" [{item['sentiment']:+.2f}]" if 'sentiment' in item else ''
+    
+    # Candidate articles with their informativeness; identical summaries are sent once.
+    # Per stock, articles below SENTIMENT_MIN_SIGNAL are skipped unless they are the strongest one
+    articles = []
+    seen_summaries = set()
+    low_signal = 0
+    for position, item in enumerate(market_data.get('market_news', [])[:5]):
+        articles.append({
+            'symbol': None,
+            'line': f"- {item['title']} ({item['publisher']}){sentiment_tag(item)}",
+            'summary': '',
+            'score': _news_informativeness(item, position)
+        })
+    for symbol, data in portfolio.items():
+        news = data.get('news', [])[:3]
+        strongest = max(news, key=lambda item: abs(item.get('sentiment', 0.0)), default=None)
+        for position, item in enumerate(news):
+            if item is not strongest and abs(item.get('sentiment', 1.0)) < SENTIMENT_MIN_SIGNAL:
+                low_signal += 1
+                continue
+            summary = _clean_summary(item.get('summary'), item['title'])[:PROMPT_SUMMARY_CHARS]
+            if summary in seen_summaries:
+                summary = ''
+            seen_summaries.add(summary)
+            articles.append({
+                'symbol': symbol,
+                'line': f"- {item['title']}{sentiment_tag(item)}",
+                'summary': f"  > {summary}" if summary else '',
+                'score': _news_informativeness(item, position)
+            })
+    
+    # Budget is tracked in characters (including newlines) so per-line rounding does not
+    # accumulate; symbol headings are counted up front
+    fixed_lines = [header, instructions, 'MARKET NEWS', 'COMPANY NEWS', *indices, *prices]
+    fixed_lines += [f"[{symbol}] {data['name']}" for symbol, data in portfolio.items() if data.get('news')]
+    budget_chars = token_budget * 4
+    total_chars = sum(len(line) + 2 for line in fixed_lines)
+    total_chars += sum(len(a['line']) + 1 + (len(a['summary']) + 1 if a['summary'] else 0) for a in articles)
+    
+    # Trim least informative summaries first, then least informative articles
+    dropped_summaries = dropped_articles = 0
+    for article in sorted((a for a in articles if a['summary']), key=lambda a: a['score']):
+        if total_chars <= budget_chars:
+            break
+        total_chars -= len(article['summary']) + 1
+        article['summary'] = ''
+        dropped_summaries += 1
+    for article in sorted(articles, key=lambda a: a['score']):
+        if total_chars <= budget_chars:
+            break
+        total_chars -= len(article['line']) + 1
+        article['line'] = ''
+        dropped_articles += 1
+    
+    market_news = ['MARKET NEWS'] + [a['line'] for a in articles if a['symbol'] is None and a['line']]
+    company_news = ['COMPANY NEWS']
+    for symbol, data in portfolio.items():
+        kept = [a for a in articles if a['symbol'] == symbol and a['line']]
+        if kept:
+            company_news.append(f"[{symbol}] {data['name']}")
+            for article in kept:
+                company_news.append(article['line'])
+                if article['summary']:
+                    company_news.append(article['summary'])
+    
+    sections = {
+        'header': header,
+        'indices': '\n'.join(indices),
+        'prices': '\n'.join(prices),
+        'market_news': '\n'.join(market_news),
+        'company_news': '\n'.join(company_news),
+        'instructions': instructions
+    }
+    prompt = '\n\n'.join(sections.values())
+    
+    usage = {name: _estimate_tokens(text) for name, text in sections.items()}
+    usage['total'] = _estimate_tokens(prompt)
+    usage['budget'] = token_budget
+    usage['low_signal_articles'] = low_signal
+    usage['dropped_summaries'] = dropped_summaries
+    usage['dropped_articles'] = dropped_articles
+    
+    breakdown = ', '.join(f"{name} {usage[name]}" for name in sections)
+    print(f"  📏 Prompt ≈{usage['total']} tokens of {token_budget} ({breakdown})")
+    if low_signal:
+        print(f"  🔇 Left out {low_signal} low-signal articles (|sentiment| < {SENTIMENT_MIN_SIGNAL})")
+    if dropped_summaries or dropped_articles:
+        print(f"  ✂️  Trimmed {dropped_summaries} summaries and {dropped_articles} articles to fit the budget")
+    if usage['total'] > token_budget:
+        print("  ⚠️  Prompt still exceeds the token budget after trimming news")
+    
+    return prompt, usage
+
+def build_reduce_prompt(market_data, stock_analysis, token_budget=None):
+    """Build the market-level prompt that combines per-shard stock analyses
+    
+    Stocks with a non-neutral sentiment or a large move are listed first; rows
+    that do not fit the token budget are left out.
+    """
+    token_budget = token_budget or PROMPT_TOKEN_BUDGET
+    portfolio = market_data.get('portfolio', {})
+    
+    header = ("You are an expert financial analyst with deep knowledge of market trends and news analysis. "
+              "The stocks below were analyzed individually; combine them with the market data and news "
+              "into a comprehensive daily brief.\n\n"
+              f"Data as of {market_data.get('timestamp', '')[:10]}.")
+    
+    indices = ['INDICES (name|price|chg%)']
+    for name, data in market_data.get('market_indices', {}).items():
+        indices.append(f"{name}|{data['price']}|{data['change_percent']:+.2f}")
+    
+    market_news = ['MARKET NEWS'] + [
+        f"- {item['title']} ({item['publisher']})" for item in market_data.get('market_news', [])[:5]
+    ]
+    
+    def signal_strength(entry):
+        move = abs(portfolio.get(entry.get('ticker'), {}).get('change_percent', 0))
+        return (entry.get('sentiment') != 'Neutral', move)
+    
+    budget_chars = token_budget * 4
+    used_chars = sum(len(text) + 2 for text in [header, REDUCE_INSTRUCTIONS, *indices, *market_news])
+    signals = ['STOCK SIGNALS (ticker|price|chg%|sentiment|key news)']
+    for entry in sorted(stock_analysis, key=signal_strength, reverse=True):
+        data = portfolio.get(entry.get('ticker'), {})
+        row = (f"{entry.get('ticker')}|{data.get('price', 'N/A')}|{data.get('change_percent', 0):+.2f}|"
+               f"{entry.get('sentiment', 'Neutral')}|{(entry.get('key_news') or '')[:120]}")
+        if used_chars + len(row) + 1 > budget_chars:
+            signals.append(f"({len(stock_analysis) - len(signals) + 1} more stocks omitted, mostly neutral)")
+            break
+        signals.append(row)
+        used_chars += len(row) + 1
+    
+    prompt = '\n\n'.join([header, '\n'.join(indices), '\n'.join(market_news), '\n'.join(signals), REDUCE_INSTRUCTIONS])
+    print(f"  📏 Reduce prompt ≈{_estimate_tokens(prompt)} tokens of {token_budget}")
+    return prompt
+
+def _analysis_messages(prompt):
+    """Chat messages for an analysis prompt"""
+    return [
+        {
+            "role": "system",
+            "content": "You are a professional financial analyst specializing in news-driven market analysis. Always respond with valid JSON only, no markdown formatting. Base recommendations heavily on recent news and events."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+def _symbol_fingerprint(data):
+    """Fingerprint a symbol's analysis inputs: its daily-change bucket and the IDs of its news"""
+    bucket = round(data['change_percent'] / PRICE_BUCKET_PCT)
+    news_ids = sorted(_title_key(_normalize_title(item['title'])) for item in data.get('news', []))
+    return hashlib.sha1(json.dumps([bucket, news_ids]).encode()).hexdigest(), news_ids
+
+def load_reusable_analyses(market_data):
+    """Return stored stock_analysis entries for symbols whose inputs have not changed"""
+    portfolio = market_data.get('portfolio', {})
+    symbols = list(portfolio)
+    stored = {}
+    with _db_lock:
+        for i in range(0, len(symbols), 500):
+            chunk = symbols[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for symbol, fingerprint, analysis, updated_at in _db().execute(
+                    f'SELECT symbol, fingerprint, analysis, updated_at FROM symbol_state WHERE symbol IN ({placeholders})', chunk):
+                stored[symbol] = (fingerprint, analysis, updated_at)
+    
+    reusable = {}
+    max_age = DELTA_MAX_AGE_HOURS * 3600
+    for symbol, (fingerprint, analysis, updated_at) in stored.items():
+        if time.time() - updated_at < max_age and fingerprint == _symbol_fingerprint(portfolio[symbol])[0]:
+            reusable[symbol] = json.loads(analysis)
+    return reusable
+
+def save_symbol_state(market_data, analysis):
+    """Persist each symbol's input fingerprint alongside its latest LLM stock analysis"""
+    portfolio = market_data.get('portfolio', {})
+    now = time.time()
+    rows = []
+    for entry in analysis.get('stock_analysis', []):
+        data = portfolio.get(entry.get('ticker'))
+        if data is not None:
+            fingerprint, news_ids = _symbol_fingerprint(data)
+            rows.append((entry['ticker'], fingerprint, json.dumps(news_ids), json.dumps(entry), now))
+    
+    with _db_lock:
+        conn = _db()
+        with conn:
+            # Reused entries keep their original timestamp so they still age out
+            conn.executemany("""
+                INSERT INTO symbol_state VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    news_ids = excluded.news_ids, analysis = excluded.analysis,
+                    updated_at = CASE WHEN fingerprint = excluded.fingerprint AND analysis = excluded.analysis
+                                      THEN updated_at ELSE excluded.updated_at END,
+                    fingerprint = excluded.fingerprint
+            """, rows)
+
+def _market_fingerprint(market_data):
+    """Fingerprint a whole analysis's inputs: every symbol's fingerprint, index change buckets and market news"""
+    symbols = sorted((symbol, _symbol_fingerprint(data)[0]) for symbol, data in market_data.get('portfolio', {}).items())
+    indices = sorted((name, round(data['change_percent'] / PRICE_BUCKET_PCT))
+                     for name, data in market_data.get('market_indices', {}).items())
+    news = sorted(_title_key(_normalize_title(item['title'])) for item in market_data.get('market_news', []))
+    return hashlib.sha1(json.dumps([symbols, indices, news]).encode()).hexdigest()
+
+def load_reusable_market_analysis(market_data):
+    """Return the stored full analysis if no symbol, index bucket or market headline has changed, else None"""
+    with _db_lock:
+        row = _db().execute('SELECT analysis, updated_at FROM market_state WHERE fingerprint = ?',
+                            (_market_fingerprint(market_data),)).fetchone()
+    if row and time.time() - row[1] < DELTA_MAX_AGE_HOURS * 3600:
+        return json.loads(row[0])
+    return None
+
+def save_market_state(market_data, analysis):
+    """Store a full analysis under its market fingerprint so an unchanged run can skip the LLM"""
+    now = time.time()
+    with _db_lock:
+        conn = _db()
+        with conn:
+            conn.execute('INSERT OR IGNORE INTO market_state VALUES (?, ?, ?)',
+                         (_market_fingerprint(market_data), json.dumps(analysis), now))
+            conn.execute('DELETE FROM market_state WHERE updated_at < ?', (now - DELTA_MAX_AGE_HOURS * 3600,))
+
+def _analyze_sharded(market_data, on_event=None, reused=None):
+    """Analyze a large portfolio as parallel per-shard requests plus one market-level reduce request
+    
+    Symbols in reused already have a stock_analysis entry and are not sent to the
+    LLM. With on_event, each shard's stock analyses are reported as the shard completes.
+    """
+    portfolio = market_data['portfolio']
+    symbols = list(portfolio)
+    reused = reused or {}
+    pending = [symbol for symbol in symbols if symbol not in reused]
+    shards = [pending[i:i + SHARD_SIZE] for i in range(0, len(pending), SHARD_SIZE)]
+    if shards:
+        print(f"  🧩 Splitting {len(pending)} stocks into {len(shards)} shards ({LLM_WORKERS} in parallel)")
+    
+    def analyze_shard(shard):
+        shard_data = {**market_data, 'portfolio': {symbol: portfolio[symbol] for symbol in shard}}
+        prompt, _ = build_analysis_prompt(shard_data, instructions=SHARD_INSTRUCTIONS)
+        try:
+            return complete_json(_analysis_messages(prompt), temperature=0.3, max_tokens=3000).get('stock_analysis', [])
+        except Exception as e:
+            print(f"  ⚠️  Analysis failed for shard {shard[0]}..{shard[-1]}: {e}")
+            return []
+    
+    by_ticker = dict(reused)
+    if on_event:
+        for entry in reused.values():
+            on_event(('item', 'stock_analysis', entry))
+    
+    with ThreadPoolExecutor(max_workers=LLM_WORKERS) as executor:
+        for entries in executor.map(analyze_shard, shards):
+            for entry in entries:
+                if entry.get('ticker') in portfolio:
+                    by_ticker[entry['ticker']] = entry
+                    if on_event:
+                        on_event(('item', 'stock_analysis', entry))
+    
+    stock_analysis = [by_ticker[symbol] for symbol in symbols if symbol in by_ticker]
+    if not stock_analysis:
+        raise RuntimeError("every shard failed")
+    
+    # A failed reduce still leaves the per-stock analysis usable
+    try:
+        prompt = build_reduce_prompt(market_data, stock_analysis)
+        overview = complete_json(_analysis_messages(prompt), temperature=0.3, max_tokens=2000)
+    except Exception as e:
+        print(f"  ⚠️  Market-level analysis failed: {e}")
+        overview = {}
+    
+    overview.pop('stock_analysis', None)
+    return {**overview, 'stock_analysis': stock_analysis}
+
+def analyze_with_groq(market_data, on_event=None):
+    """Send data to Groq for comprehensive analysis including news
+    
+    Portfolios larger than SHARD_SIZE are analyzed in parallel shards and merged.
+    Pass on_event to receive analysis sections as they stream in (see complete_json).
+    If the LLM is skipped (SKIP_LLM) or fails, the local sentiment analysis is returned.
+    """
+    if SKIP_LLM:
+        print("🧮 Skipping Groq, using local sentiment analysis")
+        return local_analysis(market_data)
+    
+    print("🤖 Analyzing market data and news with Groq AI...")
+    
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional financial analyst specializing in news-driven market analysis. Always respond with valid JSON only, no markdown formatting. Base recommendations heavily on recent news and events."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=3000,
-        )
-        
-        response_text = chat_completion.choices[0].message.content
-        
-        # Clean up response - remove markdown if present
-        response_text = response_text.strip()
-        if response_text.startswith('```json'):
-            response_text = response_text.split('```json')[1].split('```')[0].strip()
-        elif response_text.startswith('```'):
-            response_text = response_text.split('```')[1].split('```')[0].strip()
-        
-        analysis = json.loads(response_text)
+        # Symbols whose price bucket and news are unchanged reuse their last analysis
+        portfolio = market_data.get('portfolio', {})
+        reused = load_reusable_analyses(market_data) if DELTA_ANALYSIS else {}
+        # Nothing changed at all: the market-level summary is reused too, without a reduce call
+        analysis = load_reusable_market_analysis(market_data) if reused and len(reused) == len(portfolio) else None
+        if analysis is not None:
+            print(f"  ♻️  Delta analysis: all {len(reused)} symbols and the market inputs unchanged, reusing the last analysis")
+        elif reused:
+            print(f"  ♻️  Delta analysis: {len(portfolio) - len(reused)} symbols recomputed, {len(reused)} reused")
+            analysis = _analyze_sharded(market_data, on_event, reused)
+        elif len(portfolio) > SHARD_SIZE:
+            analysis = _analyze_sharded(market_data, on_event)
+        else:
+            prompt, _ = build_analysis_prompt(market_data)
+            analysis = complete_json(_analysis_messages(prompt), temperature=0.3, max_tokens=3000, on_event=on_event)
+        
+        try:
+            save_symbol_state(market_data, analysis)
+            save_market_state(market_data, analysis)
+        except Exception as e:
+            print(f"  ⚠️  Error saving symbol state: {e}")
+        
         print("✅ Analysis complete")
         return analysis
         
     except json.JSONDecodeError as e:
         print(f"❌ Error parsing JSON response: {e}")
-        print(f"Raw response: {response_text[:500]}...")
-        return None
+    except LookupError as e:
+        print(f"❌ {e}")
     except Exception as e:
         print(f"❌ Error with Groq API: {e}")
-        return None
+    
+    print("🧮 Falling back to local sentiment analysis")
+    return local_analysis(market_data)
 
-def generate_terminal_output(market_data, analysis):
-    """Generate beautiful terminal output with news highlights"""
+class StreamingJSONParser:
+    """Incrementally parses a streamed JSON object and reports members as soon as they complete
+    
+    feed() returns events: ('item', key, element) for each element of a top-level
+    array and ('section', key, value) for each completed top-level member. Anything
+    before the opening brace (such as a markdown fence) is skipped.
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.done = False
+        self._reset_member()
+    
+    def _reset_member(self):
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.array_key = None
+        self.element_start = None
+    
+    def feed(self, text):
+        self.buffer += text
+        events = []
+        
+        while self.pos < len(self.buffer) and not self.done:
+            i = self.pos
+            ch = self.buffer[i]
+            self.pos += 1
+            
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                continue
+            
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.value_start is None:
+                        self.key = json.loads(self.buffer[self.key_start:i + 1])
+                continue
+            
+            if ch.isspace():
+                continue
+            
+            # Mark where the current member's value or array element begins
+            if self.depth == 1 and self.key is not None and self.value_start is None and ch != ':':
+                self.value_start = i
+                if ch == '[':
+                    self.array_key = self.key
+            elif self.array_key is not None and self.depth == 2 and self.element_start is None and ch not in ',]':
+                self.element_start = i
+            
+            if ch == '"':
+                self.in_string = True
+                if self.depth == 1 and self.value_start is None:
+                    self.key_start = i
+            elif ch in '{[':
+                self.depth += 1
+            elif ch in '}]':
+                if self.array_key is not None and self.depth == 2 and self.element_start is not None:
+                    # Scalar element closed by the end of its array
+                    events.append(('item', self.array_key, json.loads(self.buffer[self.element_start:i])))
+                    self.element_start = None
+                self.depth -= 1
+                if self.array_key is not None and self.depth == 2 and self.element_start is not None:
+                    events.append(('item', self.array_key, json.loads(self.buffer[self.element_start:i + 1])))
+                    self.element_start = None
+                if self.depth == 0:
+                    if self.value_start is not None:
+                        events.append(('section', self.key, json.loads(self.buffer[self.value_start:i])))
+                    self.done = True
+            elif ch == ',':
+                if self.depth == 1 and self.value_start is not None:
+                    events.append(('section', self.key, json.loads(self.buffer[self.value_start:i])))
+                    self._reset_member()
+                elif self.array_key is not None and self.depth == 2 and self.element_start is not None:
+                    events.append(('item', self.array_key, json.loads(self.buffer[self.element_start:i])))
+                    self.element_start = None
+        
+        return events
+
+def _parse_json_reply(response_text):
+    """Parse a model reply as JSON, removing markdown fences if present"""
+    response_text = response_text.strip()
+    if response_text.startswith('```json'):
+        response_text = response_text.split('```json')[1].split('```')[0].strip()
+    elif response_text.startswith('```'):
+        response_text = response_text.split('```')[1].split('```')[0].strip()
     
-    # Terminal colors
-    RESET = '\033[0m'
-    BOLD = '\033[1m'
-    GREEN = '\033[92m'
-    RED = '\033[91m'
-    YELLOW = '\033[93m'
-    BLUE = '\033[94m'
-    CYAN = '\033[96m'
-    MAGENTA = '\033[95m'
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        print(f"Raw response: {response_text[:500]}...")
+        raise
+
+def complete_json(messages, model=LLM_MODEL, temperature=0.3, max_tokens=3000, on_event=None):
+    """Run a chat completion and parse its JSON reply, reusing cached responses for identical requests
+    
+    Responses are cached by a hash of the model, parameters and messages. In replay
+    mode (LLM_REPLAY) only the cache is consulted and a miss raises LookupError.
+    With on_event the completion is streamed and each StreamingJSONParser event is
+    passed to on_event as soon as it is parsed; cached responses emit no events.
+    """
+    request = {'model': model, 'temperature': temperature, 'max_tokens': max_tokens, 'messages': messages}
+    key = hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+    started = time.perf_counter()
+    
+    with _db_lock:
+        cached = _db().execute('SELECT response, created_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+    if cached and (LLM_REPLAY or time.time() - cached[1] < LLM_CACHE_TTL):
+        print("  ⚡ Using cached LLM response")
+        _metrics.add_llm(time.perf_counter() - started, cached=True)
+        return json.loads(cached[0])
+    if LLM_REPLAY:
+        raise LookupError("No cached LLM response for this prompt (replay mode)")
+    
+    usage = None
+    if on_event is None:
+        chat_completion = _outbound(GROQ_HOST, _groq_client().chat.completions.create, **request)
+        usage = getattr(chat_completion, 'usage', None)
+        analysis = _parse_json_reply(chat_completion.choices[0].message.content)
+    else:
+        stream = _outbound(GROQ_HOST, _groq_client().chat.completions.create, stream=True, **request)
+        parser = StreamingJSONParser()
+        chunks = []
+        for chunk in stream:
+            # Groq reports token usage on the final chunk
+            x_groq = getattr(chunk, 'x_groq', None)
+            usage = getattr(chunk, 'usage', None) or getattr(x_groq, 'usage', None) or usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content or ''
+            chunks.append(text)
+            try:
+                events = parser.feed(text)
+            except json.JSONDecodeError:
+                # Fall back to parsing the full reply once the stream ends
+                events = []
+                parser.done = True
+            for event in events:
+                on_event(event)
+        analysis = _parse_json_reply(''.join(chunks))
+    _metrics.add_llm(time.perf_counter() - started, usage)
     
+    if LLM_CACHE_TTL > 0:
+        with _db_lock:
+            conn = _db()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)',
+                             (key, json.dumps(analysis), time.time()))
+    return analysis
+
+# Terminal colors
+RESET = '\033[0m'
+BOLD = '\033[1m'
+GREEN = '\033[92m'
+RED = '\033[91m'
+YELLOW = '\033[93m'
+BLUE = '\033[94m'
+CYAN = '\033[96m'
+MAGENTA = '\033[95m'
+
+def _terminal_heading(title, color=BLUE):
+    return f"\n{BOLD}{color}{title}{RESET}\n{'-'*80}\n"
+
+def _terminal_header():
     output = f"\n\n{'='*80}\n"
     output += f"{BOLD}{MAGENTA}📈 YOUR DAILY MARKET BRIEF{RESET}\n"
     output += f"{CYAN}{datetime.now().strftime('%A, %B %d, %Y - %I:%M %p')}{RESET}\n"
     output += f"{'='*80}\n\n"
-    
-    # Market Overview with News
-    output += f"{BOLD}{BLUE}🌍 MARKET OVERVIEW{RESET}\n"
+    return output
+
+def _terminal_indices(market_data):
+    output = f"{BOLD}{BLUE}🌍 MARKET OVERVIEW{RESET}\n"
     output += f"{'-'*80}\n"
     for name, data in market_data['market_indices'].items():
         emoji = "🟢" if data['change_percent'] >= 0 else "🔴"
         color = GREEN if data['change_percent'] >= 0 else RED
         sign = "+" if data['change_percent'] >= 0 else ""
         output += f"{emoji} {BOLD}{name:12}{RESET}: {data['price']:8.2f} ({color}{sign}{data['change_percent']:+6.2f}%{RESET})\n"
-    
-    if analysis and analysis.get('market_overview'):
-        output += f"\n{YELLOW}💡 {analysis['market_overview']}{RESET}\n"
-    
-    # News Highlights
-    if analysis and analysis.get('news_highlights'):
-        output += f"\n{BOLD}{BLUE}📰 KEY NEWS HIGHLIGHTS{RESET}\n"
-        output += f"{'-'*80}\n"
-        for i, highlight in enumerate(analysis['news_highlights'], 1):
-            output += f"{CYAN}{i}.{RESET} {highlight}\n"
-    
-    # Portfolio Health
-    output += f"\n{BOLD}{BLUE}📊 YOUR PORTFOLIO{RESET}\n"
-    output += f"{'-'*80}\n"
+    return output
+
+def _terminal_market_overview(overview):
+    return f"\n{YELLOW}💡 {overview}{RESET}\n"
+
+def _terminal_news_highlight(i, highlight):
+    return f"{CYAN}{i}.{RESET} {highlight}\n"
+
+def _terminal_portfolio(market_data):
+    output = _terminal_heading("📊 YOUR PORTFOLIO")
     
     total_change = 0
     for symbol, data in market_data['portfolio'].items():
@@ -414,312 +2940,812 @@ def generate_terminal_output(market_data, analysis):
     avg_change = total_change / len(market_data['portfolio']) if market_data['portfolio'] else 0
     avg_color = GREEN if avg_change >= 0 else RED
     output += f"\n{BOLD}Average Portfolio Change: {avg_color}{avg_change:+.2f}%{RESET}\n"
+    return output
+
+def _terminal_stock_analysis(stock):
+    sentiment_colors = {
+        'Bullish': GREEN,
+        'Neutral': YELLOW,
+        'Bearish': RED
+    }
+    sent_color = sentiment_colors.get(stock['sentiment'], RESET)
+    
+    output = f"\n{BOLD}{stock['ticker']}{RESET} - {sent_color}{stock['sentiment']}{RESET}\n"
+    output += f"  📰 {stock.get('key_news', 'No major news')}\n"
+    output += f"  💭 {stock.get('analysis', '')}\n"
+    return output
+
+def _terminal_alerts(alerts):
+    output = _terminal_heading("⚠️  ALERTS", YELLOW)
+    for alert in alerts:
+        output += f"  • {alert}\n"
+    return output
+
+def _terminal_recommendation(i, rec):
+    action_colors = {
+        'Strong Buy': GREEN,
+        'Moderate Buy': CYAN,
+        'Hold': YELLOW,
+        'Sell': RED
+    }
+    action_color = action_colors.get(rec['action'], RESET)
+    
+    upside = ((rec['target_price'] - rec['current_price']) / rec['current_price']) * 100
+    
+    output = f"\n{BOLD}{i}. {rec['ticker']} - {action_color}{rec['action']}{RESET}\n"
+    output += f"   Price: ${rec['current_price']:.2f} → Target: ${rec['target_price']:.2f} "
+    output += f"({GREEN if upside > 0 else RED}+{upside:.1f}%{RESET})\n"
+    output += f"   Risk: {rec['risk_level']} | Timeframe: {rec['timeframe']}\n"
+    output += f"   📰 Catalyst: {rec.get('news_catalyst', 'N/A')}\n"
+    output += f"   💡 {rec['rationale']}\n"
+    return output
+
+def _terminal_action_item(i, item):
+    return f"{i}. {item}\n"
+
+def _terminal_recent_news(market_data):
+    output = _terminal_heading("📱 RECENT NEWS BY STOCK")
+    for symbol, data in market_data['portfolio'].items():
+        if data.get('news'):
+            output += f"\n{BOLD}{symbol}{RESET} - {data['name']}\n"
+            for news in data['news'][:3]:
+                output += f"  • {news['title'][:70]}...\n"
+                output += f"    {CYAN}{news['publisher']} - {news['published']}{RESET}\n"
+    return output
+
+def _terminal_footer():
+    output = f"\n{'='*80}\n"
+    output += f"{CYAN}Generated by AI Stock Analyst | Not Financial Advice{RESET}\n"
+    output += f"{'='*80}\n\n"
+    return output
+
+def generate_terminal_output(market_data, analysis):
+    """Generate beautiful terminal output with news highlights"""
+    
+    output = _terminal_header()
+    
+    # Market Overview with News
+    output += _terminal_indices(market_data)
+    
+    if analysis and analysis.get('market_overview'):
+        output += _terminal_market_overview(analysis['market_overview'])
+    
+    # News Highlights
+    if analysis and analysis.get('news_highlights'):
+        output += _terminal_heading("📰 KEY NEWS HIGHLIGHTS")
+        for i, highlight in enumerate(analysis['news_highlights'], 1):
+            output += _terminal_news_highlight(i, highlight)
+    
+    # Portfolio Health
+    output += _terminal_portfolio(market_data)
     
     # Stock-by-Stock News Analysis
     if analysis and analysis.get('stock_analysis'):
-        output += f"\n{BOLD}{BLUE}🔍 STOCK-BY-STOCK ANALYSIS{RESET}\n"
-        output += f"{'-'*80}\n"
+        output += _terminal_heading("🔍 STOCK-BY-STOCK ANALYSIS")
         for stock in analysis['stock_analysis']:
-            sentiment_colors = {
-                'Bullish': GREEN,
-                'Neutral': YELLOW,
-                'Bearish': RED
-            }
-            sent_color = sentiment_colors.get(stock['sentiment'], RESET)
-            
-            output += f"\n{BOLD}{stock['ticker']}{RESET} - {sent_color}{stock['sentiment']}{RESET}\n"
-            output += f"  📰 {stock.get('key_news', 'No major news')}\n"
-            output += f"  💭 {stock.get('analysis', '')}\n"
+            output += _terminal_stock_analysis(stock)
     
     # Alerts
     if analysis and analysis.get('portfolio_health', {}).get('alerts'):
-        output += f"\n{BOLD}{YELLOW}⚠️  ALERTS{RESET}\n"
-        output += f"{'-'*80}\n"
-        for alert in analysis['portfolio_health']['alerts']:
-            output += f"  • {alert}\n"
+        output += _terminal_alerts(analysis['portfolio_health']['alerts'])
     
     # Recommendations
     if analysis and analysis.get('recommendations'):
-        output += f"\n{BOLD}{BLUE}🎯 TODAY'S OPPORTUNITIES (NEWS-DRIVEN){RESET}\n"
-        output += f"{'-'*80}\n"
-        
+        output += _terminal_heading("🎯 TODAY'S OPPORTUNITIES (NEWS-DRIVEN)")
         for i, rec in enumerate(analysis['recommendations'], 1):
-            action_colors = {
-                'Strong Buy': GREEN,
-                'Moderate Buy': CYAN,
-                'Hold': YELLOW,
-                'Sell': RED
-            }
-            action_color = action_colors.get(rec['action'], RESET)
-            
-            upside = ((rec['target_price'] - rec['current_price']) / rec['current_price']) * 100
-            
-            output += f"\n{BOLD}{i}. {rec['ticker']} - {action_color}{rec['action']}{RESET}\n"
-            output += f"   Price: ${rec['current_price']:.2f} → Target: ${rec['target_price']:.2f} "
-            output += f"({GREEN if upside > 0 else RED}+{upside:.1f}%{RESET})\n"
-            output += f"   Risk: {rec['risk_level']} | Timeframe: {rec['timeframe']}\n"
-            output += f"   📰 Catalyst: {rec.get('news_catalyst', 'N/A')}\n"
-            output += f"   💡 {rec['rationale']}\n"
+            output += _terminal_recommendation(i, rec)
     
     # Action Items
     if analysis and analysis.get('action_items'):
-        output += f"\n{BOLD}{BLUE}✅ ACTION ITEMS{RESET}\n"
-        output += f"{'-'*80}\n"
+        output += _terminal_heading("✅ ACTION ITEMS")
         for i, item in enumerate(analysis['action_items'], 1):
-            output += f"{i}. {item}\n"
+            output += _terminal_action_item(i, item)
     
     # Recent News Summary
-    output += f"\n{BOLD}{BLUE}📱 RECENT NEWS BY STOCK{RESET}\n"
-    output += f"{'-'*80}\n"
-    for symbol, data in market_data['portfolio'].items():
-        if data.get('news'):
-            output += f"\n{BOLD}{symbol}{RESET} - {data['name']}\n"
-            for news in data['news'][:3]:
-                output += f"  • {news['title'][:70]}...\n"
-                output += f"    {CYAN}{news['publisher']} - {news['published']}{RESET}\n"
-    
-    output += f"\n{'='*80}\n"
-    output += f"{CYAN}Generated by AI Stock Analyst | Not Financial Advice{RESET}\n"
-    output += f"{'='*80}\n\n"
+    output += _terminal_recent_news(market_data)
+    output += _terminal_footer()
     
     return output
 
-def generate_html_file(market_data, analysis):
-    """Generate enhanced HTML file with news analysis"""
+class TerminalStreamRenderer:
+    """Prints the terminal brief incrementally while the analysis streams in
+    
+    Market data sections are printed by start(); each parser event is printed as
+    it arrives; finish() prints whatever was not streamed (e.g. a cached analysis)
+    followed by the recent news and footer.
+    """
+    
+    headings = {
+        'news_highlights': "📰 KEY NEWS HIGHLIGHTS",
+        'stock_analysis': "🔍 STOCK-BY-STOCK ANALYSIS",
+        'recommendations': "🎯 TODAY'S OPPORTUNITIES (NEWS-DRIVEN)",
+        'action_items': "✅ ACTION ITEMS"
+    }
+    
+    def __init__(self, market_data):
+        self.market_data = market_data
+        self.counts = {}
+        self.rendered = set()
+    
+    def _emit(self, text):
+        print(text, end='', flush=True)
+    
+    def start(self):
+        self._emit(_terminal_header() + _terminal_indices(self.market_data) + _terminal_portfolio(self.market_data))
+    
+    def __call__(self, event):
+        kind, key, value = event
+        if kind == 'item' and key in self.headings:
+            count = self.counts.get(key, 0) + 1
+            self.counts[key] = count
+            output = _terminal_heading(self.headings[key]) if count == 1 else ''
+            if key == 'news_highlights':
+                output += _terminal_news_highlight(count, value)
+            elif key == 'stock_analysis':
+                output += _terminal_stock_analysis(value)
+            elif key == 'recommendations':
+                output += _terminal_recommendation(count, value)
+            else:
+                output += _terminal_action_item(count, value)
+            self._emit(output)
+        elif kind == 'section':
+            if key == 'market_overview' and value:
+                self._emit(_terminal_market_overview(value))
+            elif key == 'portfolio_health' and value.get('alerts'):
+                self._emit(_terminal_alerts(value['alerts']))
+            self.rendered.add(key)
+    
+    def finish(self, analysis):
+        for key, value in (analysis or {}).items():
+            if key in self.rendered:
+                continue
+            if key in self.headings and isinstance(value, list):
+                for item in value[self.counts.get(key, 0):]:
+                    self(('item', key, item))
+            self(('section', key, value))
+        self._emit(_terminal_recent_news(self.market_data) + _terminal_footer())
+
+# HTML report layout: every style lives in one stylesheet so rows only carry class names
+HTML_CSS = """
+body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; background-color: #f5f5f5; }
+a { color: #3b82f6; }
+.banner { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }
+.banner h1 { margin: 0; font-size: 32px; }
+.banner .date { margin: 10px 0 0 0; opacity: 0.9; font-size: 18px; }
+.banner .tagline { margin: 5px 0 0 0; opacity: 0.8; font-size: 14px; }
+.card { background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+.card h2 { color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0; }
+.panel { background: #f3f4f6; padding: 15px; border-radius: 8px; }
+.note { margin-top: 15px; font-style: italic; color: #6b7280; }
+.callout { margin-top: 20px; padding: 15px; border-radius: 8px; border-left: 4px solid; }
+.callout h3 { margin: 0 0 10px 0; }
+.callout ul { margin: 0; padding-left: 20px; }
+.callout.info { background: #eff6ff; border-left-color: #3b82f6; }
+.callout.info h3 { color: #1e40af; }
+.callout.warn { background: #fef3c7; border-left-color: #f59e0b; }
+.callout.warn h3 { color: #92400e; }
+.average { padding: 15px; border-radius: 8px; text-align: center; font-size: 18px; }
+.average.gain { background: #d1fae5; }
+.average.loss { background: #fee2e2; }
+table { width: 100%; border-collapse: collapse; margin-top: 15px; }
+th { padding: 12px; text-align: left; border-bottom: 2px solid #e5e7eb; background: #f3f4f6; }
+td.gain { color: green; }
+td.loss { color: red; }
+.item { background: #f9fafb; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid #6b7280; }
+.item h3 { margin: 0 0 10px 0; color: #6b7280; }
+.item p { margin: 5px 0; }
+.item .catalyst { background: #fef3c7; padding: 8px; border-radius: 4px; }
+.tone-green { border-left-color: #10b981; } .tone-green h3 { color: #10b981; }
+.tone-blue { border-left-color: #3b82f6; } .tone-blue h3 { color: #3b82f6; }
+.tone-amber { border-left-color: #f59e0b; } .tone-amber h3 { color: #f59e0b; }
+.tone-red { border-left-color: #ef4444; } .tone-red h3 { color: #ef4444; }
+.actions { background: #eff6ff; padding: 20px; border-radius: 8px; border-left: 4px solid #3b82f6; margin: 0; }
+.stock-news { margin: 15px 0; }
+.stock-news h3 { color: #1f2937; margin-bottom: 10px; }
+.article { background: #f3f4f6; padding: 10px; margin: 5px 0; border-radius: 5px; }
+.article .title { margin: 0; font-weight: 600; }
+.article .meta { margin: 5px 0 0 0; font-size: 12px; color: #6b7280; }
+details > summary { cursor: pointer; padding: 8px 0; font-weight: 600; color: #374151; }
+.footer { margin-top: 30px; padding: 20px; background: #f9fafb; border-radius: 8px; text-align: center; font-size: 12px; color: #6b7280; }
+.footer p { margin: 10px 0 0 0; }
+.footer p:first-child { margin: 0; }
+"""
+
+_HTML_TONES = {
+    'Bullish': 'tone-green', 'Neutral': 'tone-amber', 'Bearish': 'tone-red',
+    'Strong Buy': 'tone-green', 'Moderate Buy': 'tone-blue', 'Hold': 'tone-amber', 'Sell': 'tone-red',
+}
+
+_HTML_HEAD = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Daily Market Brief - $title_date</title>
+    <style>$css</style>
+</head>
+<body>
+<div class="banner">
+    <h1>📈 Your Daily Market Brief</h1>
+    <p class="date">$long_date</p>
+    <p class="tagline">📰 Powered by Real-Time News Analysis</p>
+</div>
+""")
+_HTML_CARD_OPEN = Template("""<div class="card">
+    <h2>$title</h2>
+""")
+_HTML_CARD_CLOSE = "</div>\n"
+_HTML_INDEX = Template("$emoji <strong>$name</strong>: $price ($change%)<br>\n")
+_HTML_LIST_ITEM = Template("<li>$text</li>\n")
+_HTML_AVERAGE = Template("""<p class="average $tone"><strong>Average Change: $emoji $change%</strong></p>
+""")
+_HTML_TABLE_OPEN = """<table>
+<thead><tr><th>Stock</th><th>Price</th><th>Change</th><th>News</th></tr></thead>
+<tbody>
+"""
+_HTML_TABLE_CLOSE = "</tbody>\n</table>\n"
+_HTML_ROW = Template("""<tr><td>$emoji <strong>$symbol</strong></td><td>$$$price</td><td class="$tone">$change%</td><td>$news_count articles</td></tr>
+""")
+_HTML_PAGE_OPEN = Template("""<details$open><summary>$label</summary>
+""")
+_HTML_PAGE_CLOSE = "</details>\n"
+_HTML_STOCK = Template("""<div class="item $tone">
+    <h3>$ticker - $sentiment</h3>
+    <p><strong>📰 Key News:</strong> $key_news</p>
+    <p>$analysis</p>
+</div>
+""")
+_HTML_RECOMMENDATION = Template("""<div class="item $tone">
+    <h3>$number. $ticker - $action</h3>
+    <p><strong>Price:</strong> $$$current_price → Target: $$$target_price (+$upside%)</p>
+    <p><strong>Risk:</strong> $risk_level | <strong>Timeframe:</strong> $timeframe</p>
+    <p class="catalyst"><strong>📰 News Catalyst:</strong> $news_catalyst</p>
+    <p>$rationale</p>
+</div>
+""")
+_HTML_STOCK_NEWS_OPEN = Template("""<div class="stock-news">
+    <h3>$symbol - $name</h3>
+""")
+_HTML_ARTICLE = Template("""<div class="article">
+    <p class="title">$title</p>
+    <p class="meta">$publisher - $published$link</p>
+</div>
+""")
+_HTML_FOOTER = Template("""<div class="footer">
+    <p><strong>Disclaimer:</strong> This analysis is for informational purposes only and does not constitute financial advice. Always do your own research before making investment decisions.</p>
+    <p>Generated by AI Stock Analyst | $time</p>
+</div>
+</body>
+</html>
+""")
+
+def _escape(value):
+    return html.escape(str(value))
+
+def _html_signed(value):
+    return f"{'+' if value >= 0 else ''}{value}"
+
+def _html_paged(items, render, label, before='', after=''):
+    """Yield rendered items, split into collapsible pages of HTML_PAGE_SIZE when there are more
+    
+    before and after wrap every page, e.g. to give each page its own table.
+    """
+    if len(items) <= HTML_PAGE_SIZE:
+        yield before
+        for item in items:
+            yield render(item)
+        yield after
+        return
     
-    # Market overview section
-    market_html = ""
+    for start in range(0, len(items), HTML_PAGE_SIZE):
+        page = items[start:start + HTML_PAGE_SIZE]
+        yield _HTML_PAGE_OPEN.substitute(
+            open=' open' if start == 0 else '',
+            label=_escape(f"{label} {start + 1}-{start + len(page)} of {len(items)}"))
+        yield before
+        for item in page:
+            yield render(item)
+        yield after
+        yield _HTML_PAGE_CLOSE
+
+def _html_market_overview(market_data, analysis):
+    yield _HTML_CARD_OPEN.substitute(title="🌍 Market Overview")
+    yield '<div class="panel">\n'
     for name, data in market_data['market_indices'].items():
-        emoji = "🟢" if data['change_percent'] >= 0 else "🔴"
-        sign = "+" if data['change_percent'] >= 0 else ""
-        market_html += f"{emoji} <strong>{name}</strong>: {data['price']} ({sign}{data['change_percent']}%)<br>"
+        yield _HTML_INDEX.substitute(
+            emoji="🟢" if data['change_percent'] >= 0 else "🔴", name=_escape(name),
+            price=data['price'], change=_html_signed(data['change_percent']))
+    overview = analysis.get('market_overview', 'Market data collected successfully.') if analysis else 'Market data collected successfully.'
+    yield f'<p class="note">{_escape(overview)}</p>\n</div>\n'
     
-    # News highlights
-    news_highlights_html = ""
-    if analysis and analysis.get('news_highlights'):
-        for highlight in analysis['news_highlights']:
-            news_highlights_html += f"<li>📰 {highlight}</li>"
+    highlights = analysis.get('news_highlights') if analysis else None
+    if highlights:
+        yield '<div class="callout info">\n<h3>📰 Key News Highlights</h3>\n<ul>\n'
+        for highlight in highlights:
+            yield _HTML_LIST_ITEM.substitute(text=f"📰 {_escape(highlight)}")
+        yield '</ul>\n</div>\n'
+    yield _HTML_CARD_CLOSE
+
+def _html_portfolio_row(item):
+    symbol, data = item
+    gain = data['change_percent'] >= 0
+    return _HTML_ROW.substitute(
+        emoji="🟢" if gain else "🔴", symbol=_escape(symbol), price=data['price'],
+        tone='gain' if gain else 'loss', change=_html_signed(data['change_percent']),
+        news_count=data['news_count'])
+
+def _html_portfolio(market_data, analysis):
+    portfolio = market_data['portfolio']
+    yield _HTML_CARD_OPEN.substitute(title="📊 Your Portfolio")
     
-    # Portfolio section
-    portfolio_html = ""
-    total_change = 0
-    for symbol, data in market_data['portfolio'].items():
-        emoji = "🟢" if data['change_percent'] >= 0 else "🔴"
-        sign = "+" if data['change_percent'] >= 0 else ""
-        total_change += data['change_percent']
-        portfolio_html += f"""
-        <tr>
-            <td>{emoji} <strong>{symbol}</strong></td>
-            <td>${data['price']}</td>
-            <td style="color: {'green' if data['change_percent'] >= 0 else 'red'}">{sign}{data['change_percent']}%</td>
-            <td>{data['news_count']} articles</td>
-        </tr>
-        """
+    avg_change = sum(data['change_percent'] for data in portfolio.values()) / len(portfolio) if portfolio else 0
+    yield _HTML_AVERAGE.substitute(
+        tone='gain' if avg_change >= 0 else 'loss', emoji='🟢' if avg_change >= 0 else '🔴',
+        change=f"{'+' if avg_change >= 0 else ''}{avg_change:.2f}")
     
-    avg_change = total_change / len(market_data['portfolio']) if market_data['portfolio'] else 0
+    yield from _html_paged(list(portfolio.items()), _html_portfolio_row, "Stocks",
+                           before=_HTML_TABLE_OPEN, after=_HTML_TABLE_CLOSE)
     
-    # Stock analysis section
-    stock_analysis_html = ""
-    if analysis and analysis.get('stock_analysis'):
-        for stock in analysis['stock_analysis']:
-            sentiment_colors = {
-                'Bullish': '#10b981',
-                'Neutral': '#f59e0b',
-                'Bearish': '#ef4444'
-            }
-            sent_color = sentiment_colors.get(stock['sentiment'], '#6b7280')
-            
-            stock_analysis_html += f"""
-            <div style="background: #f9fafb; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid {sent_color};">
-                <h3 style="margin: 0 0 10px 0; color: {sent_color};">{stock['ticker']} - {stock['sentiment']}</h3>
-                <p style="margin: 5px 0;"><strong>📰 Key News:</strong> {stock.get('key_news', 'No major news')}</p>
-                <p style="margin: 5px 0;">{stock.get('analysis', '')}</p>
-            </div>
-            """
-    
-    # Alerts section
-    alerts_html = ""
-    if analysis and analysis.get('portfolio_health', {}).get('alerts'):
-        for alert in analysis['portfolio_health']['alerts']:
-            alerts_html += f"<li>⚠️ {alert}</li>"
+    yield '<div class="callout warn">\n<h3>⚠️ Alerts</h3>\n<ul>\n'
+    alerts = analysis.get('portfolio_health', {}).get('alerts') if analysis else None
+    if alerts:
+        for alert in alerts:
+            yield _HTML_LIST_ITEM.substitute(text=f"⚠️ {_escape(alert)}")
     else:
-        alerts_html = "<li>✅ No major alerts detected</li>"
+        yield _HTML_LIST_ITEM.substitute(text="✅ No major alerts detected")
+    yield '</ul>\n</div>\n'
+    yield _HTML_CARD_CLOSE
+
+def _html_stock(stock):
+    return _HTML_STOCK.substitute(
+        tone=_HTML_TONES.get(stock.get('sentiment'), ''), ticker=_escape(stock.get('ticker', '')),
+        sentiment=_escape(stock.get('sentiment', '')), key_news=_escape(stock.get('key_news', 'No major news')),
+        analysis=_escape(stock.get('analysis', '')))
+
+def _html_recommendation(number, rec):
+    upside = ((rec['target_price'] - rec['current_price']) / rec['current_price']) * 100
+    return _HTML_RECOMMENDATION.substitute(
+        tone=_HTML_TONES.get(rec['action'], ''), number=number, ticker=_escape(rec['ticker']),
+        action=_escape(rec['action']), current_price=rec['current_price'], target_price=rec['target_price'],
+        upside=f"{upside:.1f}", risk_level=_escape(rec['risk_level']), timeframe=_escape(rec['timeframe']),
+        news_catalyst=_escape(rec.get('news_catalyst', 'N/A')), rationale=_escape(rec['rationale']))
+
+def _html_stock_news(item):
+    symbol, data = item
+    parts = [_HTML_STOCK_NEWS_OPEN.substitute(symbol=_escape(symbol), name=_escape(data['name']))]
+    for news in data['news'][:3]:
+        link = news.get('link')
+        parts.append(_HTML_ARTICLE.substitute(
+            title=_escape(news['title']), publisher=_escape(news['publisher']), published=_escape(news['published']),
+            link=f' | <a href="{_escape(link)}" target="_blank">Read more →</a>' if link else ''))
+    parts.append('</div>\n')
+    return ''.join(parts)
+
+def _html_chunks(market_data, analysis):
+    """Yield the HTML report in small chunks, section by section"""
+    now = datetime.now()
+    yield _HTML_HEAD.substitute(title_date=now.strftime('%B %d, %Y'), long_date=now.strftime('%A, %B %d, %Y'), css=HTML_CSS)
+    yield from _html_market_overview(market_data, analysis)
+    yield from _html_portfolio(market_data, analysis)
     
-    # Recommendations section
-    recommendations_html = ""
-    if analysis and analysis.get('recommendations'):
-        for i, rec in enumerate(analysis['recommendations'], 1):
-            action_color = {
-                'Strong Buy': '#10b981',
-                'Moderate Buy': '#3b82f6',
-                'Hold': '#f59e0b',
-                'Sell': '#ef4444'
-            }.get(rec['action'], '#6b7280')
-            
-            upside = ((rec['target_price'] - rec['current_price']) / rec['current_price']) * 100
-            
-            recommendations_html += f"""
-            <div style="background: #f9fafb; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid {action_color};">
-                <h3 style="margin: 0 0 10px 0; color: {action_color};">{i}. {rec['ticker']} - {rec['action']}</h3>
-                <p style="margin: 5px 0;"><strong>Price:</strong> ${rec['current_price']} → Target: ${rec['target_price']} (+{upside:.1f}%)</p>
-                <p style="margin: 5px 0;"><strong>Risk:</strong> {rec['risk_level']} | <strong>Timeframe:</strong> {rec['timeframe']}</p>
-                <p style="margin: 5px 0; background: #fef3c7; padding: 8px; border-radius: 4px;"><strong>📰 News Catalyst:</strong> {rec.get('news_catalyst', 'N/A')}</p>
-                <p style="margin: 5px 0;">{rec['rationale']}</p>
-            </div>
-            """
-    
-    # Action items section
-    action_items_html = ""
-    if analysis and analysis.get('action_items'):
-        for item in analysis['action_items']:
-            action_items_html += f"<li>{item}</li>"
+    stocks = analysis.get('stock_analysis') if analysis else None
+    if stocks:
+        yield _HTML_CARD_OPEN.substitute(title="🔍 Stock-by-Stock Analysis")
+        yield from _html_paged(stocks, _html_stock, "Stocks")
+        yield _HTML_CARD_CLOSE
     
-    # Recent news section
-    news_by_stock_html = ""
-    for symbol, data in market_data['portfolio'].items():
-        if data.get('news'):
-            news_by_stock_html += f"""
-            <div style="margin: 15px 0;">
-                <h3 style="color: #1f2937; margin-bottom: 10px;">{symbol} - {data['name']}</h3>
-            """
-            for news in data['news'][:3]:
-                news_by_stock_html += f"""
-                <div style="background: #f3f4f6; padding: 10px; margin: 5px 0; border-radius: 5px;">
-                    <p style="margin: 0; font-weight: 600;">{news['title']}</p>
-                    <p style="margin: 5px 0 0 0; font-size: 12px; color: #6b7280;">
-                        {news['publisher']} - {news['published']}
-                        {f' | <a href="{news["link"]}" target="_blank" style="color: #3b82f6;">Read more →</a>' if news.get('link') else ''}
-                    </p>
-                </div>
-                """
-            news_by_stock_html += "</div>"
-    
-# Complete HTML
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Daily Market Brief - {datetime.now().strftime('%B %d, %Y')}</title>
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; background-color: #f5f5f5;">
-        
-        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; text-align: center; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-            <h1 style="margin: 0; font-size: 32px;">📈 Your Daily Market Brief</h1>
-            <p style="margin: 10px 0 0 0; opacity: 0.9; font-size: 18px;">{datetime.now().strftime('%A, %B %d, %Y')}</p>
-            <p style="margin: 5px 0 0 0; opacity: 0.8; font-size: 14px;">📰 Powered by Real-Time News Analysis</p>
-        </div>
-        
-        <div style="background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h2 style="color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0;">🌍 Market Overview</h2>
-            <div style="background: #f3f4f6; padding: 15px; border-radius: 8px;">
-                {market_html}
-                <p style="margin-top: 15px; font-style: italic; color: #6b7280;">
-                    {analysis.get('market_overview', 'Market data collected successfully.') if analysis else 'Market data collected successfully.'}
-                </p>
-            </div>
-            
-            {f'''
-            <div style="margin-top: 20px; background: #eff6ff; padding: 15px; border-radius: 8px; border-left: 4px solid #3b82f6;">
-                <h3 style="margin: 0 0 10px 0; color: #1e40af;">📰 Key News Highlights</h3>
-                <ul style="margin: 0; padding-left: 20px;">
-                    {news_highlights_html}
-                </ul>
-            </div>
-            ''' if news_highlights_html else ''}
-        </div>
-        
-        <div style="background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h2 style="color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0;">📊 Your Portfolio</h2>
-            <p style="background: {'#d1fae5' if avg_change >= 0 else '#fee2e2'}; padding: 15px; border-radius: 8px; text-align: center; font-size: 18px;">
-                <strong>Average Change: {'🟢' if avg_change >= 0 else '🔴'} {'+' if avg_change >= 0 else ''}{avg_change:.2f}%</strong>
-            </p>
-            <table style="width: 100%; border-collapse: collapse; margin-top: 15px;">
-                <thead>
-                    <tr style="background: #f3f4f6;">
-                        <th style="padding: 12px; text-align: left; border-bottom: 2px solid #e5e7eb;">Stock</th>
-                        <th style="padding: 12px; text-align: left; border-bottom: 2px solid #e5e7eb;">Price</th>
-                        <th style="padding: 12px; text-align: left; border-bottom: 2px solid #e5e7eb;">Change</th>
-                        <th style="padding: 12px; text-align: left; border-bottom: 2px solid #e5e7eb;">News</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {portfolio_html}
-                </tbody>
-            </table>
-            
-            <div style="margin-top: 20px; background: #fef3c7; padding: 15px; border-radius: 8px; border-left: 4px solid #f59e0b;">
-                <h3 style="margin: 0 0 10px 0; color: #92400e;">⚠️ Alerts</h3>
-                <ul style="margin: 0; padding-left: 20px;">
-                    {alerts_html}
-                </ul>
-            </div>
-        </div>
-        
-        {f'''
-        <div style="background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h2 style="color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0;">🔍 Stock-by-Stock Analysis</h2>
-            {stock_analysis_html}
-        </div>
-        ''' if stock_analysis_html else ''}
-        
-        <div style="background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h2 style="color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0;">🎯 Today's Opportunities</h2>
-            <p style="color: #6b7280; font-style: italic;">Based on recent news and market analysis</p>
-            {recommendations_html}
-        </div>
-        
-        <div style="background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h2 style="color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0;">💡 Action Items</h2>
-            <ul style="background: #eff6ff; padding: 20px; border-radius: 8px; border-left: 4px solid #3b82f6; margin: 0;">
-                {action_items_html}
-            </ul>
-        </div>
-        
-        <div style="background: white; margin: 20px 0; padding: 20px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-            <h2 style="color: #1f2937; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; margin-top: 0;">📱 Recent News by Stock</h2>
-            {news_by_stock_html}
-        </div>
-        
-        <div style="margin-top: 30px; padding: 20px; background: #f9fafb; border-radius: 8px; text-align: center; font-size: 12px; color: #6b7280;">
-            <p style="margin: 0;"><strong>Disclaimer:</strong> This analysis is for informational purposes only and does not constitute financial advice. Always do your own research before making investment decisions.</p>
-            <p style="margin: 10px 0 0 0;">Generated by AI Stock Analyst | {datetime.now().strftime('%I:%M %p')}</p>
-        </div>
-        
-    </body>
-    </html>
-    """
-    
-    # Save to file
-    filename = f"market_brief_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html)
+    yield _HTML_CARD_OPEN.substitute(title="🎯 Today's Opportunities")
+    yield '<p class="note">Based on recent news and market analysis</p>\n'
+    for i, rec in enumerate((analysis or {}).get('recommendations') or [], 1):
+        yield _html_recommendation(i, rec)
+    yield _HTML_CARD_CLOSE
+    
+    yield _HTML_CARD_OPEN.substitute(title="💡 Action Items")
+    yield '<ul class="actions">\n'
+    for item in (analysis or {}).get('action_items') or []:
+        yield _HTML_LIST_ITEM.substitute(text=_escape(item))
+    yield '</ul>\n'
+    yield _HTML_CARD_CLOSE
+    
+    yield _HTML_CARD_OPEN.substitute(title="📱 Recent News by Stock")
+    with_news = [(symbol, data) for symbol, data in market_data['portfolio'].items() if data.get('news')]
+    yield from _html_paged(with_news, _html_stock_news, "News for stocks")
+    yield _HTML_CARD_CLOSE
+    
+    yield _HTML_FOOTER.substitute(time=now.strftime('%I:%M %p'))
+
+def generate_html_file(market_data, analysis, name=None):
+    """Generate enhanced HTML file with news analysis
+    
+    The report is streamed to disk section by section, so memory use does not grow
+    with the portfolio. Long lists are split into collapsible pages of HTML_PAGE_SIZE.
+    A portfolio name, if given, becomes part of the file name.
+    """
+    label = f"{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}_" if name else ''
+    filename = f"market_brief_{label}{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+    with open(filename, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER) as f:
+        for chunk in _html_chunks(market_data, analysis):
+            f.write(chunk)
     
     return filename
 
+def load_portfolios(path):
+    """Load named portfolios from a JSON file
+    
+    The file maps each name to a list of symbols, or to an object with a "symbols" list:
+    {"growth": ["NVDA", "TSLA"], "income": {"symbols": ["KO", "PG"]}}
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    
+    portfolios = {}
+    for name, entry in config.items():
+        symbols = entry.get('symbols', []) if isinstance(entry, dict) else entry
+        portfolios[name] = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+    return portfolios
+
+def portfolio_view(market_data, symbols, correlation=None):
+    """Restrict shared market data to one portfolio's symbols
+    
+    Indices and market news are shared, not copied. Pass a correlation Series (see
+    portfolio_correlation) to replace each stock's corr_portfolio indicator.
+    """
+    view = dict(market_data)
+    view['portfolio'] = {}
+    for symbol in symbols:
+        entry = market_data['portfolio'].get(symbol)
+        if entry is None:
+            continue
+        if correlation is not None and entry.get('indicators'):
+            value = correlation.get(symbol)
+            entry = {**entry, 'indicators': {**entry['indicators'],
+                                             'corr_portfolio': None if pd.isna(value) else round(float(value), 2)}}
+        view['portfolio'][symbol] = entry
+    return view
+
+def run_portfolio_analyses(portfolios):
+    """Collect every unique symbol once, then analyze and report each portfolio separately"""
+    union = list(dict.fromkeys(symbol for symbols in portfolios.values() for symbol in symbols))
+    print(f"🗂️  {len(portfolios)} portfolios, {sum(len(s) for s in portfolios.values())} holdings, {len(union)} unique symbols\n")
+    
+    # The price panel loaded for the indicators is reused to recompute
+    # correlations against each portfolio's own holdings
+    with timed('collect'):
+        market_data, panel = collect_market_data(union, with_panel=True)
+    
+    reports = {}
+    briefs = {}
+    for name, symbols in portfolios.items():
+        print(f"\n{'-'*80}\n📁 Portfolio: {name} ({len(symbols)} stocks)\n{'-'*80}")
+        try:
+            correlation = portfolio_correlation(panel, symbols) if panel is not None else None
+            view = portfolio_view(market_data, symbols, correlation)
+            with timed('analyze'):
+                analysis = analyze_with_groq(view)
+            briefs[name] = (view, analysis)
+            with timed('render'):
+                reports[name] = generate_html_file(view, analysis, name)
+            print(f"💾 Report saved to: {reports[name]}")
+        except Exception as e:
+            print(f"❌ Error analyzing portfolio {name}: {e}")
+    
+    try:
+        save_snapshot(briefs)
+    except Exception as e:
+        print(f"⚠️  Could not save snapshot: {e}")
+    if ARCHIVE_DIR:
+        try:
+            archive_briefs(briefs)
+        except Exception as e:
+            print(f"⚠️  Could not archive briefs: {e}")
+    return reports
+
+def _json_default(value):
+    """Serialize snapshot views, NumPy scalars and anything else json does not know"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence):
+        return list(value)
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def _market_snapshot_path(name):
+    """Binary market data file for one brief, next to SNAPSHOT_FILE"""
+    return f"{os.path.splitext(SNAPSHOT_FILE)[0]}.{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}.bin"
+
+def save_snapshot(briefs):
+    """Save each brief's analysis, keyed by portfolio name, to SNAPSHOT_FILE
+    
+    Market data goes to a binary MarketSnapshot per brief that other processes can
+    map without parsing; SNAPSHOT_FILE records its path.
+    """
+    saved = {}
+    for name, (market_data, analysis) in briefs.items():
+        path = _market_snapshot_path(name)
+        packed = market_data.snapshot if isinstance(market_data, MarketDataView) else MarketSnapshot.from_market_data(market_data)
+        packed.save(path)
+        saved[name] = {'market_data': path, 'stocks': len(market_data.get('portfolio', {})), 'analysis': analysis}
+    
+    snapshot = {'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'briefs': saved}
+    with open(SNAPSHOT_FILE + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, default=_json_default)
+    os.replace(SNAPSHOT_FILE + '.tmp', SNAPSHOT_FILE)
+
+def load_snapshot():
+    """Load the snapshot written by the last run"""
+    with open(SNAPSHOT_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+def load_brief_market_data(brief):
+    """Market data for a snapshot brief, mapped from its binary snapshot"""
+    market_data = brief['market_data']
+    # Snapshots from older versions embedded the market data dict
+    return MarketSnapshot.load(market_data).view() if isinstance(market_data, str) else market_data
+
+def render_snapshot(name=None, html_report=False):
+    """Render a brief from the last-run snapshot to the terminal or an HTML file; returns an exit code"""
+    try:
+        snapshot = load_snapshot()
+    except FileNotFoundError:
+        print(f"❌ No snapshot found at {SNAPSHOT_FILE}; run an analysis first")
+        return 1
+    
+    briefs = snapshot['briefs']
+    name = name or next(iter(briefs), None)
+    if name not in briefs:
+        print(f"❌ No brief named {name!r} in the snapshot (available: {', '.join(briefs) or 'none'})")
+        return 1
+    
+    brief = briefs[name]
+    market_data = load_brief_market_data(brief)
+    print(f"🗄️  Snapshot from {snapshot['saved_at']}" + (f" - portfolio {name}" if name != 'default' else ''))
+    if html_report:
+        filename = generate_html_file(market_data, brief['analysis'], None if name == 'default' else name)
+        print(f"💾 Report saved to: {filename}")
+    else:
+        print(generate_terminal_output(market_data, brief['analysis']))
+    return 0
+
+def _archive_index():
+    """Open the archive's side index, creating the directory and tables on first use"""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(ARCHIVE_DIR, 'index.db'))
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY,
+            run_at TEXT NOT NULL,
+            brief TEXT NOT NULL,
+            segment TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS records_run_at ON records (run_at);
+        -- One row per ticker per archived brief; answers history queries without reading segments
+        CREATE TABLE IF NOT EXISTS tickers (
+            ticker TEXT NOT NULL,
+            run_at TEXT NOT NULL,
+            record_id INTEGER NOT NULL,
+            held INTEGER NOT NULL,
+            price REAL,
+            change_percent REAL,
+            news_sentiment REAL,
+            sentiment TEXT,
+            PRIMARY KEY (ticker, run_at, record_id)
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+def _archive_tickers(market_data, analysis):
+    """Index rows for a brief: every held symbol plus any other ticker the analysis covers"""
+    rows = {}
+    for symbol, data in market_data.get('portfolio', {}).items():
+        rows[symbol] = [True, data['price'], data['change_percent'], data.get('news_sentiment'), None]
+    for entry in (analysis.get('stock_analysis') or []) + (analysis.get('recommendations') or []):
+        ticker = entry.get('ticker') if isinstance(entry, dict) else None
+        if ticker:
+            row = rows.setdefault(ticker, [False, None, None, None, None])
+            row[4] = row[4] or entry.get('sentiment')
+    return rows
+
+def archive_briefs(briefs):
+    """Append each brief to today's archive segment and index it by date and ticker
+    
+    Segments are ARCHIVE_DIR/<date>.jsonl.gz. Every brief is its own gzip member
+    (gzip files may be concatenated), so the index can point at a byte range that
+    is read and decompressed on its own. Segments are only ever appended to.
+    """
+    run_at = datetime.now().isoformat(timespec='seconds')
+    segment = f"{run_at[:10]}.jsonl.gz"
+    conn = _archive_index()
+    try:
+        with open(os.path.join(ARCHIVE_DIR, segment), 'ab') as f, conn:
+            for name, (market_data, analysis) in briefs.items():
+                record = json.dumps({'run_at': run_at, 'brief': name, 'market_data': market_data,
+                                     'analysis': analysis}, default=_json_default)
+                member = gzip.compress(record.encode('utf-8') + b'\n')
+                offset = f.seek(0, os.SEEK_END)
+                f.write(member)
+                f.flush()
+                record_id = conn.execute(
+                    'INSERT INTO records (run_at, brief, segment, offset, length) VALUES (?, ?, ?, ?, ?)',
+                    (run_at, name, segment, offset, len(member))).lastrowid
+                conn.executemany('INSERT OR REPLACE INTO tickers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [
+                    (ticker, run_at, record_id, held, price, change, news_sentiment, sentiment)
+                    for ticker, (held, price, change, news_sentiment, sentiment)
+                    in _archive_tickers(market_data, analysis).items()])
+    finally:
+        conn.close()
+    print(f"🗃️  Archived {len(briefs)} brief(s) to {os.path.join(ARCHIVE_DIR, segment)}")
+
+def read_archive_record(segment, offset, length):
+    """Read one archived brief by seeking to its gzip member"""
+    with open(os.path.join(ARCHIVE_DIR, segment), 'rb') as f:
+        f.seek(offset)
+        return json.loads(gzip.decompress(f.read(length)))
+
+def query_archive(ticker, days=90):
+    """Index rows for a ticker over the last `days` days, oldest first"""
+    if not ARCHIVE_DIR or not os.path.exists(os.path.join(ARCHIVE_DIR, 'index.db')):
+        return []
+    since = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+    conn = _archive_index()
+    try:
+        return conn.execute("""
+            SELECT t.run_at, r.brief, t.held, t.price, t.change_percent, t.news_sentiment, t.sentiment,
+                   r.segment, r.offset, r.length
+            FROM tickers t JOIN records r ON r.id = t.record_id
+            WHERE t.ticker = ? AND t.run_at >= ?
+            ORDER BY t.run_at, r.id
+        """, (ticker.upper(), since)).fetchall()
+    finally:
+        conn.close()
+
+def format_ticker_history(ticker, days=90):
+    """Price and sentiment history of a ticker, from the index alone"""
+    rows = query_archive(ticker, days)
+    if not rows:
+        return f"No archived briefs cover {ticker.upper()} in the last {days} days"
+    
+    def number(value, fmt):
+        return format(value, fmt) if value is not None else 'N/A'
+    
+    lines = [f"📈 {ticker.upper()} over the last {days} days ({len(rows)} briefs)",
+             f"  {'run':<19}  {'brief':<12} {'price':>10} {'chg%':>7} {'news':>6}  analysis"]
+    for run_at, brief, held, price, change, news_sentiment, sentiment, *_ in rows:
+        lines.append(f"  {run_at.replace('T', ' '):<19}  {brief[:12]:<12} {number(price, '10.2f')} "
+                     f"{number(change, '+7.2f')} {number(news_sentiment, '+6.2f')}  {sentiment or '-'}")
+    return '\n'.join(lines)
+
+def format_ticker_briefs(ticker, days=90, limit=20):
+    """The most recent archived briefs covering a ticker, read back with one seek each"""
+    ticker = ticker.upper()
+    rows = query_archive(ticker, days)[-limit:]
+    if not rows:
+        return f"No archived briefs cover {ticker} in the last {days} days"
+    
+    lines = [f"🗃️  Latest {len(rows)} briefs covering {ticker} (last {days} days)"]
+    for run_at, brief, *_, segment, offset, length in reversed(rows):
+        analysis = read_archive_record(segment, offset, length)['analysis']
+        lines.append(f"\n{run_at.replace('T', ' ')} - {brief}")
+        overview = analysis.get('market_overview', '')
+        if overview:
+            lines.append(f"  Market: {overview[:200]}")
+        for entry in analysis.get('stock_analysis', []):
+            if entry.get('ticker') == ticker:
+                lines.append(f"  {ticker}: {entry.get('sentiment', 'N/A')} - {entry.get('analysis', '')}")
+                if entry.get('key_news'):
+                    lines.append(f"  News: {entry['key_news']}")
+    return '\n'.join(lines)
+
+def format_status():
+    """Summarize the last run, the on-disk caches and the latest metrics without loading the data stack"""
+    lines = ["📋 Stock Analyst status"]
+    
+    try:
+        snapshot = load_snapshot()
+        stocks = sum(brief['stocks'] if 'stocks' in brief else len(brief['market_data'].get('portfolio', {}))
+                     for brief in snapshot['briefs'].values())
+        lines.append(f"  Last run:    {snapshot['saved_at']} ({len(snapshot['briefs'])} briefs, {stocks} stocks)")
+    except FileNotFoundError:
+        lines.append(f"  Last run:    no snapshot at {SNAPSHOT_FILE}")
+    except Exception as e:
+        lines.append(f"  Last run:    unreadable snapshot ({e})")
+    
+    if os.path.exists(CACHE_DB):
+        conn = sqlite3.connect(f"file:{urllib.parse.quote(CACHE_DB)}?mode=ro", uri=True)
+        try:
+            counts = []
+            for table, label in (('price_sync', 'symbols'), ('price_bars', 'bars'), ('feeds', 'feeds'),
+                                 ('llm_cache', 'LLM responses'), ('symbol_state', 'stock analyses')):
+                try:
+                    counts.append(f"{conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]} {label}")
+                except sqlite3.Error:
+                    pass
+            try:
+                sources = conn.execute('SELECT source, AVG(hit_rate), AVG(latency), SUM(samples) FROM news_sources '
+                                       'GROUP BY source ORDER BY source').fetchall()
+            except sqlite3.Error:
+                sources = []
+        finally:
+            conn.close()
+        lines.append(f"  Cache:       {CACHE_DB} ({os.path.getsize(CACHE_DB) / 1e6:.1f} MB): {', '.join(counts)}")
+        if sources:
+            lines.append("  News:        " + ', '.join(f"{source} {hit_rate:.0%} full in {latency:.2f}s ({samples} fetches)"
+                                                  for source, hit_rate, latency, samples in sources))
+    else:
+        lines.append(f"  Cache:       no cache database at {CACHE_DB}")
+    
+    index_path = os.path.join(ARCHIVE_DIR, 'index.db') if ARCHIVE_DIR else ''
+    if index_path and os.path.exists(index_path):
+        conn = sqlite3.connect(f"file:{urllib.parse.quote(index_path)}?mode=ro", uri=True)
+        try:
+            records, days, first = conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT substr(run_at, 1, 10)), MIN(run_at) FROM records').fetchone()
+        finally:
+            conn.close()
+        size = sum(entry.stat().st_size for entry in os.scandir(ARCHIVE_DIR) if entry.name.endswith('.jsonl.gz'))
+        lines.append(f"  Archive:     {ARCHIVE_DIR} ({size / 1e6:.1f} MB): {records} briefs over {days} days"
+                     + (f" since {first[:10]}" if first else ''))
+    
+    runs = sorted(name for name in os.listdir(METRICS_DIR) if name.startswith('run_')) if METRICS_DIR and os.path.isdir(METRICS_DIR) else []
+    if runs:
+        with open(os.path.join(METRICS_DIR, runs[-1]), encoding='utf-8') as f:
+            metrics = json.load(f)
+        requests_made = sum(host['requests'] for host in metrics['hosts'].values())
+        lines.append(f"  Last metrics: {runs[-1]} - {metrics['duration_seconds']:.1f}s, {requests_made} requests, "
+                     f"{metrics['llm']['calls']} LLM calls")
+    
+    heavy = [name for name in ('pandas', 'numpy', 'yfinance', 'groq', 'httpx', 'feedparser') if name in sys.modules]
+    lines.append(f"  Data stack loaded: {', '.join(heavy) or 'no'}")
+    return '\n'.join(lines)
+
 def run_daily_analysis():
     """Main workflow"""
     print(f"\n{'='*80}")
     print(f"🚀 Starting Daily Analysis with News")
     print(f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*80}\n")
+    metrics = reset_metrics()
     
     try:
-        # Step 1: Collect data and news
-        market_data = collect_market_data()
-        
-        # Step 2: Analyze with AI
-        analysis = analyze_with_groq(market_data)
+        if PORTFOLIOS_FILE:
+            # One collection pass for all portfolios, then a report per portfolio
+            run_portfolio_analyses(load_portfolios(PORTFOLIOS_FILE))
+        else:
+            # Step 1: Collect data and news
+            with timed('collect'):
+                market_data = collect_market_data()
         
-        # Step 3: Generate terminal output
-        terminal_output = generate_terminal_output(market_data, analysis)
-        print(terminal_output)
+            if STREAM_OUTPUT:
+                # Steps 2-3: Print the brief while the analysis streams in
+                renderer = TerminalStreamRenderer(market_data)
+                renderer.start()
+                with timed('analyze'):
+                    analysis = analyze_with_groq(market_data, on_event=renderer)
+                renderer.finish(analysis)
+            else:
+                # Step 2: Analyze with AI
+                with timed('analyze'):
+                    analysis = analyze_with_groq(market_data)
+            
+                # Step 3: Generate terminal output
+                with timed('render'):
+                    terminal_output = generate_terminal_output(market_data, analysis)
+                print(terminal_output)
+            
+            try:
+                save_snapshot({'default': (market_data, analysis)})
+            except Exception as e:
+                print(f"⚠️  Could not save snapshot: {e}")
+            if ARCHIVE_DIR:
+                try:
+                    archive_briefs({'default': (market_data, analysis)})
+                except Exception as e:
+                    print(f"⚠️  Could not archive brief: {e}")
         
-        # Step 4: Generate HTML file
-        #html_filename = generate_html_file(market_data, analysis)
-        #print(f"💾 Report saved to: {html_filename}")
-        #print(f"📂 Open this file in your browser to view the formatted report\n")
+            # Step 4: Generate HTML file
+            #html_filename = generate_html_file(market_data, analysis)
+            #print(f"💾 Report saved to: {html_filename}")
+            #print(f"📂 Open this file in your browser to view the formatted report\n")
         
         print(f"{'='*80}")
         print("✅ Daily analysis complete!")
@@ -729,14 +3755,158 @@ def run_daily_analysis():
         print(f"\n❌ Error in daily analysis: {e}\n")
         import traceback
         traceback.print_exc()
+    
+    try:
+        write_metrics(metrics)
+    except Exception as e:
+        print(f"⚠️  Could not write run metrics: {e}")
+    if PROFILE:
+        print(format_profile(metrics))
+
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_run_lock = threading.Lock()
+
+def _schedule_days():
+    """Expand SCHEDULE_DAYS into schedule weekday names, or ['day'] for every day"""
+    spec = SCHEDULE_DAYS.strip().lower()
+    if spec in ('', 'daily', 'day'):
+        return ['day']
+    if spec == 'weekdays':
+        return _WEEKDAYS[:5]
+    days = []
+    for part in spec.split(','):
+        matches = [day for day in _WEEKDAYS if part.strip() and day.startswith(part.strip())]
+        if len(matches) != 1:
+            raise ValueError(f"Unknown day in SCHEDULE_DAYS: {part!r}")
+        days.append(matches[0])
+    return days
+
+def describe_schedule():
+    """One-line summary of the daemon schedule for the startup banner"""
+    days = _schedule_days()
+    when = 'daily' if days == ['day'] else ', '.join(day[:3].title() for day in days)
+    text = f"{', '.join(SCHEDULE_TIMES)} {when}"
+    if INTRADAY_MINUTES > 0:
+        text += f", every {INTRADAY_MINUTES} min during market hours ({MARKET_OPEN}-{MARKET_CLOSE} ET, Mon-Fri)"
+    return text
+
+def market_is_open(now=None):
+    """True during regular US trading hours (holidays are not tracked)"""
+    now = now or datetime.now(ZoneInfo(MARKET_TIMEZONE))
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= now.strftime('%H:%M') < MARKET_CLOSE
+
+def start_analysis_run(trigger='scheduled'):
+    """Start run_daily_analysis in a background thread unless a run is still in progress"""
+    if not _run_lock.acquire(blocking=False):
+        print(f"⏭️  Skipping {trigger} run: the previous analysis is still running")
+        return False
+    
+    def worker():
+        started = time.monotonic()
+        try:
+            run_daily_analysis()
+            print(f"⏱️  {trigger.capitalize()} run finished in {time.monotonic() - started:.1f}s")
+        finally:
+            _run_lock.release()
+    
+    threading.Thread(target=worker, name=f"analysis-{trigger}", daemon=True).start()
+    return True
+
+def _intraday_run():
+    """Intraday job: only runs while the market is open"""
+    if market_is_open():
+        start_analysis_run('intraday')
 
-# Schedule the job
-# schedule.every().day.at("06:30").do(run_daily_analysis)
+def run_daemon(poll_seconds=30):
+    """Keep the process alive and run analyses on the configured schedule.
+    
+    The Groq client, SQLite caches and the news ingestion loop with its feed
+    connections stay warm between runs, so later runs only refresh what has
+    changed since the previous one.
+    """
+    for day in _schedule_days():
+        for at in SCHEDULE_TIMES:
+            getattr(schedule.every(), day).at(at).do(start_analysis_run, 'scheduled')
+    if INTRADAY_MINUTES > 0:
+        schedule.every(INTRADAY_MINUTES).minutes.do(_intraday_run)
+    
+    next_run = schedule.next_run()
+    if next_run:
+        print(f"\n⏰ Next run at {next_run.strftime('%Y-%m-%d %H:%M')}")
+    print("Press Ctrl+C to stop\n")
+    
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        print("\n👋 Stopping scheduler")
+        schedule.clear()
+        # Let an in-progress run finish writing its caches
+        with _run_lock:
+            pass
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI stock analyst with daily news-driven briefs")
+    parser.add_argument('--replay', action='store_true',
+                        help="serve LLM analysis only from the response cache, without calling Groq")
+    parser.add_argument('--stream', action='store_true',
+                        help="print each analysis section as soon as the model has produced it")
+    parser.add_argument('--no-llm', action='store_true',
+                        help="skip Groq and build the brief from local sentiment scoring only")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and analyze on the configured schedule")
+    parser.add_argument('--portfolios', metavar='FILE',
+                        help="analyze every portfolio in this JSON file, fetching shared symbols once")
+    parser.add_argument('--profile', action='store_true',
+                        help="print the slowest stages, symbols and hosts after each run")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    render_parser = commands.add_parser('render', help="re-render the last run's brief without fetching anything")
+    render_parser.add_argument('--portfolio', help="brief to render when the last run covered several portfolios")
+    render_parser.add_argument('--html', action='store_true', help="write an HTML report instead of printing")
+    commands.add_parser('status', help="show the last run, cache contents and latest metrics")
+    history_parser = commands.add_parser('history', help="price and sentiment history of a ticker from the run archive")
+    history_parser.add_argument('ticker')
+    history_parser.add_argument('--days', type=int, default=90, help="how far back to look (default 90)")
+    briefs_parser = commands.add_parser('briefs', help="archived briefs covering a ticker, newest first")
+    briefs_parser.add_argument('ticker')
+    briefs_parser.add_argument('--days', type=int, default=90, help="how far back to look (default 90)")
+    briefs_parser.add_argument('--limit', type=int, default=20, help="most briefs to show (default 20)")
+    args = parser.parse_args()
+    
+    # Lightweight commands never touch the network or the data stack
+    if args.command == 'render':
+        sys.exit(render_snapshot(args.portfolio, args.html))
+    if args.command == 'status':
+        print(format_status())
+        sys.exit(0)
+    if args.command == 'history':
+        print(format_ticker_history(args.ticker, args.days))
+        sys.exit(0)
+    if args.command == 'briefs':
+        print(format_ticker_briefs(args.ticker, args.days, args.limit))
+        sys.exit(0)
+    
+    if args.profile:
+        PROFILE = True
+    if args.portfolios:
+        PORTFOLIOS_FILE = args.portfolios
+    if args.no_llm:
+        SKIP_LLM = True
+    if args.replay:
+        LLM_REPLAY = True
+    if args.stream:
+        STREAM_OUTPUT = True
+    
     print("🤖 Stock Analyst Bot Started (with News Analysis)")
-    print(f"📊 Tracking portfolio: {', '.join(PORTFOLIO)}")
-    print(f"⏰ Scheduled for: 6:30 AM daily")
+    if PORTFOLIOS_FILE:
+        print(f"📊 Tracking portfolios from: {PORTFOLIOS_FILE}")
+    else:
+        print(f"📊 Tracking portfolio: {', '.join(PORTFOLIO)}")
+    if args.daemon:
+        print(f"⏰ Scheduled for: {describe_schedule()}")
     print(f"💾 Reports will be saved as HTML files")
     print(f"📰 Now analyzing real financial news for each stock!")
     print("\nRunning first analysis now...\n")
@@ -744,10 +3914,5 @@ if __name__ == "__main__":
     # Run immediately for testing
     run_daily_analysis()
     
-    print("\n⏰ Waiting for scheduled time (6:30 AM)...")
-    print("Press Ctrl+C to stop\n")
-    
-    # Keep running
-    # while True:
-    #     schedule.run_pending()
-    #     time.sleep(60)
\ No newline at end of file
+    if args.daemon:
+        run_daemon()
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+# Configuration is read at import time: keep the tests away from the working tree's caches
+_workdir = tempfile.mkdtemp(prefix='analyst-tests-')
+os.environ.update(CACHE_DB=os.path.join(_workdir, 'cache.db'), METRICS_DIR='', ARCHIVE_DIR='',
+                  SNAPSHOT_FILE=os.path.join(_workdir, 'last_run.json'), GROQ_API_KEY='')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pytest
+
+import analyst
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """A fresh cache database, host limiters, ingestion loop and run metrics for every test"""
+    monkeypatch.setattr(analyst, 'CACHE_DB', str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(analyst, '_db_conn', None)
+    monkeypatch.setattr(analyst, '_host_limiters', {})
+    monkeypatch.setattr(analyst, '_host_semaphores', {})
+    monkeypatch.setattr(analyst, '_ingestion_loop', None)
+    analyst.reset_metrics()
+    yield
+    if analyst._ingestion_loop is not None:
+        analyst._ingestion_loop.close()
+    if analyst._db_conn is not None:
+        analyst._db_conn.close()
@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import analyst
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    """Archive into tmp_path at a settable time"""
+    monkeypatch.setattr(analyst, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    
+    class Clock(datetime):
+        current = datetime(2026, 6, 5, 16, 0, 0)
+        
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+    
+    monkeypatch.setattr(analyst, 'datetime', Clock)
+    return Clock
+
+
+def brief(symbol, price, sentiment, covered=()):
+    market_data = {'timestamp': '', 'market_indices': {}, 'market_news': [],
+                   'portfolio': {symbol: {'name': symbol, 'price': price, 'change_percent': 1.5, 'news_sentiment': 0.2}}}
+    analysis = {'market_overview': f'{symbol} overview',
+                'stock_analysis': [{'ticker': symbol, 'sentiment': sentiment, 'analysis': f'{symbol} at {price}'}]
+                + [{'ticker': ticker, 'sentiment': 'neutral'} for ticker in covered]}
+    return market_data, analysis
+
+
+def test_runs_on_one_day_append_members_to_one_segment(clock):
+    analyst.archive_briefs({'growth': brief('NVDA', 120.0, 'bullish'), 'income': brief('KO', 62.0, 'neutral')})
+    clock.current = datetime(2026, 6, 5, 18, 30, 0)
+    analyst.archive_briefs({'growth': brief('NVDA', 121.0, 'bearish')})
+    
+    assert sorted(os.listdir(analyst.ARCHIVE_DIR)) == ['2026-06-05.jsonl.gz', 'index.db']
+    # The segment is a valid multi-member gzip file holding every record in order
+    with gzip.open(os.path.join(analyst.ARCHIVE_DIR, '2026-06-05.jsonl.gz'), 'rt') as f:
+        records = [json.loads(line) for line in f]
+    assert [(record['brief'], record['run_at']) for record in records] == [
+        ('growth', '2026-06-05T16:00:00'), ('income', '2026-06-05T16:00:00'), ('growth', '2026-06-05T18:30:00')]
+    
+    rows = analyst.query_archive('NVDA')
+    assert [(run_at, price, sentiment) for run_at, _, _, price, _, _, sentiment, *_ in rows] == [
+        ('2026-06-05T16:00:00', 120.0, 'bullish'), ('2026-06-05T18:30:00', 121.0, 'bearish')]
+    for row, record in zip(rows, (records[0], records[2])):
+        segment, offset, length = row[-3:]
+        assert analyst.read_archive_record(segment, offset, length) == record
+
+
+def test_query_respects_days(clock):
+    clock.current = datetime(2026, 2, 1, 9, 0, 0)
+    analyst.archive_briefs({'growth': brief('NVDA', 90.0, 'bearish')})
+    clock.current = datetime(2026, 6, 4, 9, 0, 0)
+    analyst.archive_briefs({'growth': brief('NVDA', 120.0, 'bullish')})
+    clock.current = datetime(2026, 6, 5, 9, 0, 0)
+    
+    assert [row[3] for row in analyst.query_archive('NVDA', days=30)] == [120.0]
+    assert [row[3] for row in analyst.query_archive('NVDA', days=180)] == [90.0, 120.0]
+    first = analyst.query_archive('NVDA', days=180)[0]
+    assert analyst.read_archive_record(*first[-3:])['market_data']['portfolio']['NVDA']['price'] == 90.0
+
+
+def test_tickers_match_case_insensitively(clock):
+    analyst.archive_briefs({'growth': brief('NVDA', 120.0, 'bullish', covered=['AMD'])})
+    assert len(analyst.query_archive('nvda')) == 1
+    (row,) = analyst.query_archive('Amd')
+    assert row[2] == 0 and row[3] is None and row[6] == 'neutral'
+    assert analyst.query_archive('intc') == []
+
+
+def test_query_without_an_archive(clock):
+    assert analyst.query_archive('NVDA') == []
+    assert not os.path.exists(analyst.ARCHIVE_DIR)
@@ -0,0 +1,42 @@
+import analyst
+
+
+def market_data(change=1.2):
+    news = [{'title': 'Apple shares rise after earnings beat estimates', 'publisher': 'Reuters',
+             'link': '', 'published': 'Recent', 'summary': ''}]
+    return {
+        'timestamp': '2026-10-18 06:30:00',
+        'market_indices': {'S&P 500': {'price': 5800.0, 'change_percent': 0.4}},
+        'portfolio': {'AAPL': {'name': 'Apple Inc', 'price': 230.0, 'change_percent': change, 'volume': 1000,
+                               'market_cap': 3e12, 'pe_ratio': 30.0, 'sector': 'Technology', 'industry': 'Hardware',
+                               'news': news, 'news_count': 1}},
+        'market_news': [],
+    }
+
+
+def fake_llm(monkeypatch):
+    calls = []
+    
+    def complete_json(messages, **kwargs):
+        calls.append(messages)
+        return {'market_overview': 'steady', 'stock_analysis': [{'ticker': 'AAPL', 'sentiment': 'Bullish'}]}
+    
+    monkeypatch.setattr(analyst, 'complete_json', complete_json)
+    monkeypatch.setattr(analyst, 'SKIP_LLM', False)
+    monkeypatch.setattr(analyst, 'DELTA_ANALYSIS', True)
+    return calls
+
+
+def test_unchanged_run_reuses_the_whole_analysis(monkeypatch):
+    calls = fake_llm(monkeypatch)
+    first = analyst.analyze_with_groq(market_data())
+    assert len(calls) == 1
+    assert analyst.analyze_with_groq(market_data()) == first
+    assert len(calls) == 1
+
+
+def test_changed_symbol_is_recomputed(monkeypatch):
+    calls = fake_llm(monkeypatch)
+    analyst.analyze_with_groq(market_data())
+    analyst.analyze_with_groq(market_data(change=-4.0))
+    assert len(calls) == 2
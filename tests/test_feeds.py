@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+import analyst
+
+
+def rss(count):
+    items = ''.join(
+        f'<item><title>Headline {i}</title><link>https://news.example/{i}</link>'
+        f'<pubDate>Mon, 0{i % 9 + 1} Jun 2026 10:00:00 GMT</pubDate>'
+        f'<description><![CDATA[<p>Summary {i}</p>]]></description>'
+        f'<source url="https://wire.example">Wire {i}</source></item>'
+        for i in range(count))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed</title>{items}</channel></rss>'.encode()
+
+ATOM = b'''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Atom feed</title>
+  <entry>
+    <title>Chipmaker beats estimates</title>
+    <link rel="alternate" href="https://news.example/atom/1"/>
+    <updated>2026-06-01T10:00:00Z</updated>
+    <summary>Revenue rose.</summary>
+    <source><title>Example Wire</title></source>
+  </entry>
+</feed>'''
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_rss_entries_keep_the_fetcher_fields():
+    entries = analyst.parse_feed([rss(2)])
+    assert entries[1] == {'title': 'Headline 1', 'link': 'https://news.example/1', 'source': 'Wire 1',
+                          'published': 'Mon, 02 Jun 2026 10:00:00 GMT', 'summary': '<p>Summary 1</p>'}
+
+
+def test_atom_entries_use_link_href_and_nested_source_title():
+    entries = analyst.parse_feed([ATOM])
+    assert entries == [{'title': 'Chipmaker beats estimates', 'link': 'https://news.example/atom/1',
+                        'source': 'Example Wire', 'published': '2026-06-01T10:00:00Z', 'summary': 'Revenue rose.'}]
+
+
+def test_channel_title_is_not_an_entry():
+    assert [entry['title'] for entry in analyst.parse_feed([rss(3)])] == ['Headline 0', 'Headline 1', 'Headline 2']
+
+
+@pytest.mark.parametrize('size', [1, 7, 64])
+def test_chunk_boundaries_do_not_change_the_result(size):
+    assert analyst.parse_feed(chunked(rss(5), size)) == analyst.parse_feed([rss(5)])
+
+
+def test_parsing_stops_after_max_entries():
+    data = rss(50)
+    chunks = chunked(data, 64)
+    read = []
+    
+    def stream():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+    
+    entries = analyst.parse_feed(stream(), max_entries=3)
+    assert [entry['title'] for entry in entries] == ['Headline 0', 'Headline 1', 'Headline 2']
+    assert len(read) < len(chunks) // 5
+
+
+def test_feed_reports_when_enough_entries_are_read():
+    parser = analyst.FeedParser(max_entries=2)
+    data = rss(3)
+    second_end = data.index(b'</item>', data.index(b'</item>') + 1) + len(b'</item>')
+    assert parser.feed(data[:second_end - 1]) is False
+    assert parser.feed(data[second_end - 1:second_end]) is True
+    assert len(parser.entries) == 2
+
+
+def test_malformed_xml_raises_parse_error():
+    with pytest.raises(analyst.ElementTree.ParseError):
+        analyst.parse_feed([b'<rss><channel><item><title>Broken & bad</title></item></channel></rss>'])
+
+
+class StreamedResponse:
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+    
+    async def aiter_bytes(self, size):
+        for chunk in chunked(self.data, size):
+            yield chunk
+    
+    async def aclose(self):
+        self.closed = True
+
+
+def test_read_feed_falls_back_to_feedparser_on_broken_xml():
+    response = StreamedResponse(rss(2).replace(b'Headline 1', b'Headline & 1'))
+    entries = asyncio.run(analyst._read_feed(response))
+    assert [entry['title'] for entry in entries] == ['Headline 0', 'Headline & 1']
+    assert response.closed
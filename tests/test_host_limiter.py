@@ -0,0 +1,216 @@
+import time
+import asyncio
+
+import pytest
+
+import analyst
+
+
+def open_circuit(limiter):
+    for _ in range(analyst.BREAKER_THRESHOLD):
+        limiter.record_failure('transient')
+    assert limiter.state == 'open'
+
+
+def test_cancelled_trial_releases_half_open_circuit(monkeypatch):
+    monkeypatch.setattr(analyst, 'BREAKER_COOLDOWN', 0.05)
+    limiter = analyst._host_limiter('trial.example')
+    open_circuit(limiter)
+    time.sleep(0.06)
+    
+    async def hang():
+        await asyncio.sleep(10)
+    
+    async def ok():
+        return 'ok'
+    
+    async def scenario():
+        trial = asyncio.ensure_future(analyst._outbound_async('trial.example', {}, hang))
+        await asyncio.sleep(0.01)
+        assert limiter.state == 'half-open'
+        with pytest.raises(analyst.CircuitOpenError):
+            limiter.reserve()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        # The next caller becomes the trial and closes the circuit
+        return await analyst._outbound_async('trial.example', {}, ok)
+    
+    assert asyncio.run(scenario()) == 'ok'
+    assert limiter.state == 'closed'
+
+
+def test_release_trial_ignores_other_callers(monkeypatch):
+    monkeypatch.setattr(analyst, 'BREAKER_COOLDOWN', 0)
+    limiter = analyst.HostLimiter('owner.example')
+    open_circuit(limiter)
+    owner = object()
+    limiter.reserve(owner)
+    limiter.release_trial(object())
+    assert limiter.state == 'half-open'
+    limiter.release_trial(owner)
+    assert limiter.state == 'open'
+    limiter.reserve()
+    assert limiter.state == 'half-open'
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_bucket_allows_a_burst_then_paces_at_the_rate():
+    limiter = analyst.HostLimiter('bucket.example')
+    limiter.tokens = analyst.RATE_BURST
+    waits = [limiter.reserve() for _ in range(analyst.RATE_BURST + 2)]
+    assert waits[:analyst.RATE_BURST] == [0.0] * analyst.RATE_BURST
+    step = 1 / limiter.rate
+    assert waits[analyst.RATE_BURST:] == [pytest.approx(step, abs=0.01), pytest.approx(2 * step, abs=0.01)]
+
+
+def test_idle_host_saves_at_most_a_burst():
+    limiter = analyst.HostLimiter('idle.example')
+    limiter.updated -= 100
+    waits = [limiter.reserve() for _ in range(analyst.RATE_BURST + 1)]
+    assert waits[:analyst.RATE_BURST] == [0.0] * analyst.RATE_BURST
+    assert waits[-1] > 0
+
+
+def test_successes_speed_up_to_the_ceiling():
+    limiter = analyst.HostLimiter('fast.example')
+    for _ in range(10000):
+        limiter.record_success()
+    assert limiter.rate == limiter.base_rate * analyst.RATE_CEILING
+
+
+def test_throttles_halve_the_rate_once_per_second_down_to_the_floor():
+    limiter = analyst.HostLimiter('busy.example')
+    limiter.record_failure('throttle')
+    assert limiter.rate == limiter.base_rate / 2
+    assert limiter.reserve() == pytest.approx(2 / limiter.base_rate, abs=0.01)
+    limiter.record_failure('throttle')  # Same burst of in-flight requests
+    assert limiter.rate == limiter.base_rate / 2
+    for _ in range(20):
+        limiter.decreased -= 1
+        limiter.record_failure('throttle')
+    assert limiter.rate == analyst.RATE_FLOOR
+    assert limiter.state == 'closed'
+
+
+def test_retry_after_pauses_the_host():
+    limiter = analyst.HostLimiter('pause.example')
+    limiter.record_failure('throttle', retry_after=5)
+    assert limiter.reserve() == pytest.approx(5, abs=0.01)
+
+
+def test_breaker_opens_after_consecutive_transient_failures():
+    limiter = analyst.HostLimiter('flaky.example')
+    for _ in range(analyst.BREAKER_THRESHOLD - 1):
+        limiter.record_failure('transient')
+    limiter.record_success()
+    for _ in range(analyst.BREAKER_THRESHOLD - 1):
+        limiter.record_failure('transient')
+    assert limiter.state == 'closed'
+    limiter.record_failure('transient')
+    assert limiter.state == 'open'
+    with pytest.raises(analyst.CircuitOpenError):
+        limiter.reserve()
+
+
+def test_half_open_trial_closes_on_success_and_reopens_on_failure(monkeypatch):
+    monkeypatch.setattr(analyst, 'BREAKER_COOLDOWN', 0)
+    limiter = analyst.HostLimiter('trial.example')
+    open_circuit(limiter)
+    limiter.reserve()
+    assert limiter.state == 'half-open'
+    with pytest.raises(analyst.CircuitOpenError):
+        limiter.reserve()
+    limiter.record_success()
+    assert limiter.state == 'closed'
+    
+    open_circuit(limiter)
+    limiter.reserve()
+    monkeypatch.setattr(analyst, 'BREAKER_COOLDOWN', 30)
+    limiter.record_failure('transient')
+    assert limiter.state == 'open'
+    with pytest.raises(analyst.CircuitOpenError):
+        limiter.reserve()
+
+
+def test_retries_stop_at_the_attempt_limit():
+    limiter = analyst.HostLimiter('attempts.example')
+    assert limiter.retry_delay(analyst.RETRY_ATTEMPTS - 2) is not None
+    assert limiter.retry_delay(analyst.RETRY_ATTEMPTS - 1) is None
+
+
+def test_retry_budget_is_spent_and_refunded_by_successes():
+    limiter = analyst.HostLimiter('budget.example')
+    for _ in range(analyst.RETRY_BUDGET):
+        assert limiter.retry_delay(0) is not None
+    assert limiter.retry_delay(0) is None
+    for _ in range(int(1 / analyst.RETRY_REFUND) + 1):
+        limiter.record_success()
+    assert limiter.retry_delay(0) is not None
+    assert limiter.retry_delay(0) is None
+
+
+def test_retry_delay_honours_retry_after_and_open_circuit():
+    limiter = analyst.HostLimiter('delay.example')
+    assert limiter.retry_delay(0, retry_after=7) >= 7
+    open_circuit(limiter)
+    assert limiter.retry_delay(0) is None
+
+
+@pytest.mark.parametrize('error, result, kind', [
+    (None, Response(200), None),
+    (None, Response(429), 'throttle'),
+    (None, Response(503), 'throttle'),
+    (None, Response(502), 'transient'),
+    (None, Response(404), None),
+    (ConnectionError('reset'), None, 'transient'),
+    (TimeoutError(), None, 'transient'),
+    (Exception('HTTP Error 429: Too Many Requests'), None, 'throttle'),
+    (ValueError('bad symbol'), None, None),
+])
+def test_failure_kind(error, result, kind):
+    assert analyst._failure_kind(error, result) == kind
+
+
+def test_outbound_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(analyst, 'RETRY_BASE_DELAY', 0)
+    calls = []
+    
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError('reset')
+        return 'ok'
+    
+    assert analyst._outbound('retry.example', flaky) == 'ok'
+    assert len(calls) == 3
+    assert analyst._host_limiter('retry.example').failures == 0
+
+
+def test_outbound_does_not_retry_other_errors():
+    calls = []
+    
+    def broken():
+        calls.append(1)
+        raise ValueError('bad symbol')
+    
+    with pytest.raises(ValueError):
+        analyst._outbound('broken.example', broken)
+    assert len(calls) == 1
+
+
+def test_outbound_returns_the_last_failing_response(monkeypatch):
+    monkeypatch.setattr(analyst, 'RETRY_BASE_DELAY', 0)
+    calls = []
+    
+    def failing():
+        calls.append(1)
+        return Response(500)
+    
+    assert analyst._outbound('down.example', failing).status_code == 500
+    assert len(calls) == analyst.RETRY_ATTEMPTS
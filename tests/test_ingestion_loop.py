@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+import analyst
+
+
+@pytest.fixture(autouse=True)
+def fake_sources(monkeypatch):
+    async def ticker_news(client, semaphores, symbol, info, max_articles):
+        return [{'title': f"{info['longName']} story {i}", 'publisher': 'Wire', 'link': f'https://news.example/{symbol}/{i}',
+                 'published': 'Recent', 'summary': ''} for i in range(max_articles)]
+    
+    async def fetch_feed(client, url, semaphores):
+        return [{'title': f'Market story {url[-12:]}', 'link': url, 'source': 'Wire',
+                 'published': 'Recent', 'summary': ''}]
+    
+    monkeypatch.setattr(analyst, '_NEWS_FETCHERS', {'ticker': ticker_news})
+    monkeypatch.setattr(analyst, 'NEWS_SOURCES', ('ticker',))
+    monkeypatch.setattr(analyst, 'fetch_feed', fetch_feed)
+
+
+def test_runs_share_one_client_loop_and_stats():
+    market, news = analyst.ingest_news({'AAPL': {'longName': 'Apple'}}, max_articles=2)
+    assert [item['title'] for item in news['AAPL']] == ['Apple story 0', 'Apple story 1']
+    assert market
+    ingestion = analyst.ingestion_loop()
+    client, thread = ingestion.client, ingestion.thread
+    
+    analyst.ingest_news({'MSFT': {'longName': 'Microsoft'}}, market_articles=0)
+    assert analyst.ingestion_loop() is ingestion
+    assert ingestion.client is client and not client.is_closed
+    assert ingestion.thread is thread and thread.is_alive()
+    assert ingestion.stats._loaded == {'AAPL', 'MSFT'}
+
+
+def test_helpers_work_inside_a_running_event_loop():
+    async def caller():
+        return analyst.fetch_news_for_stock('NVDA', 'Nvidia', max_articles=1)
+    
+    assert [item['title'] for item in asyncio.run(caller())] == ['Nvidia story 0']
+
+
+def test_close_releases_the_client_once():
+    analyst.fetch_market_news(max_articles=1)
+    ingestion = analyst.ingestion_loop()
+    ingestion.close()
+    assert ingestion.client.is_closed and not ingestion.thread.is_alive()
+    ingestion.close()
+
+
+def test_run_refuses_to_wait_on_its_own_loop():
+    async def nested(ingestion):
+        return ingestion.run(nested)
+    
+    with pytest.raises(RuntimeError):
+        analyst.ingestion_loop().run(nested)
@@ -0,0 +1,13 @@
+import analyst
+
+
+def test_symbol_total_adds_top_level_stages_only():
+    metrics = analyst.reset_metrics()
+    metrics.add_stage('fundamentals', 0.5, 'AAPL')
+    metrics.add_stage('news', 0.3, 'AAPL')
+    metrics.add_stage('news.ticker', 0.2, 'AAPL')
+    metrics.add_stage('collect.prices', 1.0)
+    
+    entry = metrics.summary()['symbols']['AAPL']
+    assert entry['total'] == 0.8
+    assert entry['news.ticker'] == 0.2
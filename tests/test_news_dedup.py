@@ -0,0 +1,41 @@
+import pytest
+
+import analyst
+
+
+def article(title):
+    return {'title': title, 'publisher': 'Reuters', 'link': '', 'published': 'Recent', 'summary': ''}
+
+
+@pytest.mark.parametrize('first, second', [
+    ('Apple shares rise after earnings beat estimates', 'Microsoft shares rise after earnings beat estimates'),
+    ('Nvidia stock falls 3% as chip stocks slide', 'AMD stock falls 3% as chip stocks slide'),
+])
+def test_same_wording_about_different_companies_is_kept(first, second):
+    dedup = analyst.NewsDeduper()
+    assert dedup.add(article(first), 'AAPL')
+    assert dedup.add(article(second), 'MSFT')
+
+
+def test_syndicated_rewrite_is_dropped():
+    dedup = analyst.NewsDeduper()
+    assert dedup.add(article('Fed holds rates steady, signals two cuts - Reuters'))
+    assert not dedup.add(article('Fed holds interest rates steady and signals two cuts - CNBC'))
+
+
+def test_near_duplicates_within_one_symbol_are_dropped():
+    dedup = analyst.NewsDeduper()
+    assert dedup.add(article('Apple shares rise after earnings beat estimates'), 'AAPL')
+    assert not dedup.add(article('Apple shares rise after quarterly earnings beat estimates'), 'AAPL')
+
+
+def test_market_news_hides_rewrites_in_stock_news():
+    dedup = analyst.NewsDeduper()
+    assert dedup.add(article('Fed holds rates steady, signals two cuts'))
+    assert not dedup.add(article('Fed holds interest rates steady and signals two cuts'), 'JPM')
+
+
+def test_exact_repeats_are_dropped_across_symbols():
+    dedup = analyst.NewsDeduper()
+    assert dedup.add(article('Chip stocks slide as export curbs widen - Reuters'), 'NVDA')
+    assert not dedup.add(article('Chip stocks slide as export curbs widen - Bloomberg'), 'AMD')
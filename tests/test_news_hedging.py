@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import analyst
+
+
+@pytest.fixture(autouse=True)
+def fast_hedging(monkeypatch):
+    monkeypatch.setattr(analyst, 'NEWS_HEDGE_DELAY', 0.1)
+    monkeypatch.setattr(analyst, 'NEWS_DEADLINE', 0.5)
+
+
+class Sources:
+    """Stand-in news fetchers: source -> (seconds, items returned, raises)"""
+    
+    def __init__(self, monkeypatch, **specs):
+        self.started, self.cancelled = [], []
+        fetchers = {source: self.fetcher(source, *spec) for source, spec in specs.items()}
+        monkeypatch.setattr(analyst, '_NEWS_FETCHERS', fetchers)
+    
+    def fetcher(self, source, seconds, count, fails=False):
+        async def fetch(client, semaphores, symbol, info, max_articles):
+            self.started.append(source)
+            try:
+                await asyncio.sleep(seconds)
+            except asyncio.CancelledError:
+                self.cancelled.append(source)
+                raise
+            if fails:
+                raise RuntimeError('feed down')
+            return [{'title': f'{source} {i}'} for i in range(count)][:max_articles]
+        return fetch
+
+
+def stock_news(stats=None, info=None):
+    """Titles from _stock_news; by default info is freshly fetched, so every source runs"""
+    stats = stats or analyst.NewsSourceStats(['AAPL'])
+    info = {'news': []} if info is None else info
+    items = asyncio.run(analyst._stock_news(None, {}, 'AAPL', info, stats, max_articles=3))
+    return [item['title'] for item in items]
+
+
+def test_fast_primary_wins_without_hedging(monkeypatch):
+    sources = Sources(monkeypatch, ticker=(0.01, 3), info=(0, 3), rss=(0, 3))
+    assert stock_news() == ['ticker 0', 'ticker 1', 'ticker 2']
+    assert sources.started == ['ticker']
+
+
+def test_short_primary_hedges_immediately(monkeypatch):
+    sources = Sources(monkeypatch, ticker=(0.01, 1), info=(0, 0), rss=(0.02, 3))
+    assert stock_news() == ['rss 0', 'rss 1', 'rss 2']
+    assert sources.started == ['ticker', 'info', 'rss']
+
+
+def test_slow_primary_is_hedged_and_cancelled(monkeypatch):
+    sources = Sources(monkeypatch, ticker=(10, 3), info=(0, 0), rss=(0.02, 3))
+    assert stock_news() == ['rss 0', 'rss 1', 'rss 2']
+    assert sources.cancelled == ['ticker']
+
+
+def test_slow_primary_can_still_win_after_hedging(monkeypatch):
+    Sources(monkeypatch, ticker=(0.15, 3), info=(0, 0), rss=(10, 3))
+    assert stock_news() == ['ticker 0', 'ticker 1', 'ticker 2']
+
+
+def test_deadline_returns_the_fullest_partial_result(monkeypatch):
+    sources = Sources(monkeypatch, ticker=(10, 3), info=(0, 1), rss=(0.2, 2))
+    assert stock_news() == ['rss 0', 'rss 1']
+    assert sources.cancelled == ['ticker']
+
+
+def test_failing_sources_return_no_news(monkeypatch):
+    Sources(monkeypatch, ticker=(0.01, 3, True), info=(0, 0), rss=(0.01, 3, True))
+    assert stock_news() == []
+
+
+def test_order_follows_the_measured_sources(monkeypatch):
+    Sources(monkeypatch, ticker=(10, 3), info=(0, 0), rss=(0.02, 3))
+    stats = analyst.NewsSourceStats(['AAPL'])
+    assert stats.order('AAPL') == list(analyst.NEWS_SOURCES)
+    for _ in range(3):
+        stock_news(stats)
+    assert stats.order('AAPL')[0] == 'rss'
+    assert stats.order('MSFT') == list(analyst.NEWS_SOURCES)
+
+
+def test_unmeasured_sources_rank_after_measured_ones():
+    stats = analyst.NewsSourceStats(['AAPL'])
+    stats.record('AAPL', 'rss', 2.0, False)
+    assert stats.order('AAPL') == ['rss', 'ticker', 'info']
+
+
+def test_source_stats_persist():
+    stats = analyst.NewsSourceStats(['AAPL'])
+    stats.record('AAPL', 'info', 0.01, True)
+    stats.record('AAPL', 'ticker', 3.0, False)
+    stats.save()
+    assert analyst.NewsSourceStats(['AAPL']).order('AAPL') == ['info', 'ticker', 'rss']
+
+
+def test_info_source_is_skipped_for_cached_fundamentals(monkeypatch):
+    sources = Sources(monkeypatch, ticker=(0.01, 1), info=(0, 3), rss=(0.02, 3))
+    stats = analyst.NewsSourceStats(['AAPL'])
+    # Cached fundamentals carry no news key
+    assert stock_news(stats, info={'longName': 'Apple Inc.'}) == ['rss 0', 'rss 1', 'rss 2']
+    assert sources.started == ['ticker', 'rss']
+    assert ('AAPL', 'info') not in stats._stats
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+import analyst
+
+
+def bars(closes, end='2026-06-05'):
+    dates = pd.bdate_range(end=end, periods=len(closes))
+    return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes,
+                         'Volume': [1000.0 * (i + 1) for i in range(len(closes))]}, index=dates)
+
+
+def test_latest_bars_follow_incremental_updates():
+    analyst.store_price_history({'AAPL': bars([10.0, 11.0, 12.0]), 'ONE': bars([5.0])}, period='1y')
+    latest = analyst.load_latest_bars(['AAPL', 'ONE', 'MISSING'])
+    assert latest['AAPL'] == {'date': '2026-06-05', 'close': 12.0, 'volume': 3000.0,
+                              'prev_date': '2026-06-04', 'prev_close': 11.0}
+    assert latest['ONE']['prev_close'] is None
+    assert 'MISSING' not in latest
+    
+    # A refetch of the last bar plus one new bar
+    analyst.store_price_history({'AAPL': bars([12.5, 13.0], end='2026-06-08')})
+    assert analyst.load_latest_bars(['AAPL'])['AAPL'] == {
+        'date': '2026-06-08', 'close': 13.0, 'volume': 2000.0, 'prev_date': '2026-06-05', 'prev_close': 12.5}
+
+
+def test_price_fields_match_a_downloaded_frame():
+    analyst.store_price_history({'MSFT': bars([100.0, 102.0])})
+    stored = analyst._price_fields(analyst.load_latest_bars(['MSFT'])['MSFT'])
+    assert stored == analyst._price_fields(analyst._latest_bar(bars([100.0, 102.0]))) == {
+        'price': 102.0, 'change_percent': 2.0}
+    with pytest.raises(ValueError):
+        analyst._price_fields(analyst._latest_bar(bars([100.0])))
+
+
+class Yahoo:
+    """Stand-in for fetch_price_history serving one adjusted series per symbol"""
+    
+    def __init__(self, monkeypatch, series):
+        self.series = series
+        self.calls = []
+        monkeypatch.setattr(analyst, 'fetch_price_history', self.fetch)
+    
+    def fetch(self, symbols, start=None, period=None):
+        self.calls.append((tuple(symbols), start or period))
+        histories = {}
+        for symbol in symbols:
+            hist = self.series[symbol]
+            histories[symbol] = hist[hist.index >= start] if start else hist
+        return histories
+
+
+def stored_closes(symbol):
+    with analyst._db_lock:
+        return [row[0] for row in analyst._db().execute(
+            'SELECT close FROM price_bars WHERE symbol = ? ORDER BY date', (symbol,))]
+
+
+def test_incremental_sync_overlaps_the_last_settled_bar(monkeypatch):
+    monkeypatch.setattr(analyst, 'PRICE_REFRESH_SECONDS', 0)
+    analyst.store_price_history({'AAPL': bars([10.0, 11.0, 12.0])}, period=analyst.PRICE_HISTORY_PERIOD)
+    yahoo = Yahoo(monkeypatch, {'AAPL': bars([10.0, 11.0, 12.5, 13.0], end='2026-06-08')})
+    analyst.sync_price_store(['AAPL'])
+    assert yahoo.calls == [(('AAPL',), '2026-06-04')]
+    assert stored_closes('AAPL') == [10.0, 11.0, 12.5, 13.0]
+
+
+def test_split_rebases_the_stored_history(monkeypatch):
+    monkeypatch.setattr(analyst, 'PRICE_REFRESH_SECONDS', 0)
+    analyst.store_price_history({'AAPL': bars([10.0, 11.0, 12.0]), 'MSFT': bars([20.0, 21.0, 22.0])},
+                                period=analyst.PRICE_HISTORY_PERIOD)
+    # A 2:1 split after the last sync halves every adjusted close
+    yahoo = Yahoo(monkeypatch, {'AAPL': bars([5.0, 5.5, 6.0, 6.5], end='2026-06-08'),
+                                'MSFT': bars([20.0, 21.0, 22.0, 23.0], end='2026-06-08')})
+    analyst.sync_price_store(['AAPL', 'MSFT'])
+    assert yahoo.calls == [(('AAPL', 'MSFT'), '2026-06-04'), (('AAPL',), analyst.PRICE_HISTORY_PERIOD)]
+    assert stored_closes('AAPL') == [5.0, 5.5, 6.0, 6.5]
+    assert stored_closes('MSFT') == [20.0, 21.0, 22.0, 23.0]
+    assert analyst.load_latest_bars(['AAPL'])['AAPL']['prev_close'] == 6.0
+
+
+def test_close_panel_aligns_dates_and_keeps_the_last_bars():
+    analyst.store_price_history({'AAPL': bars([1.0, 2.0, 3.0, 4.0]), 'NEW': bars([7.0, None])})
+    # A symbol missing a day in the middle
+    gappy = bars([10.0, 20.0, 30.0, 40.0]).drop(pd.Timestamp('2026-06-03'))
+    analyst.store_price_history({'GAP': gappy})
+    panel = analyst.load_close_panel(['NEW', 'GAP', 'AAPL', 'MISSING'], bars=3)
+    assert list(panel.columns) == ['NEW', 'GAP', 'AAPL']
+    assert list(panel.index.strftime('%Y-%m-%d')) == ['2026-06-03', '2026-06-04', '2026-06-05']
+    assert panel['AAPL'].tolist() == [2.0, 3.0, 4.0]
+    assert panel['GAP'].isna().tolist() == [True, False, False]
+    assert panel['NEW'].isna().tolist() == [True, False, True]
+    assert analyst.load_close_panel(['MISSING']).empty
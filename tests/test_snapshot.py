@@ -0,0 +1,102 @@
+import math
+from collections.abc import Mapping, Sequence
+
+import pytest
+
+import analyst
+
+
+def news(title, **flags):
+    return {'title': title, 'publisher': 'Reuters', 'link': f'https://news.example/{title}',
+            'published': '2026-06-05 09:30', 'summary': 'Summary', **flags}
+
+
+def market_data():
+    indicators = {'return_1m': 4.2, 'rsi_14': None, 'corr_portfolio': 0.81}
+    return {
+        'timestamp': '2026-06-05 16:00:00',
+        'market_indices': {'S&P 500': {'price': 5400.12, 'change_percent': 0.35},
+                           'VIX': {'price': 13.2, 'change_percent': math.nan}},
+        'portfolio': {
+            'AAPL': {'name': 'Apple Inc.', 'price': 212.5, 'change_percent': 1.25, 'volume': 51234567,
+                     'market_cap': 3210000000000, 'pe_ratio': 31.4, 'sector': 'Technology',
+                     'industry': 'Consumer Electronics',
+                     'news': [news('Apple beats', sentiment=0.62), news('Apple repeat', seen_before=True, sentiment=0.0)],
+                     'news_count': 2, 'indicators': indicators, 'news_sentiment': 0.31},
+            'NEWCO': {'name': 'NewCo', 'price': 10.0, 'change_percent': -3.5, 'volume': 0,
+                      'market_cap': 'N/A', 'pe_ratio': 'N/A', 'sector': 'N/A', 'industry': 'N/A',
+                      'news': [], 'news_count': 0, 'indicators': {key: None for key in indicators},
+                      'news_sentiment': 0.0},
+        },
+        'market_news': [news('Fed holds'), news('Fed repeat', seen_before=True)],
+    }
+
+
+def plain(value):
+    if isinstance(value, Mapping):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [plain(item) for item in value]
+    return value
+
+
+def assert_same(actual, expected, path='data'):
+    """Key-for-key equality, in the original key order, with NaN equal to NaN"""
+    if isinstance(expected, dict):
+        assert isinstance(actual, Mapping), path
+        assert list(actual) == list(expected), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f'{path}[{key!r}]')
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for i, (item, wanted) in enumerate(zip(actual, expected)):
+            assert_same(item, wanted, f'{path}[{i}]')
+    elif isinstance(expected, float) and math.isnan(expected):
+        assert math.isnan(actual), path
+    else:
+        assert actual == expected and type(actual) is type(expected), path
+
+
+def test_view_matches_the_packed_dict():
+    data = market_data()
+    assert_same(analyst.MarketSnapshot.from_market_data(data).view(), data)
+
+
+def test_saved_snapshot_loads_equal(tmp_path):
+    snapshot = analyst.MarketSnapshot.from_market_data(market_data())
+    snapshot.save(str(tmp_path / 'market.bin'))
+    loaded = analyst.MarketSnapshot.load(str(tmp_path / 'market.bin'))
+    assert isinstance(loaded.stocks['price'], memoryview)
+    assert_same(loaded.view(), plain(snapshot.view()))
+    assert_same(loaded.view(), market_data())
+
+
+def test_missing_numbers_read_back_as_na():
+    data = market_data()
+    data['portfolio']['NEWCO'].update(market_cap=None, pe_ratio=math.nan)
+    stock = analyst.MarketSnapshot.from_market_data(data).view()['portfolio']['NEWCO']
+    assert (stock['market_cap'], stock['pe_ratio']) == ('N/A', 'N/A')
+
+
+def test_optional_keys_stay_absent():
+    data = market_data()
+    stock = data['portfolio']['NEWCO']
+    del stock['indicators'], stock['news_sentiment']
+    view = analyst.MarketSnapshot.from_market_data(data).view()
+    assert 'indicators' not in view['portfolio']['NEWCO']
+    assert 'news_sentiment' not in view['portfolio']['NEWCO']
+    assert 'seen_before' not in view['market_news'][0] and 'sentiment' not in view['market_news'][0]
+    assert_same(view, data)
+
+
+def test_empty_portfolio_round_trips(tmp_path):
+    data = {'timestamp': '2026-06-05 16:00:00', 'market_indices': {}, 'portfolio': {}, 'market_news': []}
+    analyst.MarketSnapshot.from_market_data(data).save(str(tmp_path / 'empty.bin'))
+    assert_same(analyst.MarketSnapshot.load(str(tmp_path / 'empty.bin')).view(), data)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a snapshot at all')
+    with pytest.raises(ValueError):
+        analyst.MarketSnapshot.load(str(path))
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import analyst
+
+REPLY = {
+    'market_summary': 'Stocks rose {sharply}, then "paused", \\ held.',
+    'stocks': [
+        {'symbol': 'AAPL', 'sentiment': 'bullish', 'key_points': ['beat, raised', 'buyback']},
+        {'symbol': 'MSFT', 'sentiment': 'neutral', 'key_points': []},
+    ],
+    'sectors': ['tech', 'energy]', 'health'],
+    'empty': [],
+    'confidence': 0.72,
+    'risk': {'level': 'low', 'notes': [1, 2]},
+}
+
+
+def parse(chunks):
+    parser = analyst.StreamingJSONParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def expected_events():
+    events = []
+    for key, value in REPLY.items():
+        if isinstance(value, list):
+            events.extend(('item', key, element) for element in value)
+        events.append(('section', key, value))
+    return events
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 17, 10000])
+def test_chunk_boundaries_do_not_change_the_events(size):
+    text = json.dumps(REPLY, indent=2)
+    assert parse(text[i:i + size] for i in range(0, len(text), size)) == expected_events()
+
+
+def test_fence_before_the_object_and_text_after_it_are_ignored():
+    text = '```json\n' + json.dumps(REPLY) + '\n```\n{"ignored": 1}'
+    assert parse(text) == expected_events()
+
+
+def test_array_items_arrive_before_the_array_closes():
+    parser = analyst.StreamingJSONParser()
+    assert parser.feed('{"stocks": [{"symbol": "AAPL", "note": "a,b}"') == []
+    assert parser.feed('}') == [('item', 'stocks', {'symbol': 'AAPL', 'note': 'a,b}'})]
+    assert parser.feed(', "tech", 3') == [('item', 'stocks', 'tech')]
+    assert parser.feed(']') == [('item', 'stocks', 3)]
+    assert parser.feed('}') == [('section', 'stocks', [{'symbol': 'AAPL', 'note': 'a,b}'}, 'tech', 3])]
+    assert parser.done
+
+
+def test_escaped_quotes_split_across_chunks():
+    events = parse(['{"k\\', '"ey": "va\\', '"lue\\\\', '"}'])
+    assert events == [('section', 'k"ey', 'va"lue\\')]